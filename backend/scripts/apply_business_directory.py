@@ -5,20 +5,22 @@ Adds Contact Directory structure with business details
 """
 
 import json
-import re
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 import logging
 
+from trail_store import open_store
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class BusinessDirectoryApplicator:
     """Apply business directory to resupply points"""
     
-    def __init__(self, extracted_dir: str, webapp_data_dir: str):
+    def __init__(self, extracted_dir: str, webapp_data_dir: str, db_file: Optional[str] = None):
         self.extracted_dir = Path(extracted_dir)
         self.webapp_data_dir = Path(webapp_data_dir)
+        self.db_file = db_file
         
     def load_enrichments(self) -> Dict:
         """Load business enrichments"""
@@ -26,84 +28,64 @@ class BusinessDirectoryApplicator:
         with open(enrichments_file, 'r', encoding='utf-8') as f:
             return json.load(f)
     
-    def generate_business_ts(self, businesses: List[Dict]) -> str:
-        """Generate TypeScript for businesses array"""
-        if not businesses:
-            return ""
-        
-        lines = ["    businesses: ["]
+    def business_records(self, businesses: List[Dict]) -> List[Dict]:
+        """Business objects as written to resupply.ts (fields without a value left out)"""
+        records = []
         for biz in businesses:
-            lines.append("      {")
-            lines.append(f"        name: '{self._escape(biz['name'])}',")
-            lines.append(f"        type: '{biz['type']}',")
-            
-            if biz.get('phone'):
-                lines.append(f"        phone: '{biz['phone']}',")
-            if biz.get('hours'):
-                lines.append(f"        hours: '{self._escape(biz['hours'])}',")
-            if biz.get('address'):
-                lines.append(f"        address: '{self._escape(biz['address'])}',")
-            if biz.get('website'):
-                lines.append(f"        website: '{biz['website']}',")
-            if biz.get('email'):
-                lines.append(f"        email: '{biz['email']}',")
-            
-            lines.append("      },")
-        lines.append("    ],")
-        
-        return "\n".join(lines)
+            record = {'name': self._clean(biz['name']), 'type': biz['type']}
+            for field in ('phone', 'hours', 'address', 'website', 'email'):
+                if biz.get(field):
+                    record[field] = self._clean(biz[field])
+            records.append(record)
+        return records
     
-    def _escape(self, s: str) -> str:
-        """Escape string for TypeScript"""
+    def _clean(self, s: str) -> str:
+        """Single-line text (quoting is done by the literal formatter)"""
         if not s:
             return ""
-        return s.replace("'", "\\'").replace('"', '\\"').replace('\n', ' ')
+        return s.replace('\n', ' ')
     
     def apply_to_resupply_file(self):
-        """Apply business directories to resupply.ts"""
-        enrichments = self.load_enrichments()
+        """Apply business directories to resupply.ts
         
-        # Read existing file
-        resupply_file = self.webapp_data_dir / "resupply.ts"
-        content = resupply_file.read_text()
-        
-        # Parse and enrich each resupply point
-        enriched_count = 0
-        pattern = r'(\{\s*id:\s*["\']([^"\']+)["\'][^}]+\})'
-        
-        def enrich_match(match):
-            nonlocal enriched_count
-            obj_text = match.group(1)
-            point_id = match.group(2)
-            
-            # Check if this point has enrichments
-            if point_id in enrichments:
-                enrichment = enrichments[point_id]
-                businesses = enrichment['businesses']
-                
-                # Check if businesses already exist
-                if 'businesses:' in obj_text:
-                    logger.debug(f"Skipping {point_id} - already has businesses")
-                    return obj_text
-                
-                # Add businesses before closing brace
-                business_ts = self.generate_business_ts(businesses)
-                
-                # Insert before closing brace
-                enriched = obj_text.rstrip(' }')
-                enriched += ",\n" + business_ts + "\n  }"
-                
-                enriched_count += 1
-                logger.info(f"Added {len(businesses)} businesses to {enrichment['town_name']}")
-                return enriched
-            
-            return obj_text
-        
-        # Apply enrichments
-        new_content = re.sub(pattern, enrich_match, content, flags=re.DOTALL)
+        The points are updated in the trail store in one transaction, then
+        resupply.ts is patched from the store (only the enriched records change).
+        """
+        enrichments = self.load_enrichments()
         
-        # Write back with UTF-8 encoding
-        resupply_file.write_text(new_content, encoding='utf-8')
+        store = open_store(self.db_file, self.webapp_data_dir)
+        try:
+            # Enrich each resupply point
+            enriched_count = 0
+            with store.transaction():
+                for point in store.records('resupply'):
+                    point_id = point.get('id')
+                    if point_id not in enrichments:
+                        continue
+                    
+                    enrichment = enrichments[point_id]
+                    
+                    # Check if businesses already exist
+                    if 'businesses' in point:
+                        logger.debug(f"Skipping {point_id} - already has businesses")
+                        continue
+                    
+                    businesses = self.business_records(enrichment['businesses'])
+                    if not businesses:
+                        continue
+                    point['businesses'] = businesses
+                    store.upsert('resupply', point)
+                    
+                    enriched_count += 1
+                    logger.info(f"Added {len(businesses)} businesses to {enrichment['town_name']}")
+                    
+            # Regenerate from the store (a rerun is a no-op)
+            if 'resupply.ts' in store.export_webapp(self.webapp_data_dir):
+                logger.info(f"Updated {self.webapp_data_dir / 'resupply.ts'}")
+            else:
+                logger.info(f"{self.webapp_data_dir / 'resupply.ts'} already up to date")
+        finally:
+            store.close()
         
         print("\n" + "="*80)
         print("BUSINESS DIRECTORY APPLIED")
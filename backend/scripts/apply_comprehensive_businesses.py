@@ -5,20 +5,31 @@ Merges extracted businesses with existing resupply points
 """
 
 import json
-import re
 from pathlib import Path
 from typing import Dict, List
 import logging
 
+from business_index import BusinessFingerprintIndex
+from ts_literal import TsObject
+from ts_patch import TsPatch
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Fields of the web app's Business type, in the order they are written
+BUSINESS_FIELDS = ('id', 'name', 'type', 'phone', 'phone2', 'hours', 'address', 'website', 'email', 'googleMapsUrl',
+                   'notes', 'pricing', 'services', 'lastVerified', 'status', 'seasonalHours')
+
 class ComprehensiveBusinessApplicator:
     """Apply comprehensive businesses to resupply.ts"""
     
     def __init__(self, extracted_dir: str, webapp_data_dir: str):
         self.extracted_dir = Path(extracted_dir)
         self.webapp_data_dir = Path(webapp_data_dir)
+        # Shared by every resupply point, so duplicates are caught across towns in one pass
+        self.index = BusinessFingerprintIndex()
+        self.existing: Dict[str, List[Dict]] = {}
+        self.cross_town_duplicates: List[Dict] = []
         
     def load_comprehensive_businesses(self) -> Dict:
         """Load comprehensive business extraction"""
@@ -26,161 +37,117 @@ class ComprehensiveBusinessApplicator:
         with open(biz_file, 'r', encoding='utf-8') as f:
             return json.load(f)
     
-    def load_existing_resupply(self) -> List[Dict]:
-        """Parse existing resupply points"""
-        resupply_file = self.webapp_data_dir / "resupply.ts"
-        content = resupply_file.read_text(encoding='utf-8')
-        
-        resupply_points = []
-        pattern = r'\{[^}]+\}'
-        
-        for match in re.finditer(pattern, content, re.DOTALL):
-            obj_text = match.group(0)
-            
-            point = {'_original': obj_text}
-            
-            id_match = re.search(r'id:\s*["\']([^"\']+)["\']', obj_text)
-            if id_match:
-                point['id'] = id_match.group(1)
-            
-            resupply_points.append(point)
-        
-        logger.info(f"Parsed {len(resupply_points)} resupply points")
-        return resupply_points
-    
-    def _escape(self, s: str) -> str:
-        """Escape string for TypeScript"""
+    def _clean(self, s: str) -> str:
+        """Text with stray PDF characters replaced, on one line (quoting is done by the literal formatter)"""
         if not s:
             return ""
         s = s.replace('\u2019', "'").replace('\u2002', ' ').replace('\ufffd', '')
-        return s.replace("'", "\\'").replace('"', '\\"').replace('\n', ' ')
+        return s.replace('\n', ' ')
     
-    def generate_business_ts(self, businesses: List[Dict]) -> str:
-        """Generate TypeScript for businesses array"""
-        if not businesses:
-            return ""
-        
-        lines = []
-        lines.append("    businesses: [")
-        
-        for biz in businesses:
-            lines.append("      {")
-            lines.append(f"        name: '{self._escape(biz['name'])}',")
-            lines.append(f"        type: '{biz['type']}',")
-            
-            if biz.get('phone'):
-                lines.append(f"        phone: '{biz['phone']}',")
-            if biz.get('hours'):
-                lines.append(f"        hours: '{self._escape(biz['hours'])}',")
-            if biz.get('address'):
-                lines.append(f"        address: '{self._escape(biz['address'])}',")
-            if biz.get('website'):
-                lines.append(f"        website: '{biz['website']}',")
-            if biz.get('email'):
-                lines.append(f"        email: '{biz['email']}',")
-            if biz.get('notes'):
-                lines.append(f"        notes: '{self._escape(biz['notes'])}',")
-            
-            lines.append("      },")
-        
-        lines.append("    ],")
-        return "\n".join(lines)
+    def business_record(self, biz: Dict) -> Dict:
+        """Business object as written to resupply.ts: the Business fields it has, in BUSINESS_FIELDS order"""
+        record = {}
+        for key in BUSINESS_FIELDS:
+            value = biz.get(key)
+            if value in (None, ''):
+                continue
+            record[key] = self._clean(value) if isinstance(value, str) else value
+        return record
     
-    def merge_businesses(self, existing_businesses: List[Dict], new_businesses: List[Dict]) -> List[Dict]:
-        """Merge existing and new businesses, avoiding duplicates"""
-        # Create map of existing businesses by name
-        existing_map = {biz['name'].lower().strip(): biz for biz in existing_businesses}
-        
+    def _record_cross_town(self, biz: Dict, matches: List[Dict], point_id: str):
+        """Note every match of biz listed under another point"""
+        for match in matches:
+            if match['town'] != point_id:
+                self.cross_town_duplicates.append({
+                    'resupplyId': point_id,
+                    'name': biz['name'],
+                    'otherResupplyId': match['town'],
+                    'otherName': match['business']['name'],
+                    'matchedOn': match['matchedOn'],
+                    'duplicate': match['duplicate'],
+                })
+    
+    def index_existing(self, points: List[TsObject]):
+        """Index the businesses every point already lists, so new ones are checked against all towns"""
+        for point in points:
+            point_id = point.get('id')
+            existing = [dict(biz) for biz in point.get('businesses', []) if 'name' in biz and 'type' in biz]
+            for biz in existing:
+                self._record_cross_town(biz, self.index.lookup(biz, point_id), point_id)
+                self.index.add(biz, point_id)
+            self.existing[point_id] = existing
+    
+    def merge_businesses(self, existing_businesses: List[Dict], new_businesses: List[Dict], point_id: str = '') -> List[Dict]:
+        """Merge new businesses into a point's existing (already indexed) ones, avoiding duplicates
+        
+        Every new business is looked up in the fingerprint index of all
+        points. A same-point match on name, or on two fingerprints, is merged
+        into the business already listed (missing fields filled in); a match
+        in another point is kept and recorded in cross_town_duplicates.
+        """
         merged = list(existing_businesses)
-        
-        for new_biz in new_businesses:
-            name_key = new_biz['name'].lower().strip()
-            if name_key not in existing_map:
-                merged.append(new_biz)
-        
+        for biz in new_businesses:
+            matches = self.index.lookup(biz, point_id)
+            same_point = next((m for m in matches if m['town'] == point_id
+                               and ('name' in m['matchedOn'] or m['duplicate'])), None)
+            if same_point:
+                for key, value in biz.items():
+                    same_point['business'].setdefault(key, value)
+                continue
+                
+            self._record_cross_town(biz, matches, point_id)
+            self.index.add(biz, point_id)
+            merged.append(biz)
+            
         return merged
     
-    def enrich_resupply_object(self, obj_text: str, point_id: str, all_businesses: Dict) -> str:
-        """Add or merge businesses to a resupply object"""
-        if point_id not in all_businesses:
-            return obj_text
-        
-        new_businesses = all_businesses[point_id]
+    def enrich_resupply_point(self, patch: TsPatch, point: TsObject, all_businesses: Dict) -> bool:
+        """Queue the merged businesses of one resupply point on the patch; returns whether it changed"""
+        point_id = point.get('id')
+        new_businesses = all_businesses.get(point_id)
         if not new_businesses:
-            return obj_text
+            return False
         
-        # Check if already has businesses
-        if 'businesses:' in obj_text:
-            # Parse existing businesses
-            existing_businesses = []
-            biz_match = re.search(r'businesses:\s*\[(.*?)\]', obj_text, re.DOTALL)
-            if biz_match:
-                # Extract existing business objects
-                biz_section = biz_match.group(1)
-                for biz_obj in re.finditer(r'\{([^}]+)\}', biz_section):
-                    biz_text = biz_obj.group(1)
-                    name_match = re.search(r'name:\s*["\']([^"\']+)["\']', biz_text)
-                    type_match = re.search(r'type:\s*["\']([^"\']+)["\']', biz_text)
-                    if name_match and type_match:
-                        existing_businesses.append({
-                            'name': name_match.group(1),
-                            'type': type_match.group(1)
-                        })
-            
-            # Merge with new businesses
-            merged = self.merge_businesses(existing_businesses, new_businesses)
-            
-            # Replace businesses section
-            business_ts = self.generate_business_ts(merged)
-            enriched = re.sub(r'businesses:\s*\[.*?\],', business_ts, obj_text, flags=re.DOTALL)
-            
+        # Merge with the businesses already listed (indexed by index_existing), if any
+        existing_businesses = self.existing.get(point_id, [])
+        merged = self.merge_businesses(existing_businesses, new_businesses, point_id)
+        
+        # Replace (or add) the businesses value at its parsed offsets
+        patch.set_value(point, 'businesses', [self.business_record(biz) for biz in merged])
+        
+        if existing_businesses:
             logger.info(f"Merged businesses for {point_id}: {len(existing_businesses)} existing + {len(new_businesses)} new = {len(merged)} total")
-            return enriched
         else:
-            # Add businesses before closing brace
-            business_ts = self.generate_business_ts(new_businesses)
-            enriched = obj_text.rstrip(' }')
-            enriched += ",\n" + business_ts + "\n  }"
-            
-            logger.info(f"Added {len(new_businesses)} businesses to {point_id}")
-            return enriched
+            logger.info(f"Added {len(merged)} businesses to {point_id}")
+        return True
     
     def generate_enriched_file(self):
-        """Generate complete enriched resupply.ts"""
+        """Generate complete enriched resupply.ts
+        
+        All points are patched in one batch over the parsed file, so the
+        preview keeps everything else in resupply.ts as it is.
+        """
         all_businesses = self.load_comprehensive_businesses()
-        existing_points = self.load_existing_resupply()
+        resupply_file = self.webapp_data_dir / "resupply.ts"
+        patch, exports = TsPatch.load(resupply_file)
+        existing_points = exports.get('resupplyPoints', [])
+        logger.info(f"Parsed {len(existing_points)} resupply points")
         
-        lines = [
-            "import type { ResupplyPoint } from '../types';",
-            "",
-            "export const resupplyPoints: ResupplyPoint[] = [",
-        ]
+        # Existing businesses of every point first, then the merge
+        self.index_existing(existing_points)
         
         enriched_count = 0
         total_businesses = 0
         
         for point in existing_points:
-            point_id = point.get('id')
-            obj_text = point['_original']
-            
-            if point_id and point_id in all_businesses:
-                enriched_obj = self.enrich_resupply_object(obj_text, point_id, all_businesses)
-                if enriched_obj != obj_text:
-                    enriched_count += 1
-                    total_businesses += len(all_businesses[point_id])
-                lines.append(enriched_obj + ",")
-            else:
-                lines.append(obj_text + ",")
-        
-        lines.append("];")
-        lines.append("")
-        lines.append("export const RESUPPLY_COUNT = resupplyPoints.length;")
-        lines.append("")
+            if self.enrich_resupply_point(patch, point, all_businesses):
+                enriched_count += 1
+                total_businesses += len(all_businesses[point['id']])
         
         # Save preview
         preview_file = self.extracted_dir / "resupply_comprehensive_PREVIEW.ts"
         with open(preview_file, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(lines))
+            f.write(patch.apply())
         
         logger.info(f"Generated preview: {preview_file}")
         
@@ -190,6 +157,12 @@ class ComprehensiveBusinessApplicator:
         print(f"\nTotal resupply points: {len(existing_points)}")
         print(f"Points enriched with businesses: {enriched_count}")
         print(f"Total businesses added: {total_businesses}")
+        flagged = [d for d in self.cross_town_duplicates if d['duplicate']]
+        print(f"Cross-town duplicates flagged: {len(flagged)} "
+              f"(+{len(self.cross_town_duplicates) - len(flagged)} possible)")
+        for dup in flagged:
+            print(f"  {dup['resupplyId']}: {dup['name']} == {dup['otherResupplyId']}: {dup['otherName']} "
+                  f"({', '.join(dup['matchedOn'])})")
         print(f"\nPreview file: {preview_file}")
         print("\nNext: Review and apply with apply_comprehensive_resupply.py")
         print("="*80)
@@ -7,20 +7,22 @@ Apply new items to TypeScript files
 """
 
 import json
-import re
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 import logging
 
+from trail_store import TrailStore, open_store
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class NewItemsApplicator:
     """Apply only truly new, unique items to data files"""
     
-    def __init__(self, extracted_dir: str, webapp_data_dir: str):
+    def __init__(self, extracted_dir: str, webapp_data_dir: str, db_file: Optional[str] = None):
         self.extracted_dir = Path(extracted_dir)
         self.webapp_data_dir = Path(webapp_data_dir)
+        self.db_file = db_file
         
     def deduplicate_new_items(self, items: List[Dict]) -> List[Dict]:
         """Remove duplicates within the new items list"""
@@ -44,165 +46,134 @@ class NewItemsApplicator:
         logger.info(f"Deduplicated {len(items)} items to {len(unique)} unique items")
         return unique
     
-    def apply_new_shelters(self):
-        """Add new shelters to shelters.ts"""
-        # Load new items
+    def load_new_items(self, key: str) -> List[Dict]:
+        """Deduplicated new items of one kind from new_items_only.json"""
         new_items_file = self.extracted_dir / "new_items_only.json"
         with open(new_items_file, 'r', encoding='utf-8') as f:
             data = json.load(f)
-        
-        new_shelters = self.deduplicate_new_items(data['new_shelters'])
+        return self.deduplicate_new_items(data[key])
+    
+    def _add_records(self, store: TrailStore, table: str, records: List[Dict]) -> int:
+        """Upsert records whose id is not taken yet; returns how many were added"""
+        added = 0
+        for record in records:
+            if store.get(table, record['id']):
+                logger.warning(f"Skipping {record['name']}: id {record['id']} already exists")
+                continue
+            store.upsert(table, record)
+            added += 1
+        return added
+    
+    def apply_new_shelters(self, store: TrailStore) -> int:
+        """Add new shelters to the store (shelters.ts is regenerated by apply_all)"""
+        new_shelters = self.load_new_items('new_shelters')
         
         if not new_shelters:
             logger.info("No new shelters to add")
             return 0
         
-        # Read existing file
-        shelters_file = self.webapp_data_dir / "shelters.ts"
-        content = shelters_file.read_text()
-        
-        # Find the closing bracket of shelters array
-        # Look for "];" at the end
-        match = re.search(r'\];(\s*)$', content)
-        if not match:
-            logger.error("Could not find end of shelters array")
-            return 0
-        
-        insert_pos = match.start()
-        
-        # Generate TypeScript for new shelters
-        new_ts = self._generate_shelter_ts(new_shelters)
-        
-        # Insert before closing bracket
-        new_content = content[:insert_pos] + new_ts + "\n" + content[insert_pos:]
+        # New records go after the last shelter
+        added = self._add_records(store, 'shelters', self._shelter_records(new_shelters))
         
-        # Update SHELTER_COUNT
-        old_count_match = re.search(r'export const SHELTER_COUNT = (\d+);', new_content)
-        if old_count_match:
-            old_count = int(old_count_match.group(1))
-            new_count = old_count + len(new_shelters)
-            new_content = new_content.replace(
-                f'export const SHELTER_COUNT = {old_count};',
-                f'export const SHELTER_COUNT = {new_count};'
-            )
+        # Update SHELTER_COUNT when it is a number rather than shelters.length
+        count = store.meta('shelters.ts').get('SHELTER_COUNT')
+        if isinstance(count, int) and not isinstance(count, bool):
+            store.set_meta('shelters.ts', 'SHELTER_COUNT', count + added)
         
-        # Write back
-        shelters_file.write_text(new_content)
-        logger.info(f"Added {len(new_shelters)} new shelters to shelters.ts")
-        
-        return len(new_shelters)
+        logger.info(f"Added {added} new shelters")
+        return added
     
-    def apply_new_resupply(self):
-        """Add new resupply points to resupply.ts"""
-        # Load new items
-        new_items_file = self.extracted_dir / "new_items_only.json"
-        with open(new_items_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        new_resupply = self.deduplicate_new_items(data['new_resupply'])
+    def apply_new_resupply(self, store: TrailStore) -> int:
+        """Add new resupply points to the store (resupply.ts is regenerated by apply_all)"""
+        new_resupply = self.load_new_items('new_resupply')
         
         if not new_resupply:
             logger.info("No new resupply points to add")
             return 0
         
-        # Read existing file
-        resupply_file = self.webapp_data_dir / "resupply.ts"
-        content = resupply_file.read_text()
-        
-        # Find the closing bracket
-        match = re.search(r'\];', content)
-        if not match:
-            logger.error("Could not find end of resupplyPoints array")
-            return 0
-        
-        insert_pos = match.start()
-        
-        # Generate TypeScript for new resupply
-        new_ts = self._generate_resupply_ts(new_resupply)
-        
-        # Insert before closing bracket
-        new_content = content[:insert_pos] + new_ts + "\n" + content[insert_pos:]
-        
-        # Write back
-        resupply_file.write_text(new_content)
-        logger.info(f"Added {len(new_resupply)} new resupply points to resupply.ts")
-        
-        return len(new_resupply)
+        # New records go after the last point
+        added = self._add_records(store, 'resupply', self._resupply_records(new_resupply))
+        logger.info(f"Added {added} new resupply points")
+        return added
     
-    def _generate_shelter_ts(self, shelters: List[Dict]) -> str:
-        """Generate TypeScript code for shelters"""
-        lines = []
+    def _shelter_records(self, shelters: List[Dict]) -> List[Dict]:
+        """Shelter objects for shelters.ts"""
+        records = []
         
         for shelter in shelters:
-            lines.append("  {")
-            lines.append(f"    id: '{self._generate_id(shelter['name'])}',")
-            lines.append(f"    name: '{self._escape(shelter['name'])}',")
-            lines.append(f"    mile: {shelter['mile']},")
-            lines.append(f"    soboMile: {shelter['soboMile']},")
-            lines.append(f"    elevation: {shelter['elevation']},")
-            lines.append(f"    lat: {shelter['lat']},")
-            lines.append(f"    lng: {shelter['lng']},")
-            lines.append(f"    state: '{shelter['state']}',")
+            record = {
+                'id': self._generate_id(shelter['name']),
+                'name': shelter['name'],
+                'mile': shelter['mile'],
+                'soboMile': shelter['soboMile'],
+                'elevation': shelter['elevation'],
+                'lat': shelter['lat'],
+                'lng': shelter['lng'],
+                'state': shelter['state'],
+            }
             
             if shelter.get('county'):
-                lines.append(f"    county: '{shelter['county']}',")
+                record['county'] = shelter['county']
             
-            lines.append(f"    type: 'shelter',")
-            lines.append(f"    hasWater: {str(shelter.get('hasWater', False)).lower()},")
+            record['type'] = 'shelter'
+            record['hasWater'] = bool(shelter.get('hasWater', False))
             
             if shelter.get('waterDistance'):
-                lines.append(f"    waterDistance: {shelter['waterDistance']},")
+                record['waterDistance'] = shelter['waterDistance']
             
-            lines.append(f"    hasPrivy: {str(shelter.get('hasPrivy', False)).lower()},")
-            lines.append(f"    isTenting: {str(shelter.get('isTenting', False)).lower()},")
+            record['hasPrivy'] = bool(shelter.get('hasPrivy', False))
+            record['isTenting'] = bool(shelter.get('isTenting', False))
             
             if shelter.get('capacity'):
-                lines.append(f"    capacity: {shelter['capacity']},")
+                record['capacity'] = shelter['capacity']
             
-            lines.append("  },")
+            records.append(record)
         
-        return "\n".join(lines)
+        return records
     
-    def _generate_resupply_ts(self, resupply: List[Dict]) -> str:
-        """Generate TypeScript code for resupply points"""
-        lines = []
+    def _resupply_records(self, resupply: List[Dict]) -> List[Dict]:
+        """Resupply point objects for resupply.ts"""
+        records = []
         
         for town in resupply:
-            lines.append("  {")
-            lines.append(f"    id: '{self._generate_id(town['name'])}',")
-            lines.append(f"    name: '{self._escape(town['name'])}',")
-            lines.append(f"    mile: {town['mile']},")
-            lines.append(f"    soboMile: {town['soboMile']},")
-            lines.append(f"    elevation: {town['elevation']},")
-            lines.append(f"    lat: {town['lat']},")
-            lines.append(f"    lng: {town['lng']},")
-            lines.append(f"    state: '{town['state']}',")
-            lines.append(f"    type: 'town',")
-            lines.append(f"    hasGrocery: {str(town.get('hasGrocery', False)).lower()},")
-            lines.append(f"    hasOutfitter: {str(town.get('hasOutfitter', False)).lower()},")
-            lines.append(f"    hasPostOffice: {str(town.get('hasPostOffice', False)).lower()},")
-            lines.append(f"    hasLodging: {str(town.get('hasLodging', False)).lower()},")
-            lines.append(f"    hasRestaurant: {str(town.get('hasRestaurant', False)).lower()},")
-            lines.append(f"    hasLaundry: {str(town.get('hasLaundry', False)).lower()},")
-            lines.append(f"    hasShower: {str(town.get('hasShower', False)).lower()},")
-            lines.append(f"    resupplyQuality: '{town.get('resupplyQuality', 'limited')}',")
-            lines.append(f"    distanceFromTrail: {town.get('distanceFromTrail', 0)},")
-            lines.append("  },")
-        
-        return "\n".join(lines)
+            records.append({
+                'id': self._generate_id(town['name']),
+                'name': town['name'],
+                'mile': town['mile'],
+                'soboMile': town['soboMile'],
+                'elevation': town['elevation'],
+                'lat': town['lat'],
+                'lng': town['lng'],
+                'state': town['state'],
+                'type': 'town',
+                'hasGrocery': bool(town.get('hasGrocery', False)),
+                'hasOutfitter': bool(town.get('hasOutfitter', False)),
+                'hasPostOffice': bool(town.get('hasPostOffice', False)),
+                'hasLodging': bool(town.get('hasLodging', False)),
+                'hasRestaurant': bool(town.get('hasRestaurant', False)),
+                'hasLaundry': bool(town.get('hasLaundry', False)),
+                'hasShower': bool(town.get('hasShower', False)),
+                'resupplyQuality': town.get('resupplyQuality', 'limited'),
+                'distanceFromTrail': town.get('distanceFromTrail', 0),
+            })
+        
+        return records
     
     def _generate_id(self, name: str) -> str:
         """Generate ID from name"""
         return name.lower().replace(' ', '-').replace(',', '').replace("'", '').replace('(', '').replace(')', '')
     
-    def _escape(self, s: str) -> str:
-        """Escape string for TypeScript"""
-        return s.replace("'", "\\'").replace('"', '\\"')
-    
     def apply_all(self):
-        """Apply all new items"""
-        shelter_count = self.apply_new_shelters()
-        resupply_count = self.apply_new_resupply()
+        """Apply all new items in one store transaction, then regenerate the data files from the store"""
+        store = open_store(self.db_file, self.webapp_data_dir)
+        try:
+            with store.transaction():
+                shelter_count = self.apply_new_shelters(store)
+                resupply_count = self.apply_new_resupply(store)
+            changed = store.export_webapp(self.webapp_data_dir)
+            logger.info(f"Regenerated {', '.join(changed) if changed else 'nothing (files up to date)'}")
+        finally:
+            store.close()
         
         print("\n" + "="*80)
         print("NEW ITEMS APPLIED")
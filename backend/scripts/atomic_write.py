@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Write-if-changed, atomic file output for the data emitters
+A file is only rewritten when the SHA-256 of the new content differs from
+the file on disk, so rerunning an emitter leaves unchanged data files (and
+the dev server watching them) alone; changed files are written to a temp
+file in the same directory and moved over the old one with os.replace, so
+a reader never sees a half-written file
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional, Union
+
+def content_hash(content: Union[str, bytes], encoding: str = 'utf-8') -> str:
+    """SHA-256 hex digest of text (encoded) or bytes"""
+    if isinstance(content, str):
+        content = content.encode(encoding)
+    return hashlib.sha256(content).hexdigest()
+
+def file_hash(path: Path) -> Optional[str]:
+    """SHA-256 hex digest of a file, None if it does not exist"""
+    path = Path(path)
+    if not path.is_file():
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def is_changed(path: Path, content: Union[str, bytes], encoding: str = 'utf-8') -> bool:
+    """Whether writing content to path would change the file"""
+    return file_hash(path) != content_hash(content, encoding)
+
+def _default_mode() -> int:
+    """Permission bits a plain open(path, 'w') would give a new file under the current umask"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+def _replace_with(path: Path, write) -> None:
+    """Call write(file) on a temp file next to path, then move it into place"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        if path.exists():
+            shutil.copymode(path, temp_name)
+        else:
+            os.chmod(temp_name, _default_mode())
+        os.replace(temp_name, path)
+    except BaseException:
+        if os.path.exists(temp_name):
+            os.unlink(temp_name)
+        raise
+
+def write_if_changed(path: Path, content: Union[str, bytes], encoding: str = 'utf-8') -> bool:
+    """Atomically write content unless the file already holds exactly that; returns whether it was written"""
+    data = content.encode(encoding) if isinstance(content, str) else content
+    if not is_changed(path, data):
+        return False
+    _replace_with(path, lambda f: f.write(data))
+    return True
+
+def copy_if_changed(source: Path, dest: Path) -> bool:
+    """Atomically copy source over dest unless their contents match; returns whether it was copied"""
+    if file_hash(source) == file_hash(dest):
+        return False
+        
+    def copy(f):
+        with open(source, 'rb') as src:
+            shutil.copyfileobj(src, f)
+            
+    _replace_with(dest, copy)
+    shutil.copystat(source, dest)
+    return True
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Fingerprint index for spotting the same business listed under several towns
+Each business is reduced once to a normalized phone number, a normalized
+street address and a sorted name-token key; each fingerprint maps to the
+businesses carrying it, so a duplicate check is a few dict lookups instead of
+a scan over every town
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from atomic_write import write_if_changed
+from ts_literal import load_module
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_FIELDS = ('phone', 'address', 'name')
+
+# Words dropped from name keys ("The Station at 19E" == "Station at 19E")
+NAME_STOPWORDS = {'the', 'and', 'of', 'at', 'a', 'inc', 'llc', 'co'}
+
+ADDRESS_ABBREVIATIONS = {
+    'street': 'st', 'road': 'rd', 'highway': 'hwy', 'avenue': 'ave', 'drive': 'dr', 'route': 'rt',
+    'rte': 'rt', 'lane': 'ln', 'boulevard': 'blvd', 'parkway': 'pkwy', 'court': 'ct', 'place': 'pl',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w', 'us': 'us', 'state': 'st', 'suite': 'ste',
+}
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Ten-digit phone number (country code and extension dropped), None if there is none"""
+    digits = re.sub(r'\D', '', (phone or '').split(' ext')[0].split(' x')[0])
+    if len(digits) == 11 and digits.startswith('1'):
+        digits = digits[1:]
+    return digits if len(digits) == 10 else None
+
+def normalize_address(address: Optional[str]) -> Optional[str]:
+    """Street line with abbreviations unified, plus the ZIP code when present
+    
+    Addresses without a street number ("Hot Springs, NC") name a town, not a
+    business, and get no fingerprint.
+    """
+    if not address:
+        return None
+    street = address.split(',')[0].lower()
+    if not re.search(r'\d', street):
+        return None
+    words = [ADDRESS_ABBREVIATIONS.get(w, w) for w in re.findall(r'[a-z0-9]+', street)]
+    zip_match = re.search(r'\b(\d{5})(?:-\d{4})?\s*$', address)
+    if zip_match:
+        words.append(zip_match.group(1))
+    return ' '.join(words)
+
+def name_key(name: Optional[str]) -> Optional[str]:
+    """Sorted distinctive name tokens, so word order and articles do not matter"""
+    tokens = {t for t in re.findall(r'[a-z0-9]+', (name or '').lower().replace("'", '')) if t not in NAME_STOPWORDS}
+    return ' '.join(sorted(tokens)) or None
+
+def fingerprints(business: Dict) -> Dict[str, str]:
+    """Available fingerprints of one business"""
+    keys = {
+        'phone': normalize_phone(business.get('phone')),
+        'address': normalize_address(business.get('address')),
+        'name': name_key(business.get('name')),
+    }
+    return {field: key for field, key in keys.items() if key}
+
+class BusinessFingerprintIndex:
+    """Dict per fingerprint -> positions of the businesses carrying it
+    
+    Two shared fingerprints mark a duplicate; one marks a possible duplicate,
+    since one owner often runs a hostel and a shuttle under one number. A
+    shared name alone counts only within one town, and not even there when
+    the phone or address differs: chain stores (Dollar General, Food Lion)
+    share a name across towns but are different businesses.
+    """
+    
+    def __init__(self):
+        self.entries: List[Tuple[str, Dict]] = []
+        self.keys: Dict[str, Dict[str, List[int]]] = {field: {} for field in FINGERPRINT_FIELDS}
+        
+    def __len__(self) -> int:
+        return len(self.entries)
+        
+    def add(self, business: Dict, town: str) -> int:
+        """Index a business under its town; returns its position"""
+        position = len(self.entries)
+        self.entries.append((town, business))
+        for field, key in fingerprints(business).items():
+            self.keys[field].setdefault(key, []).append(position)
+        return position
+        
+    @staticmethod
+    def _contradicts(prints: Dict[str, str], other: Dict[str, str]) -> bool:
+        """Whether both businesses have a phone or address and it differs"""
+        return any(field in prints and field in other and prints[field] != other[field]
+                   for field in ('phone', 'address'))
+        
+    def lookup(self, business: Dict, town: Optional[str] = None) -> List[Dict]:
+        """Indexed businesses sharing at least one fingerprint, strongest first, then in insertion order
+        
+        Name-only matches are returned only for businesses indexed under town.
+        """
+        prints = fingerprints(business)
+        shared: Dict[int, List[str]] = {}
+        for field, key in prints.items():
+            for position in self.keys[field].get(key, ()):
+                shared.setdefault(position, []).append(field)
+                
+        matches = []
+        for position, fields in shared.items():
+            existing_town, existing = self.entries[position]
+            if fields == ['name'] and (existing_town != town or self._contradicts(prints, fingerprints(existing))):
+                continue
+            matches.append({
+                'index': position,
+                'town': existing_town,
+                'business': existing,
+                'matchedOn': fields,
+                'duplicate': len(fields) >= 2,
+            })
+        matches.sort(key=lambda m: (not m['duplicate'], -len(m['matchedOn']), m['index']))
+        return matches
+        
+    def find_duplicate(self, business: Dict) -> Optional[Dict]:
+        """Strongest match that counts as a duplicate, or None"""
+        for match in self.lookup(business):
+            if match['duplicate']:
+                return match
+        return None
+
+def load_contacts(path: Path) -> List[Tuple[str, List[Dict]]]:
+    """(resupplyId, businesses) groups of contacts.ts, in file order"""
+    _, exports = load_module(path)
+    return [
+        (group['resupplyId'], [business.scalars() for business in group.get('businesses', [])])
+        for group in exports.get('resupplyContacts', [])
+    ]
+
+def find_cross_town_duplicates(contacts: List[Tuple[str, List[Dict]]]) -> List[Dict]:
+    """Every business matching one listed earlier, in a single pass over all towns"""
+    index = BusinessFingerprintIndex()
+    found = []
+    for town, businesses in contacts:
+        for business in businesses:
+            for match in index.lookup(business, town):
+                found.append({
+                    'town': town,
+                    'id': business.get('id'),
+                    'name': business.get('name'),
+                    'matchTown': match['town'],
+                    'matchId': match['business'].get('id'),
+                    'matchName': match['business'].get('name'),
+                    'matchedOn': match['matchedOn'],
+                    'duplicate': match['duplicate'],
+                    'sameTown': match['town'] == town,
+                })
+            index.add(business, town)
+    return found
+
+def main():
+    """Main execution"""
+    script_dir = Path(__file__).parent
+    backend_dir = script_dir.parent
+    contacts_file = backend_dir.parent / "webapp" / "src" / "data" / "contacts.ts"
+    
+    contacts = load_contacts(contacts_file)
+    total = sum(len(businesses) for _, businesses in contacts)
+    found = find_cross_town_duplicates(contacts)
+    duplicates = [f for f in found if f['duplicate']]
+    
+    logger.info(f"Indexed {total} businesses in {len(contacts)} towns")
+    logger.info(f"Duplicates: {len(duplicates)} ({sum(not f['sameTown'] for f in duplicates)} across towns), "
+                f"possible duplicates: {len(found) - len(duplicates)}")
+    for f in duplicates[:10]:
+        logger.info(f"  {f['town']}: {f['name']} == {f['matchTown']}: {f['matchName']} ({', '.join(f['matchedOn'])})")
+        
+    output_file = backend_dir / "data" / "extracted" / "business_duplicates.json"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    write_if_changed(output_file, json.dumps({'businesses': total, 'towns': len(contacts), 'matches': found}, indent=2))
+    logger.info(f"Saved duplicate report to {output_file}")
+
+if __name__ == "__main__":
+    main()
@@ -5,22 +5,43 @@ Uses interpolation between known waypoints for accurate trail miles
 """
 
 import json
-import re
 import math
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 import logging
 
+import numpy as np
+
+from geo_index import haversine_miles
+from state_index import default_state_index
+from trail_constants import official_trail_length
+from ts_literal import iter_records, parse_module
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Radius (miles) of references considered for interpolation
+REFERENCE_RADIUS = 5.0
+
+# Distance (miles) within which a point takes its closest reference's mile as is
+SNAP_DISTANCE = 0.1
+
+# Slack between vectorized and scalar haversine; points whose result could change
+# inside it (near ties, radius and snap boundaries, rounding halves) are redone exactly
+DISTANCE_SLACK = 1e-6
+ROUNDING_SLACK = 1e-6
+
+# Points per block of the vectorized point x reference distance matrix
+POINT_BLOCK = 256
+
 class MileCalibrator:
     """Calibrate mile markers using known reference waypoints"""
     
     def __init__(self, webapp_data_dir: str):
         self.webapp_data_dir = Path(webapp_data_dir)
         self.reference_waypoints = []
-        self.TRAIL_LENGTH = 2197.4
+        self.reference_miles: Optional[np.ndarray] = None
+        self.TRAIL_LENGTH = official_trail_length()
         
     def load_reference_waypoints(self):
         """Load known waypoints from existing TypeScript files"""
@@ -46,29 +67,25 @@ class MileCalibrator:
         
         # Sort by mile marker
         self.reference_waypoints.sort(key=lambda x: x['mile'])
+        self.reference_miles = None
         
         logger.info(f"Loaded {len(self.reference_waypoints)} reference waypoints")
     
     def _parse_typescript_waypoints(self, content: str):
         """Parse waypoints from TypeScript file"""
-        objects = re.finditer(r'\{([^}]+)\}', content, re.DOTALL)
-        
-        for obj_match in objects:
-            obj_text = obj_match.group(1)
-            
-            # Extract fields
-            name_match = re.search(r'name:\s*["\']([^"\']+)["\']', obj_text)
-            mile_match = re.search(r'mile:\s*(\d+\.?\d*)', obj_text)
-            lat_match = re.search(r'lat:\s*(-?\d+\.?\d*)', obj_text)
-            lng_match = re.search(r'lng:\s*(-?\d+\.?\d*)', obj_text)
-            
-            if name_match and mile_match and lat_match and lng_match:
-                self.reference_waypoints.append({
-                    'name': name_match.group(1),
-                    'mile': float(mile_match.group(1)),
-                    'lat': float(lat_match.group(1)),
-                    'lng': float(lng_match.group(1))
-                })
+        for record in iter_records(parse_module(content)):
+            fields = [record.get(key) for key in ('name', 'mile', 'lat', 'lng')]
+            if not isinstance(fields[0], str) or not all(isinstance(v, (int, float)) for v in fields[1:]):
+                continue
+            if fields[1] < 0:
+                continue
+                
+            self.reference_waypoints.append({
+                'name': fields[0],
+                'mile': float(fields[1]),
+                'lat': float(fields[2]),
+                'lng': float(fields[3])
+            })
     
     def _haversine_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Calculate distance between two GPS points in miles"""
@@ -102,7 +119,7 @@ class MileCalibrator:
                 closest_ref = ref
         
         # If very close to a reference point, use its mile marker
-        if min_distance < 0.1:  # Within 0.1 miles
+        if min_distance < SNAP_DISTANCE:  # Within 0.1 miles
             mile = closest_ref['mile']
             state = self._determine_state(mile)
             return mile, state
@@ -115,7 +132,7 @@ class MileCalibrator:
             ref_distance = self._haversine_distance(lat, lon, ref['lat'], ref['lng'])
             
             # Check if this waypoint is roughly on the trail path
-            if ref_distance < 5.0:  # Within 5 miles
+            if ref_distance < REFERENCE_RADIUS:  # Within 5 miles
                 # Determine if before or after based on GPS position
                 if before_ref is None or ref['mile'] < closest_ref['mile']:
                     before_ref = ref
@@ -143,28 +160,94 @@ class MileCalibrator:
     
     def _determine_state(self, mile: float) -> str:
         """Determine state from mile marker"""
-        boundaries = [
-            ('GA', 0, 78.5),
-            ('NC', 78.5, 166.2),
-            ('TN', 166.2, 444.8),
-            ('VA', 444.8, 1033.0),
-            ('WV', 1000.7, 1026.0),
-            ('MD', 1026.0, 1070.0),
-            ('PA', 1070.0, 1298.0),
-            ('NJ', 1298.0, 1378.1),
-            ('NY', 1378.1, 1472.9),
-            ('CT', 1472.9, 1508.0),
-            ('MA', 1508.0, 1599.0),
-            ('VT', 1599.0, 1755.0),
-            ('NH', 1755.0, 1898.0),
-            ('ME', 1898.0, 2197.4),
-        ]
-        
-        for state, start, end in boundaries:
-            if start <= mile <= end:
-                return state
-        
-        return 'UNKNOWN'
+        return default_state_index().state_at(mile)
+    
+    def _build_reference_arrays(self):
+        """Mile-sorted reference columns, built once for batch calibration"""
+        self.reference_miles = np.array([ref['mile'] for ref in self.reference_waypoints])
+        self.reference_lats = np.array([ref['lat'] for ref in self.reference_waypoints])
+        self.reference_lngs = np.array([ref['lng'] for ref in self.reference_waypoints])
+    
+    def _calibrate_block(self, lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """find_calibrated_mile for a block of points at once
+        
+        Returns the unrounded miles, whether each was snapped to its closest
+        reference (and so is not rounded), and which points sit close enough
+        to a decision boundary that the scalar distances must settle them.
+        """
+        rows = np.arange(len(lats))
+        positions = np.arange(len(self.reference_miles))
+        distances = haversine_miles(lats[:, None], lons[:, None], self.reference_lats[None, :], self.reference_lngs[None, :])
+        
+        # Closest reference, first one winning ties as in the scalar scan
+        closest = distances.argmin(axis=1)
+        closest_distance = distances[rows, closest]
+        closest_miles = self.reference_miles[closest]
+        
+        # Near ties, except references sharing the closest one's coordinates (those tie exactly either way)
+        near = distances <= closest_distance[:, None] + DISTANCE_SLACK
+        elsewhere = ((self.reference_lats[None, :] != self.reference_lats[closest][:, None])
+                     | (self.reference_lngs[None, :] != self.reference_lngs[closest][:, None]))
+        ambiguous = np.any(near & elsewhere, axis=1)
+        ambiguous |= np.abs(closest_distance - SNAP_DISTANCE) <= DISTANCE_SLACK
+        ambiguous |= np.any(np.abs(distances - REFERENCE_RADIUS) <= DISTANCE_SLACK, axis=1)
+        
+        # The scan keeps the first reference within the radius as after_ref, and the
+        # last one before the closest reference's mile (else that first one) as before_ref
+        within = distances < REFERENCE_RADIUS
+        has_within = within.any(axis=1)
+        first = within.argmax(axis=1)
+        last_within = np.maximum.accumulate(np.where(within, positions, -1), axis=1)
+        # References are mile-sorted, so the ones before the closest reference's mile are a prefix
+        cut = np.searchsorted(self.reference_miles, closest_miles, side='left')
+        earlier = np.where(cut > 0, last_within[rows, np.maximum(cut - 1, 0)], -1)
+        before = np.where(earlier >= 0, earlier, first)
+        after = first
+        
+        to_before = distances[rows, before]
+        to_after = distances[rows, after]
+        total = to_before + to_after
+        ratio = np.divide(to_before, total, out=np.zeros_like(total), where=total > 0)
+        before_miles = self.reference_miles[before]
+        interpolated = before_miles + ratio * (self.reference_miles[after] - before_miles)
+        interpolated = np.where(has_within & (total > 0), interpolated, closest_miles)
+        
+        snapped = closest_distance < SNAP_DISTANCE
+        tenths = interpolated * 10
+        ambiguous |= ~snapped & (np.abs(tenths - np.floor(tenths) - 0.5) < ROUNDING_SLACK)
+        
+        return np.where(snapped, closest_miles, interpolated), snapped, ambiguous
+    
+    def find_calibrated_miles(self, lats, lons) -> List[Tuple[float, str]]:
+        """Batch find_calibrated_mile over many coordinates
+        
+        Distances to every reference, the closest/before/after selection
+        (np.searchsorted on the mile-sorted references) and the interpolation
+        run as array operations over blocks of points. The few points whose
+        result could flip on the last bits of a distance go through
+        find_calibrated_mile, so the output matches it exactly.
+        """
+        if not self.reference_waypoints:
+            return [(0.0, 'UNKNOWN')] * len(lats)
+        
+        if self.reference_miles is None:
+            self._build_reference_arrays()
+        
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        miles = np.zeros(len(lats))
+        snapped = np.zeros(len(lats), dtype=bool)
+        ambiguous = np.zeros(len(lats), dtype=bool)
+        for start in range(0, len(lats), POINT_BLOCK):
+            block = slice(start, start + POINT_BLOCK)
+            miles[block], snapped[block], ambiguous[block] = self._calibrate_block(lats[block], lons[block])
+        
+        results = [float(mile) if snap else round(float(mile), 1) for mile, snap in zip(miles, snapped)]
+        for i in np.flatnonzero(ambiguous):
+            results[i] = self.find_calibrated_mile(float(lats[i]), float(lons[i]))[0]
+        
+        # States for the whole batch in one vectorized lookup
+        return list(zip(results, default_state_index().label(results)))
     
     def calibrate_waypoints(self, waypoints: List[Dict]) -> List[Dict]:
         """Calibrate mile markers for all waypoints"""
@@ -172,19 +255,16 @@ class MileCalibrator:
         
         calibrated_count = 0
         
-        for waypoint in waypoints:
-            lat = waypoint.get('lat')
-            lon = waypoint.get('lng')
-            
-            if lat and lon:
-                mile, state = self.find_calibrated_mile(lat, lon)
-                
-                # Only update if we got a reasonable mile marker
-                if mile > 0:
-                    waypoint['mile'] = mile
-                    waypoint['soboMile'] = round(self.TRAIL_LENGTH - mile, 1)
-                    waypoint['state'] = state
-                    calibrated_count += 1
+        located = [waypoint for waypoint in waypoints if waypoint.get('lat') and waypoint.get('lng')]
+        calibrated = self.find_calibrated_miles([waypoint['lat'] for waypoint in located], [waypoint['lng'] for waypoint in located])
+        
+        for waypoint, (mile, state) in zip(located, calibrated):
+            # Only update if we got a reasonable mile marker
+            if mile > 0:
+                waypoint['mile'] = mile
+                waypoint['soboMile'] = round(self.TRAIL_LENGTH - mile, 1)
+                waypoint['state'] = state
+                calibrated_count += 1
         
         logger.info(f"Calibrated {calibrated_count} waypoint mile markers")
         return waypoints
@@ -195,18 +275,15 @@ class MileCalibrator:
         
         calibrated_count = 0
         
-        for town in towns:
-            lat = town.get('lat')
-            lon = town.get('lng')
-            
-            if lat and lon:
-                mile, state = self.find_calibrated_mile(lat, lon)
-                
-                if mile > 0:
-                    town['mile'] = mile
-                    town['soboMile'] = round(self.TRAIL_LENGTH - mile, 1)
-                    town['state'] = state
-                    calibrated_count += 1
+        located = [town for town in towns if town.get('lat') and town.get('lng')]
+        calibrated = self.find_calibrated_miles([town['lat'] for town in located], [town['lng'] for town in located])
+        
+        for town, (mile, state) in zip(located, calibrated):
+            if mile > 0:
+                town['mile'] = mile
+                town['soboMile'] = round(self.TRAIL_LENGTH - mile, 1)
+                town['state'] = state
+                calibrated_count += 1
         
         logger.info(f"Calibrated {calibrated_count} town mile markers")
         return towns
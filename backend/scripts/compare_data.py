@@ -11,6 +11,8 @@ from typing import Dict, List, Set, Any
 from dataclasses import dataclass
 import logging
 
+from name_index import TokenIndex
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -76,6 +78,28 @@ class DataComparator:
         logger.info(f"Loaded {len(data)} items from {filename}")
         return data
     
+    def find_similar_names(self, names: Set[str], existing_names: Set[str], min_score: float = 0.5) -> List[tuple]:
+        """(name, closest existing name, score) for new names that look like renamed existing ones"""
+        existing_list = sorted(existing_names)
+        index = TokenIndex(existing_list)
+        
+        similar = []
+        for name in sorted(names):
+            match = index.best_match(name, min_score)
+            if match:
+                similar.append((name, existing_list[match[0]], match[1]))
+        return similar
+    
+    def _report_similar(self, similar: List[tuple]):
+        """Append the possible-match section of a comparison"""
+        if not similar:
+            return
+        self.report.append("\nPossible Matches (similar to existing names):")
+        for name, existing_name, score in similar[:20]:
+            self.report.append(f"  - {name} ~ {existing_name} ({score:.2f})")
+        if len(similar) > 20:
+            self.report.append(f"  ... and {len(similar) - 20} more")
+    
     def compare_waypoints(self) -> ComparisonStats:
         """Compare waypoint data"""
         logger.info("Comparing waypoints...")
@@ -114,6 +138,8 @@ class DataComparator:
             if len(new_waypoints) > 20:
                 self.report.append(f"  ... and {len(new_waypoints) - 20} more")
         
+        self._report_similar(self.find_similar_names(new_waypoints, existing_names))
+        
         return stats
     
     def compare_towns(self) -> ComparisonStats:
@@ -153,6 +179,8 @@ class DataComparator:
             if len(new_towns) > 20:
                 self.report.append(f"  ... and {len(new_towns) - 20} more")
         
+        self._report_similar(self.find_similar_names(new_towns, existing_names))
+        
         return stats
     
     def analyze_data_quality(self, data: List[Dict]) -> Dict[str, Any]:
@@ -12,11 +12,18 @@ import logging
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass, asdict, field
-import xml.etree.ElementTree as ET
+
+from geo_index import haversine_miles
+from gpx_track import GpxTrack
+from state_index import default_state_index
+from trail_constants import official_trail_length
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Ground distance (miles) within which a GPX waypoint counts as the same place
+GPX_MATCH_RADIUS = 0.7
+
 @dataclass
 class Business:
     """Business establishment details"""
@@ -109,9 +116,9 @@ class ComprehensiveExtractor:
         self.gpx_path = Path(gpx_path)
         self.waypoints: List[Waypoint] = []
         self.towns: List[TownData] = []
-        self.gpx_data = {}
+        self.gpx_track: Optional[GpxTrack] = None
         self.icon_templates = {}
-        self.TRAIL_LENGTH = 2197.4
+        self.TRAIL_LENGTH = official_trail_length()
         
         # Load icon mappings
         self.icon_mappings = self._create_icon_mappings()
@@ -155,30 +162,10 @@ class ComprehensiveExtractor:
         logger.info(f"Loading GPX data from {self.gpx_path}")
         
         try:
-            tree = ET.parse(self.gpx_path)
-            root = tree.getroot()
-            
-            ns = {'gpx': 'http://www.topografix.com/GPX/1/1'}
+            # Shared loader builds (or restores) the geohash and name indexes once
+            self.gpx_track = GpxTrack(str(self.gpx_path)).load(cache_path=f"{self.gpx_path}.cache.npz")
             
-            # Extract waypoints
-            for wpt in root.findall('.//gpx:wpt', ns):
-                lat = float(wpt.get('lat'))
-                lon = float(wpt.get('lon'))
-                
-                name_elem = wpt.find('gpx:name', ns)
-                ele_elem = wpt.find('gpx:ele', ns)
-                
-                name = name_elem.text if name_elem is not None else None
-                elevation = float(ele_elem.text) if ele_elem is not None else None
-                
-                if name:
-                    self.gpx_data[name.lower()] = {
-                        'lat': lat,
-                        'lon': lon,
-                        'elevation': elevation
-                    }
-            
-            logger.info(f"Loaded {len(self.gpx_data)} waypoints from GPX")
+            logger.info(f"Loaded {len(self.gpx_track.waypoints)} waypoints from GPX")
             
         except Exception as e:
             logger.error(f"Error loading GPX: {e}")
@@ -408,7 +395,7 @@ class ComprehensiveExtractor:
             next_south, next_north = self._parse_direction_arrows(line)
             
             # Enhance with GPX data
-            gpx_point = self._find_closest_gpx_point(lat, lng)
+            gpx_point = self._find_closest_gpx_point(lat, lng, name)
             if gpx_point and gpx_point.get('elevation'):
                 elevation = int(gpx_point['elevation'] * 3.28084)
             
@@ -755,43 +742,22 @@ class ComprehensiveExtractor:
         
         return next_south, next_north
     
-    def _find_closest_gpx_point(self, target_lat: float, target_lon: float) -> Optional[Dict]:
-        """Find closest GPX point to given coordinates"""
-        min_distance = float('inf')
-        closest = None
+    def _find_closest_gpx_point(self, target_lat: float, target_lon: float, name: Optional[str] = None) -> Optional[Dict]:
+        """GPX waypoint named like the target within range, else the closest one"""
+        if self.gpx_track is None:
+            return None
         
-        for name, data in self.gpx_data.items():
-            dist = ((data['lat'] - target_lat) ** 2 + (data['lon'] - target_lon) ** 2) ** 0.5
-            if dist < min_distance:
-                min_distance = dist
-                closest = data
+        if name:
+            # A same-named waypoint wins over whichever point happens to be closest
+            named = self.gpx_track.waypoints.lookup(name)
+            if named and haversine_miles(target_lat, target_lon, named['lat'], named['lon']) <= GPX_MATCH_RADIUS:
+                return named
         
-        return closest if min_distance < 0.01 else None
+        return self.gpx_track.waypoints.nearest(target_lat, target_lon, GPX_MATCH_RADIUS)
     
     def _determine_state_from_mile(self, mile: float) -> str:
         """Determine state from mile marker"""
-        boundaries = [
-            ('GA', 0, 78.5),
-            ('NC', 78.5, 166.2),
-            ('TN', 166.2, 444.8),
-            ('VA', 444.8, 1033.0),
-            ('WV', 1000.7, 1026.0),
-            ('MD', 1026.0, 1070.0),
-            ('PA', 1070.0, 1298.0),
-            ('NJ', 1298.0, 1378.1),
-            ('NY', 1378.1, 1472.9),
-            ('CT', 1472.9, 1508.0),
-            ('MA', 1508.0, 1599.0),
-            ('VT', 1599.0, 1755.0),
-            ('NH', 1755.0, 1898.0),
-            ('ME', 1898.0, 2197.4),
-        ]
-        
-        for state, start, end in boundaries:
-            if start <= mile <= end:
-                return state
-        
-        return 'UNKNOWN'
+        return default_state_index().state_at(mile)
     
     def save_comprehensive_data(self, output_dir: str):
         """Save all extracted data"""
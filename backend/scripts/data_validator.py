@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Columnar rule-based validation of the trail datasets
+Loads shelters, features and resupply points into parallel numpy arrays and
+evaluates every rule as a vectorized pass; writes JSON findings and exits
+nonzero when any error-level rule fails
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+import numpy as np
+
+from atomic_write import write_if_changed
+from geo_index import haversine_miles
+from gpx_track import GpxTrack
+from trail_constants import load_state_boundaries, official_trail_length
+from ts_records import load_ts_records
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Tolerances (miles)
+MILE_TOLERANCE = 0.05
+STATE_BAND_TOLERANCE = 0.5
+
+# Max straight-line distance from the track by record type; resupply uses its distanceFromTrail
+ON_TRAIL_LIMITS = {'shelter': 0.75, 'feature': 1.0}
+OFF_TRAIL_SLACK = 0.5
+
+# Track vertices compared per block in the nearest-vertex pass
+DISTANCE_BLOCK = 256
+
+class ColumnarDataset:
+    """Records from several sources as parallel arrays"""
+    
+    def __init__(self, records: List[Dict], sources: List[str]):
+        self.size = len(records)
+        self.source = np.array(sources, dtype=object)
+        self.id = np.array([r.get('id', '') for r in records], dtype=object)
+        self.name = np.array([r.get('name', '') for r in records], dtype=object)
+        self.type = np.array([r.get('type', '') for r in records], dtype=object)
+        self.state = np.array([r.get('state', '') for r in records], dtype=object)
+        self.mile = self._floats(records, 'mile')
+        self.sobo_mile = self._floats(records, 'soboMile')
+        self.lat = self._floats(records, 'lat')
+        self.lng = self._floats(records, 'lng')
+        self.distance_from_trail = self._floats(records, 'distanceFromTrail')
+        
+    @staticmethod
+    def _floats(records: List[Dict], field: str) -> np.ndarray:
+        """Numeric column with NaN for missing values"""
+        return np.array([r.get(field) if isinstance(r.get(field), (int, float)) else np.nan for r in records],
+                        dtype=np.float64)
+                        
+    @classmethod
+    def from_sources(cls, sources: Dict[str, List[Dict]]) -> 'ColumnarDataset':
+        """Concatenate named record lists, keeping file order within each"""
+        records = []
+        labels = []
+        for label, items in sources.items():
+            records.extend(items)
+            labels.extend([label] * len(items))
+        return cls(records, labels)
+
+class DataValidator:
+    """Evaluate the rule set over a ColumnarDataset"""
+    
+    def __init__(self, dataset: ColumnarDataset, trail_length: Optional[float] = None,
+                 state_boundaries: Optional[List] = None, track: Optional[GpxTrack] = None):
+        self.data = dataset
+        self.trail_length = trail_length if trail_length is not None else official_trail_length()
+        self.state_boundaries = state_boundaries if state_boundaries is not None else load_state_boundaries()
+        self.track = track
+        self.findings: List[Dict] = []
+        self.rules = [
+            self.check_duplicate_ids,
+            self.check_sobo_miles,
+            self.check_state_bands,
+            self.check_monotonic_miles,
+            self.check_on_trail,
+            self.check_identical_coordinates,
+        ]
+        
+    def _add(self, rule: str, severity: str, indices, message: str, values=None):
+        """Record one finding per index"""
+        for n, i in enumerate(indices):
+            self.findings.append({
+                'rule': rule,
+                'severity': severity,
+                'source': self.data.source[i],
+                'id': self.data.id[i],
+                'name': self.data.name[i],
+                'message': message,
+                'value': None if values is None else round(float(values[n]), 3),
+            })
+            
+    def check_duplicate_ids(self):
+        """Every id is unique across all sources"""
+        _, inverse, counts = np.unique(self.data.id.astype(str), return_inverse=True, return_counts=True)
+        duplicated = np.flatnonzero(counts[inverse] > 1)
+        self._add('duplicate-id', 'error', duplicated, 'id is used by more than one record')
+        
+    def check_sobo_miles(self):
+        """soboMile + mile == TRAIL_LENGTH"""
+        total = self.data.mile + self.data.sobo_mile
+        bad = np.flatnonzero(np.abs(total - self.trail_length) > MILE_TOLERANCE)
+        self._add('sobo-mile', 'error', bad, f'mile + soboMile != {self.trail_length}', total[bad])
+        
+    def check_state_bands(self):
+        """Declared state's mile band contains the record's mile"""
+        starts = {state: start for state, start, _ in self.state_boundaries}
+        ends = {state: end for state, _, end in self.state_boundaries}
+        first_state = self.state_boundaries[0][0] if self.state_boundaries else None
+        
+        band_start = np.array([starts.get(s, np.nan) for s in self.data.state], dtype=np.float64)
+        band_end = np.array([ends.get(s, np.nan) for s in self.data.state], dtype=np.float64)
+        # The approach trail (negative miles) belongs to the first state
+        band_start = np.where((self.data.state == first_state) & (self.data.mile < 0), -np.inf, band_start)
+        
+        unknown = np.flatnonzero(np.isnan(band_start) & ~np.isnan(self.data.mile))
+        self._add('state-band', 'error', unknown, 'state is not in STATE_BOUNDARIES')
+        
+        outside = (self.data.mile < band_start - STATE_BAND_TOLERANCE) | (self.data.mile > band_end + STATE_BAND_TOLERANCE)
+        bad = np.flatnonzero(outside)
+        self._add('state-band', 'error', bad, "mile is outside the declared state's band", self.data.mile[bad])
+        
+    def check_monotonic_miles(self):
+        """Miles never decrease between consecutive records of one state in a file"""
+        same_group = (self.data.source[1:] == self.data.source[:-1]) & (self.data.state[1:] == self.data.state[:-1])
+        drops = np.diff(self.data.mile)
+        bad = np.flatnonzero(same_group & (drops < -MILE_TOLERANCE)) + 1
+        self._add('monotonic-mile', 'error', bad, 'mile is lower than the previous record of the same state', drops[bad - 1])
+        
+    def nearest_track_distance(self, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        """Distance (miles) from each point to the nearest track vertex, in blocked vectorized passes"""
+        result = np.full(len(lats), np.nan)
+        for start in range(0, len(lats), DISTANCE_BLOCK):
+            block = slice(start, start + DISTANCE_BLOCK)
+            distances = haversine_miles(lats[block, None], lngs[block, None], self.track.lats[None, :], self.track.lons[None, :])
+            result[block] = distances.min(axis=1)
+        return result
+        
+    def check_on_trail(self):
+        """Coordinates lie within the allowed distance of the track"""
+        if self.track is None:
+            return
+            
+        limits = np.array([ON_TRAIL_LIMITS.get(t, np.nan) for t in self.data.type], dtype=np.float64)
+        limits = np.where(np.isnan(limits), self.data.distance_from_trail + OFF_TRAIL_SLACK, limits)
+        
+        # Approach-trail records are not on the Springer-Katahdin track
+        checked = np.flatnonzero(~np.isnan(limits) & ~np.isnan(self.data.lat) & (self.data.mile >= 0))
+        distances = self.nearest_track_distance(self.data.lat[checked], self.data.lng[checked])
+        far = distances > limits[checked]
+        self._add('on-trail', 'warning', checked[far], 'coordinates are farther from the track than allowed', distances[far])
+        
+    def check_identical_coordinates(self):
+        """Distinct places should not share exactly the same coordinates"""
+        located = np.flatnonzero(~np.isnan(self.data.lat) & ~np.isnan(self.data.lng))
+        coords = np.round(np.column_stack((self.data.lat[located], self.data.lng[located])), 5)
+        _, inverse, counts = np.unique(coords, axis=0, return_inverse=True, return_counts=True)
+        inverse = inverse.ravel()
+        
+        shared = located[counts[inverse] > 1]
+        groups = inverse[counts[inverse] > 1]
+        names = np.array([str(n).lower() for n in self.data.name[shared]], dtype=object)
+        
+        # Only flag groups that contain more than one distinct name
+        flagged = [i for i, g in zip(shared, groups) if len(set(names[groups == g])) > 1]
+        self._add('identical-coordinates', 'warning', flagged, 'coordinates are identical to another named record')
+        
+    def run(self) -> Dict:
+        """Evaluate all rules and summarize"""
+        started = time.perf_counter()
+        self.findings = []
+        for rule in self.rules:
+            rule()
+            
+        errors = sum(1 for f in self.findings if f['severity'] == 'error')
+        by_rule: Dict[str, int] = {}
+        for finding in self.findings:
+            by_rule[finding['rule']] = by_rule.get(finding['rule'], 0) + 1
+            
+        return {
+            'summary': {
+                'records': self.data.size,
+                'errors': errors,
+                'warnings': len(self.findings) - errors,
+                'byRule': by_rule,
+                'elapsedMs': round((time.perf_counter() - started) * 1000, 1),
+            },
+            'findings': self.findings,
+        }
+
+def main():
+    """Main execution"""
+    script_dir = Path(__file__).parent
+    backend_dir = script_dir.parent
+    webapp_data_dir = backend_dir.parent / "webapp" / "src" / "data"
+    
+    dataset = ColumnarDataset.from_sources({
+        name: load_ts_records(webapp_data_dir / name)
+        for name in ('shelters.ts', 'features.ts', 'resupply.ts')
+    })
+    track = GpxTrack(str(webapp_data_dir / "at-elevation.gpx")).load()
+    
+    results = DataValidator(dataset, track=track).run()
+    summary = results['summary']
+    logger.info(f"Validated {summary['records']} records in {summary['elapsedMs']} ms: "
+                f"{summary['errors']} errors, {summary['warnings']} warnings")
+    for rule, count in sorted(summary['byRule'].items()):
+        logger.info(f"  {rule}: {count}")
+        
+    output_file = backend_dir / "data" / "extracted" / "validation_findings.json"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    write_if_changed(output_file, json.dumps(results, indent=2))
+    logger.info(f"Saved findings to {output_file}")
+    
+    sys.exit(1 if summary['errors'] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Offline DEM elevation sampler
+Reads SRTM .hgt tiles from disk (memory-mapped), bilinearly samples elevation
+for track points and waypoints in vectorized batches, writes the sampled
+elevation of every track point and every web app record (by id), and reports
+the delta against each existing elevation source; source values that are
+really meters are detected against the DEM and converted before comparing
+"""
+
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from atomic_write import write_if_changed
+from gpx_track import GpxTrack
+from ts_records import load_ts_records
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+METERS_TO_FEET = 3.28084
+
+# SRTM no-data marker
+HGT_VOID = -32768
+
+# Points sampled per tile read
+SAMPLE_CHUNK = 100000
+
+# Web app data files whose records carry an elevation
+WAYPOINT_FILES = ('shelters.ts', 'features.ts', 'resupply.ts')
+
+HGT_NAME = re.compile(r'^([NS])(\d{2})([EW])(\d{3})\.hgt$', re.IGNORECASE)
+
+class DemTileSet:
+    """Directory of 1x1 degree SRTM .hgt tiles, opened lazily as memmaps"""
+    
+    def __init__(self, dem_dir: str):
+        self.dem_dir = Path(dem_dir)
+        self.paths: Dict[Tuple[int, int], Path] = {}
+        self._tiles: Dict[Tuple[int, int], np.memmap] = {}
+        
+        for path in sorted(self.dem_dir.glob('*')):
+            match = HGT_NAME.match(path.name)
+            if not match:
+                continue
+            ns, lat, ew, lon = match.groups()
+            key = (int(lat) * (1 if ns.upper() == 'N' else -1), int(lon) * (1 if ew.upper() == 'E' else -1))
+            self.paths[key] = path
+            
+        logger.info(f"Found {len(self.paths)} DEM tiles in {self.dem_dir}")
+        
+    def _tile(self, key: Tuple[int, int]) -> Optional[np.memmap]:
+        """Memory-map a tile (big-endian int16, square, north row first)"""
+        if key not in self._tiles:
+            path = self.paths.get(key)
+            if path is None:
+                return None
+            size = int(round(np.sqrt(path.stat().st_size // 2)))
+            self._tiles[key] = np.memmap(path, dtype='>i2', mode='r', shape=(size, size))
+        return self._tiles[key]
+        
+    def sample(self, lats, lons) -> np.ndarray:
+        """Bilinear elevation in meters; NaN where no tile covers the point or a corner is void"""
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        result = np.full(len(lats), np.nan)
+        
+        # Group points by tile so each memmap is touched once per chunk
+        tile_lats = np.floor(lats).astype(np.int64)
+        tile_lons = np.floor(lons).astype(np.int64)
+        keys = (tile_lats << 32) + (tile_lons & 0xFFFFFFFF)
+        order = np.argsort(keys, kind='stable')
+        unique_keys, starts = np.unique(keys[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        
+        for key, start, end in zip(unique_keys, starts, ends):
+            members = order[start:end]
+            tile = self._tile((int(tile_lats[members[0]]), int(tile_lons[members[0]])))
+            if tile is None:
+                continue
+                
+            for chunk_start in range(0, len(members), SAMPLE_CHUNK):
+                chunk = members[chunk_start:chunk_start + SAMPLE_CHUNK]
+                result[chunk] = self._bilinear(tile, lats[chunk] - tile_lats[chunk], lons[chunk] - tile_lons[chunk])
+                
+        return result
+        
+    def _bilinear(self, tile: np.memmap, frac_lats: np.ndarray, frac_lons: np.ndarray) -> np.ndarray:
+        """Interpolate within one tile from fractional offsets of its south-west corner"""
+        size = tile.shape[0]
+        rows = (1.0 - frac_lats) * (size - 1)
+        cols = frac_lons * (size - 1)
+        
+        r0 = np.clip(np.floor(rows).astype(np.int64), 0, size - 2)
+        c0 = np.clip(np.floor(cols).astype(np.int64), 0, size - 2)
+        dr = rows - r0
+        dc = cols - c0
+        
+        corners = np.stack((tile[r0, c0], tile[r0, c0 + 1], tile[r0 + 1, c0], tile[r0 + 1, c0 + 1])).astype(np.float64)
+        corners[corners == HGT_VOID] = np.nan
+        
+        top = corners[0] * (1 - dc) + corners[1] * dc
+        bottom = corners[2] * (1 - dc) + corners[3] * dc
+        return top * (1 - dr) + bottom * dr
+        
+    def sample_feet(self, lats, lons) -> np.ndarray:
+        """Bilinear elevation in feet"""
+        return self.sample(lats, lons) * METERS_TO_FEET
+
+def elevation_deltas(dem_feet: np.ndarray, source_feet: np.ndarray, names: List[str], top: int = 20) -> Dict:
+    """Summary of (source - DEM) differences in feet for one source"""
+    valid = ~np.isnan(dem_feet) & ~np.isnan(source_feet)
+    report = {
+        'points': len(source_feet),
+        'sampled': int(valid.sum()),
+    }
+    if not valid.any():
+        return report
+        
+    delta = source_feet[valid] - dem_feet[valid]
+    abs_delta = np.abs(delta)
+    valid_idx = np.flatnonzero(valid)
+    worst = np.argsort(-abs_delta, kind='stable')[:top]
+    
+    report.update({
+        'meanDelta': round(float(delta.mean()), 1),
+        'medianAbsDelta': round(float(np.median(abs_delta)), 1),
+        'p95AbsDelta': round(float(np.percentile(abs_delta, 95)), 1),
+        'maxAbsDelta': round(float(abs_delta.max()), 1),
+        # ~0.30 means the source is really in meters, ~1.0 means feet
+        'medianRatio': round(float(np.median(source_feet[valid] / np.maximum(dem_feet[valid], 1.0))), 2),
+        'worst': [
+            {
+                'name': names[valid_idx[i]],
+                'source': round(float(source_feet[valid_idx[i]])),
+                'dem': round(float(dem_feet[valid_idx[i]])),
+                'delta': round(float(delta[i])),
+            }
+            for i in worst
+        ],
+    })
+    return report
+
+def normalize_units(source: np.ndarray, dem_feet: np.ndarray) -> Tuple[np.ndarray, List[Optional[str]]]:
+    """Source elevations in feet, and the unit each value was read in ('ft', 'm', or None without DEM coverage)
+    
+    A value is taken as meters when converting it lands closer to the DEM
+    than reading it as feet does; uncovered values are left as feet.
+    """
+    source = np.asarray(source, dtype=np.float64)
+    covered = ~np.isnan(dem_feet) & ~np.isnan(source)
+    meters = covered & (np.abs(source * METERS_TO_FEET - dem_feet) < np.abs(source - dem_feet))
+    units = [None if not c else 'm' if m else 'ft' for c, m in zip(covered, meters)]
+    return np.where(meters, source * METERS_TO_FEET, source), units
+
+def load_waypoints(data_dir: Path) -> List[Dict]:
+    """Records with coordinates from the web app data files, tagged with their file"""
+    waypoints = []
+    for filename in WAYPOINT_FILES:
+        path = data_dir / filename
+        if not path.exists():
+            logger.warning(f"Skipping {filename}: not found")
+            continue
+        waypoints.extend(
+            dict(record, file=filename) for record in load_ts_records(path)
+            if isinstance(record.get('lat'), (int, float)) and isinstance(record.get('lng'), (int, float))
+        )
+    return waypoints
+
+def waypoint_elevations(waypoints: List[Dict], dem_feet: np.ndarray, source_feet: np.ndarray,
+                        units: List[Optional[str]]) -> Dict[str, Dict]:
+    """Sampled elevation of each record by id, with its declared value and the unit it was read in"""
+    result = {}
+    for wp, dem, feet, unit in zip(waypoints, dem_feet, source_feet, units):
+        entry = {
+            'file': wp['file'],
+            'name': wp.get('name'),
+            'dem': None if np.isnan(dem) else round(float(dem)),
+            'source': wp.get('elevation'),
+            'sourceUnit': unit,
+        }
+        if entry['dem'] is not None and not np.isnan(feet):
+            entry['delta'] = round(float(feet - dem))
+        result[wp['id']] = entry
+    return result
+
+def main():
+    """Main execution"""
+    script_dir = Path(__file__).parent
+    backend_dir = script_dir.parent
+    project_dir = backend_dir.parent
+    data_dir = backend_dir / "data"
+    dem_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else data_dir / "dem"
+    
+    if not dem_dir.exists():
+        logger.error(f"DEM directory not found: {dem_dir}")
+        return
+        
+    dem = DemTileSet(str(dem_dir))
+    report = {}
+    
+    # Elevation profile track (GPX elevations are meters)
+    track = GpxTrack(str(project_dir / "webapp" / "src" / "data" / "at-elevation.gpx")).load()
+    track_dem = dem.sample_feet(track.lats, track.lons)
+    names = [f"trkpt {i}" for i in range(len(track.lats))]
+    report['at-elevation.gpx'] = elevation_deltas(track_dem, track.elevations * METERS_TO_FEET, names)
+    
+    # Our records (declared in feet, though some were entered in meters)
+    waypoints = load_waypoints(project_dir / "webapp" / "src" / "data")
+    waypoint_dem = dem.sample_feet([wp['lat'] for wp in waypoints], [wp['lng'] for wp in waypoints])
+    declared = np.array([wp.get('elevation') for wp in waypoints], dtype=np.float64)
+    waypoint_feet, units = normalize_units(declared, waypoint_dem)
+    for filename in WAYPOINT_FILES:
+        in_file = np.array([wp['file'] == filename for wp in waypoints], dtype=bool)
+        if not in_file.any():
+            continue
+        summary = elevation_deltas(waypoint_dem[in_file], waypoint_feet[in_file],
+                                   [wp.get('name', wp['id']) for wp in waypoints if wp['file'] == filename])
+        summary['inMeters'] = sum(1 for wp, unit in zip(waypoints, units) if wp['file'] == filename and unit == 'm')
+        report[filename] = summary
+        
+    # Third-party waypoint files, where present (GPX elevations are meters)
+    for label, path in [
+        ('ATC', data_dir / "guymott_shelters" / "AT Shelters - Long Comments - Consecutive Names.gpx"),
+        ('tnlandforms', data_dir / "tnlandforms_shelters.gpx"),
+    ]:
+        if not path.exists():
+            logger.warning(f"Skipping {label}: {path} not found")
+            continue
+            
+        records = GpxTrack(str(path)).load().waypoints.records
+        with_ele = [wp for wp in records if wp['elevation'] is not None]
+        source_dem = dem.sample_feet([wp['lat'] for wp in with_ele], [wp['lon'] for wp in with_ele])
+        report[label] = elevation_deltas(
+            source_dem, np.array([wp['elevation'] for wp in with_ele]) * METERS_TO_FEET, [wp['name'] for wp in with_ele]
+        )
+        
+    for label, summary in report.items():
+        if summary['sampled']:
+            logger.info(f"{label}: {summary['sampled']}/{summary['points']} sampled, "
+                        f"median |delta| {summary['medianAbsDelta']} ft, max {summary['maxAbsDelta']} ft")
+        else:
+            logger.warning(f"{label}: no points covered by DEM tiles")
+            
+    output_dir = data_dir / "extracted"
+    elevations = {
+        'units': 'ft',
+        'waypoints': waypoint_elevations(waypoints, waypoint_dem, waypoint_feet, units),
+        # One entry per trkpt of at-elevation.gpx, in file order
+        'track': [None if np.isnan(e) else round(float(e)) for e in track_dem],
+    }
+    write_if_changed(output_dir / "dem_elevations.json", json.dumps(elevations, separators=(',', ':')))
+    write_if_changed(output_dir / "dem_elevation_report.json", json.dumps(report, indent=2))
+    
+    logger.info(f"Saved DEM elevations to {output_dir / 'dem_elevations.json'} "
+                f"and the delta report to {output_dir / 'dem_elevation_report.json'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Compact binary encoding of the elevation profile
+Quantizes the elevation profile to integer columns (mile x10, elevation in
+feet, lat/lng x1e5), stores each column as its first value plus Int16 deltas
+(Int32 when a delta does not fit), and writes the result as a base64 module
+that elevation.ts decodes into typed arrays (webapp/src/lib/elevationCodec.ts);
+every encode is decoded again and checked against the source points before
+anything is written
+"""
+
+import base64
+import re
+import struct
+import sys
+from pathlib import Path
+from typing import Dict, List
+import logging
+
+from atomic_write import write_if_changed
+from ts_literal import export_spans, format_literal, format_string, parse_module
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MAGIC = b'ATEL'
+VERSION = 1
+HEADER = struct.Struct('<4sHHI')      # magic, version, column count, point count
+COLUMN = struct.Struct('<iIB3x')      # first value, scale, delta width
+
+# Column -> scale; decoded values are the stored integers divided by the scale
+COLUMNS = (('mile', 10), ('elevation', 1), ('lat', 100000), ('lng', 100000))
+
+PROFILE_EXPORT = 'elevationProfile'
+DATA_EXPORT = 'ELEVATION_DATA'
+DATA_MODULE = 'elevation-data.ts'
+DECODER = 'decodeElevationProfile'
+
+INT16_RANGE = (-(1 << 15), (1 << 15) - 1)
+
+def _pad(data: bytes) -> bytes:
+    return data + b'\0' * (-len(data) % 4)
+
+def encode(profile: List[Dict]) -> bytes:
+    """Binary profile: header, column descriptors, then each column's padded deltas"""
+    descriptors = []
+    blocks = []
+    for name, scale in COLUMNS:
+        values = [round(point[name] * scale) for point in profile]
+        deltas = [b - a for a, b in zip(values, values[1:])]
+        fits_int16 = all(INT16_RANGE[0] <= d <= INT16_RANGE[1] for d in deltas)
+        width = 2 if fits_int16 else 4
+        descriptors.append(COLUMN.pack(values[0] if values else 0, scale, width))
+        blocks.append(_pad(struct.pack(f"<{len(deltas)}{'h' if fits_int16 else 'i'}", *deltas)))
+    return HEADER.pack(MAGIC, VERSION, len(COLUMNS), len(profile)) + b''.join(descriptors) + b''.join(blocks)
+
+def decode(data: bytes) -> List[Dict]:
+    """Points of a binary profile; whole values come back as ints, like the TS literal has them"""
+    magic, version, column_count, count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Unsupported elevation data ({magic!r} v{version})")
+        
+    columns = {}
+    offset = HEADER.size + column_count * COLUMN.size
+    for c in range(column_count):
+        first, scale, width = COLUMN.unpack_from(data, HEADER.size + c * COLUMN.size)
+        length = max(count - 1, 0)
+        deltas = struct.unpack_from(f"<{length}{'h' if width == 2 else 'i'}", data, offset)
+        offset += -(-length * width // 4) * 4
+        
+        value = first
+        values = [value] if count else []
+        for delta in deltas:
+            value += delta
+            values.append(value)
+        columns[COLUMNS[c][0]] = [v // scale if v % scale == 0 else v / scale for v in values]
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+def check_round_trip(profile: List[Dict], data: bytes) -> Dict[str, float]:
+    """Largest decode error per column; raises ValueError when one reaches a quantization step
+    
+    That bounds elevation below 1 ft, lat/lng below 1e-5 degrees and mile
+    below 0.1.
+    """
+    decoded = decode(data)
+    if len(decoded) != len(profile):
+        raise ValueError(f"Decoded {len(decoded)} points, expected {len(profile)}")
+    errors = {}
+    for name, scale in COLUMNS:
+        errors[name] = max((abs(a[name] - b[name]) for a, b in zip(profile, decoded)), default=0.0)
+        if errors[name] >= 1 / scale:
+            raise ValueError(f"{name} round-trip error {errors[name]} is not below {1 / scale}")
+    return errors
+
+def data_module(data: bytes) -> str:
+    """TS module holding the binary profile as a base64 string"""
+    return (
+        "// Generated by backend/scripts/elevation_binary.py - do not edit by hand\n"
+        "// Binary elevation profile (see src/lib/elevationCodec.ts), base64-encoded\n"
+        f"export const {DATA_EXPORT} =\n  {format_string(base64.b64encode(data).decode('ascii'))};\n"
+    )
+
+def to_binary_module(text: str, data_name: str = DATA_MODULE) -> str:
+    """elevation.ts with its profile literal replaced by a decode of the data module"""
+    exports = export_spans(text)
+    if PROFILE_EXPORT not in exports:
+        raise KeyError(f"No literal exported as {PROFILE_EXPORT}")
+    _, start, end = exports[PROFILE_EXPORT]
+    imports = (f"import {{ {DECODER} }} from '../lib/elevationCodec';\n"
+               f"import {{ {DATA_EXPORT} }} from './{Path(data_name).stem}';\n\n")
+    return imports + text[:start] + f"{DECODER}({DATA_EXPORT})" + text[end:]
+
+def format_profile(profile: List[Dict]) -> str:
+    """Profile literal in elevation.ts's layout: one point per line, no comma after the last"""
+    if not profile:
+        return '[]'
+    return '[\n' + ',\n'.join(f"  {format_literal(point, '  ', 0)}" for point in profile) + '\n]'
+
+def from_binary_module(text: str, profile: List[Dict]) -> str:
+    """Inverse of to_binary_module: put the decoded profile back as a literal"""
+    text = re.sub(rf"^import \{{ ({DECODER}|{DATA_EXPORT}) \}} from '[^']*';\n", '', text, flags=re.MULTILINE)
+    literal = format_profile(profile)
+    return re.sub(rf"\b{DECODER}\({DATA_EXPORT}\)", lambda _: literal, text.lstrip('\n'), count=1)
+
+def main():
+    """Main execution"""
+    script_dir = Path(__file__).parent
+    backend_dir = script_dir.parent
+    webapp_data_dir = backend_dir.parent / "webapp" / "src" / "data"
+    ts_file = webapp_data_dir / "elevation.ts"
+    data_file = webapp_data_dir / DATA_MODULE
+    
+    args = sys.argv[1:]
+    if args and args[0] != '--inline':
+        logger.error("Usage: python elevation_binary.py [--inline]")
+        sys.exit(1)
+        
+    text = ts_file.read_text(encoding='utf-8')
+    is_binary = PROFILE_EXPORT not in parse_module(text)
+    
+    if args:
+        if is_binary:
+            data = base64.b64decode(parse_module(data_file.read_text(encoding='utf-8'))[DATA_EXPORT])
+            write_if_changed(ts_file, from_binary_module(text, decode(data)))
+            data_file.unlink()
+            logger.info(f"Inlined {DATA_MODULE} back into elevation.ts")
+        return
+    if is_binary:
+        logger.info("elevation.ts already decodes its profile from binary")
+        return
+        
+    profile = parse_module(text)[PROFILE_EXPORT]
+    data = encode(profile)
+    errors = check_round_trip(profile, data)
+    logger.info("Round-trip error: " + ', '.join(f"{name} {error:g}" for name, error in errors.items()))
+    
+    module = data_module(data)
+    write_if_changed(data_file, module)
+    write_if_changed(ts_file, to_binary_module(text))
+    logger.info(f"elevation.ts: {len(text.encode('utf-8')):,} bytes -> {len(data):,} byte profile "
+                f"({len(module):,} bytes as base64 in {DATA_MODULE}, "
+                f"{len(text.encode('utf-8')) / len(module):.1f}x smaller) + {ts_file.stat().st_size:,} byte wrapper")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Build a multi-resolution elevation profile pyramid from at-elevation.gpx
+Each level is a Visvalingam-simplified profile with a measured error bound;
+finer levels are split into mile-window tiles so the app can fetch only
+the window it is zoomed into. Also emits cumulative ascent/descent arrays
+so gain/loss over any mile range is two lookups
+"""
+
+import heapq
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from atomic_write import write_if_changed
+from gpx_track import GpxTrack
+from trail_constants import official_trail_length
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+METERS_TO_FEET = 3.28084
+
+# Approach trail (Amicalola Falls to Springer), same table as webapp/scripts/generate-elevation-01.ts
+APPROACH_TRAIL = [
+    (-8.5, 1700, 34.5611, -84.2481),
+    (-8.0, 1900, 34.5650, -84.2450),
+    (-7.5, 2100, 34.5680, -84.2420),
+    (-7.0, 2300, 34.5720, -84.2380),
+    (-6.5, 2450, 34.5760, -84.2340),
+    (-6.0, 2600, 34.5800, -84.2300),
+    (-5.5, 2750, 34.5840, -84.2260),
+    (-5.0, 2900, 34.5880, -84.2220),
+    (-4.5, 3050, 34.5920, -84.2180),
+    (-4.0, 3150, 34.5960, -84.2140),
+    (-3.5, 3250, 34.6000, -84.2100),
+    (-3.0, 3350, 34.6040, -84.2060),
+    (-2.5, 3450, 34.6080, -84.2020),
+    (-2.0, 3520, 34.6120, -84.1980),
+    (-1.5, 3580, 34.6160, -84.1960),
+    (-1.0, 3650, 34.6200, -84.1950),
+    (-0.5, 3700, 34.6240, -84.1945),
+]
+
+# Gain/loss buckets and the moving-average window applied before differencing
+GAIN_STEP = 0.1
+GAIN_SMOOTHING_MILES = 0.3
+
+# (name, target average spacing in miles, tile width in miles or None for a single file)
+LOD_LEVELS = [
+    ('coarse', 1.0, None),
+    ('medium', 0.5, 250.0),
+    ('fine', 0.1, 50.0),
+]
+
+class ElevationGainIndex:
+    """Cumulative ascent/descent at fixed mile buckets for O(1) gain/loss lookups"""
+    
+    def __init__(self, start_mile: float, step: float, ascent: np.ndarray, descent: np.ndarray):
+        self.start_mile = start_mile
+        self.step = step
+        self.ascent = np.asarray(ascent, dtype=np.float64)
+        self.descent = np.asarray(descent, dtype=np.float64)
+        self.miles = start_mile + step * np.arange(len(self.ascent))
+        
+    def gain_loss(self, start, end) -> Tuple[np.ndarray, np.ndarray]:
+        """Elevation (gain, loss) in feet between start and end miles
+        
+        Accepts scalars or arrays (batch itinerary analysis). Miles between
+        buckets are interpolated; ranges are clamped to the profile.
+        """
+        start = np.asarray(start, dtype=np.float64)
+        end = np.asarray(end, dtype=np.float64)
+        lo = np.minimum(start, end)
+        hi = np.maximum(start, end)
+        
+        gain = np.interp(hi, self.miles, self.ascent) - np.interp(lo, self.miles, self.ascent)
+        loss = np.interp(hi, self.miles, self.descent) - np.interp(lo, self.miles, self.descent)
+        return np.round(gain), np.round(loss)
+        
+    def to_dict(self) -> Dict:
+        """JSON-serializable form (the emitted artifact)"""
+        return {
+            'startMile': self.start_mile,
+            'step': self.step,
+            'ascent': np.round(self.ascent).astype(int).tolist(),
+            'descent': np.round(self.descent).astype(int).tolist(),
+        }
+        
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ElevationGainIndex':
+        """Rebuild from to_dict() output"""
+        return cls(data['startMile'], data['step'], data['ascent'], data['descent'])
+        
+    @classmethod
+    def from_file(cls, path: str) -> 'ElevationGainIndex':
+        """Load the emitted gain.json artifact"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+class ElevationProfileBuilder:
+    """Build the source elevation profile and its LOD pyramid"""
+    
+    def __init__(self, gpx_path: str, trail_length: Optional[float] = None):
+        self.gpx_path = Path(gpx_path)
+        self.trail_length = trail_length if trail_length is not None else official_trail_length()
+        self.miles = np.empty(0)
+        self.elevations = np.empty(0)
+        self.lats = np.empty(0)
+        self.lngs = np.empty(0)
+        
+    def load_profile(self):
+        """Load track points, scale to the official length and prepend the approach trail"""
+        track = GpxTrack(str(self.gpx_path)).load()
+        
+        # Scale raw GPX distance to the official trail length, like generate-elevation-01.ts
+        scale = self.trail_length / track.total_miles
+        approach = np.array(APPROACH_TRAIL, dtype=np.float64)
+        
+        self.miles = np.concatenate((approach[:, 0], track.cumulative_miles * scale))
+        self.elevations = np.concatenate((approach[:, 1], np.round(track.elevations * METERS_TO_FEET)))
+        self.lats = np.concatenate((approach[:, 2], track.lats))
+        self.lngs = np.concatenate((approach[:, 3], track.lons))
+        
+        logger.info(f"Source profile: {len(self.miles)} points from mile {self.miles[0]} to {self.miles[-1]:.1f}")
+        
+    def simplify(self, target_points: int) -> np.ndarray:
+        """Visvalingam-Whyatt simplification in (mile, elevation) space
+        
+        Returns the sorted indices of the kept source points. Endpoints are
+        always kept.
+        """
+        n = len(self.miles)
+        if target_points >= n:
+            return np.arange(n)
+            
+        x = self.miles
+        y = self.elevations
+        prev = list(range(-1, n - 1))
+        nxt = list(range(1, n + 1))
+        removed = [False] * n
+        
+        def area(i: int) -> float:
+            a, b = prev[i], nxt[i]
+            return abs((x[a] - x[i]) * (y[b] - y[i]) - (x[b] - x[i]) * (y[a] - y[i])) / 2
+            
+        heap = [(area(i), i) for i in range(1, n - 1)]
+        heapq.heapify(heap)
+        current = {i: a for a, i in heap}
+        remaining = n
+        
+        while remaining > target_points and heap:
+            a, i = heapq.heappop(heap)
+            if removed[i] or current.get(i) != a:
+                continue
+                
+            removed[i] = True
+            remaining -= 1
+            p, q = prev[i], nxt[i]
+            nxt[p] = q
+            prev[q] = p
+            
+            # Neighbours get new triangles; never let an area drop below the removed one
+            for j in (p, q):
+                if 0 < j < n - 1:
+                    current[j] = max(area(j), a)
+                    heapq.heappush(heap, (current[j], j))
+                    
+        return np.flatnonzero(~np.array(removed))
+        
+    def error_bound(self, kept: np.ndarray) -> Dict[str, float]:
+        """Max and RMS elevation error (feet) of a level against the source profile"""
+        approx = np.interp(self.miles, self.miles[kept], self.elevations[kept])
+        errors = np.abs(self.elevations - approx)
+        return {
+            'maxError': round(float(errors.max()), 1),
+            'rmsError': round(float(np.sqrt(np.mean(errors ** 2))), 1),
+        }
+        
+    def resample(self, step: float = GAIN_STEP) -> Tuple[np.ndarray, np.ndarray]:
+        """Source profile linearly resampled to fixed mile buckets"""
+        count = int(np.floor((self.miles[-1] - self.miles[0]) / step + 1e-9)) + 1
+        miles = np.round(self.miles[0] + step * np.arange(count), 3)
+        return miles, np.interp(miles, self.miles, self.elevations)
+        
+    def build_gain_index(self, step: float = GAIN_STEP,
+                         smoothing_miles: float = GAIN_SMOOTHING_MILES) -> ElevationGainIndex:
+        """Smooth the bucketed profile, then prefix-sum its climbs and descents
+        
+        Smoothing removes GPS elevation jitter that would otherwise inflate
+        gain on flat stretches.
+        """
+        miles, elevations = self.resample(step)
+        
+        window = max(int(round(smoothing_miles / step)) | 1, 1)
+        padded = np.pad(elevations, window // 2, mode='edge')
+        smoothed = np.convolve(padded, np.ones(window) / window, mode='valid')
+        
+        steps = np.diff(smoothed)
+        ascent = np.concatenate(([0.0], np.cumsum(np.maximum(steps, 0))))
+        descent = np.concatenate(([0.0], np.cumsum(np.maximum(-steps, 0))))
+        
+        index = ElevationGainIndex(float(miles[0]), step, ascent, descent)
+        logger.info(f"Gain index: {len(miles)} buckets, total gain {ascent[-1]:.0f} ft, loss {descent[-1]:.0f} ft")
+        return index
+        
+    def _columns(self, indices: np.ndarray) -> Dict[str, List]:
+        """Columnar payload for a set of source points"""
+        return {
+            'mile': np.round(self.miles[indices], 3).tolist(),
+            'elevation': self.elevations[indices].astype(int).tolist(),
+            'lat': np.round(self.lats[indices], 5).tolist(),
+            'lng': np.round(self.lngs[indices], 5).tolist(),
+        }
+        
+    def _tiles(self, kept: np.ndarray, tile_miles: float) -> List[Dict]:
+        """Split a level into mile windows, overlapping by one point on each side"""
+        tiles = []
+        level_miles = self.miles[kept]
+        start = np.floor(level_miles[0] / tile_miles) * tile_miles
+        
+        while start < level_miles[-1]:
+            end = start + tile_miles
+            lo = max(int(np.searchsorted(level_miles, start, side='left')) - 1, 0)
+            hi = min(int(np.searchsorted(level_miles, end, side='right')) + 1, len(kept))
+            if hi - lo > 1:
+                tiles.append({'start': round(float(start), 1), 'end': round(float(end), 1), 'indices': kept[lo:hi]})
+            start = end
+            
+        return tiles
+        
+    def build_pyramid(self, output_dir: str, levels: Optional[List] = None) -> Dict:
+        """Write every level (tiled where configured), the gain index and a manifest"""
+        levels = levels or LOD_LEVELS
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        
+        span = self.miles[-1] - self.miles[0]
+        manifest = {
+            'startMile': float(self.miles[0]),
+            'endMile': round(float(self.miles[-1]), 1),
+            'sourcePoints': len(self.miles),
+            'levels': [],
+        }
+        
+        for name, spacing, tile_miles in levels:
+            kept = self.simplify(int(np.ceil(span / spacing)) + 1)
+            entry = {
+                'name': name,
+                'spacing': spacing,
+                'points': len(kept),
+                **self.error_bound(kept),
+            }
+            
+            if tile_miles is None:
+                filename = f"{name}.json"
+                self._write_json(output_path / filename, self._columns(kept))
+                entry['file'] = filename
+            else:
+                (output_path / name).mkdir(exist_ok=True)
+                entry['tileMiles'] = tile_miles
+                entry['tiles'] = []
+                for tile in self._tiles(kept, tile_miles):
+                    filename = f"{name}/{tile['start']:g}_{tile['end']:g}.json"
+                    self._write_json(output_path / filename, self._columns(tile['indices']))
+                    entry['tiles'].append({'start': tile['start'], 'end': tile['end'], 'file': filename})
+                    
+            manifest['levels'].append(entry)
+            logger.info(f"Level '{name}': {len(kept)} points, max error {entry['maxError']} ft")
+            
+        self._write_json(output_path / "gain.json", self.build_gain_index().to_dict())
+        manifest['gain'] = 'gain.json'
+        
+        self._write_json(output_path / "manifest.json", manifest, indent=2)
+        return manifest
+        
+    def _write_json(self, path: Path, data: Dict, indent: Optional[int] = None):
+        """Write compact JSON unless an indent is requested"""
+        separators = None if indent else (',', ':')
+        write_if_changed(path, json.dumps(data, indent=indent, separators=separators))
+
+def main():
+    """Main execution"""
+    script_dir = Path(__file__).parent
+    project_dir = script_dir.parent.parent
+    gpx_path = project_dir / "webapp" / "src" / "data" / "at-elevation.gpx"
+    output_dir = project_dir / "webapp" / "public" / "elevation"
+    
+    builder = ElevationProfileBuilder(str(gpx_path))
+    builder.load_profile()
+    manifest = builder.build_pyramid(str(output_dir))
+    
+    logger.info(f"Wrote {len(manifest['levels'])} levels to {output_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -8,55 +8,40 @@ Enrich existing data with additional information from PDF extraction
 """
 
 import json
-import re
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import logging
 
+from field_fusion import FieldFusion, field_value
+from ts_literal import load_module
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Existing values outweigh extracted ones, so the PDF only fills fields an existing record lacks
+SOURCE_WEIGHTS = {'current': 2.0, 'pdf': 1.0}
+ENRICH_FIELDS = ('hasWater', 'waterDistance', 'hasPrivy', 'isTenting', 'capacity')
+
 class DataEnricher:
     """Enrich existing data with PDF extraction results"""
     
     def __init__(self, extracted_dir: str, webapp_data_dir: str):
         self.extracted_dir = Path(extracted_dir)
         self.webapp_data_dir = Path(webapp_data_dir)
+        self.fusion = FieldFusion(sources=('current', 'pdf'), weights=SOURCE_WEIGHTS)
         
     def parse_existing_shelters(self) -> List[Dict]:
         """Parse existing shelters with all their data"""
         shelters_file = self.webapp_data_dir / "shelters.ts"
-        content = shelters_file.read_text()
+        content, exports = load_module(shelters_file)
         
         shelters = []
-        # Extract each shelter object
-        pattern = r'\{\s*id:\s*["\']([^"\']+)["\'][^}]+\}'
-        
-        for match in re.finditer(pattern, content, re.DOTALL):
-            obj_text = match.group(0)
-            
-            # Parse fields
-            shelter = {}
-            shelter['id'] = re.search(r'id:\s*["\']([^"\']+)["\']', obj_text).group(1)
-            
-            name_match = re.search(r'name:\s*["\']([^"\']+)["\']', obj_text)
-            if name_match:
-                shelter['name'] = name_match.group(1)
-            
-            mile_match = re.search(r'mile:\s*(\d+\.?\d*)', obj_text)
-            if mile_match:
-                shelter['mile'] = float(mile_match.group(1))
-            
-            lat_match = re.search(r'lat:\s*(-?\d+\.?\d*)', obj_text)
-            if lat_match:
-                shelter['lat'] = float(lat_match.group(1))
-            
-            lng_match = re.search(r'lng:\s*(-?\d+\.?\d*)', obj_text)
-            if lng_match:
-                shelter['lng'] = float(lng_match.group(1))
+        for record in exports.get('shelters', []):
+            # Every scalar field, so the fusion sees the existing amenities
+            shelter = record.scalars()
             
             # Store original text for reconstruction
-            shelter['_original'] = obj_text
+            shelter['_original'] = content[record.start:record.end]
             
             shelters.append(shelter)
         
@@ -105,34 +90,24 @@ class DataEnricher:
         
         return False
     
-    def enrich_shelter(self, existing: Dict, extracted: Dict) -> Dict:
-        """Enrich existing shelter with extracted data"""
+    def enrich_shelters(self, pairs: List[Tuple[Dict, Dict]]) -> List[Dict]:
+        """Enrich matched (existing, extracted) shelter pairs in one fusion pass"""
+        fused = self.fusion.fuse([{'current': existing, 'pdf': extracted} for existing, extracted in pairs],
+                                 fields=ENRICH_FIELDS)
+        return [self.enrich_shelter(existing, extracted, fused, i) for i, (existing, extracted) in enumerate(pairs)]
+    
+    def enrich_shelter(self, existing: Dict, extracted: Dict, fused, i: int) -> Dict:
+        """Enrich existing shelter with the fused fields (row i of the fusion result) that change it"""
         enriched = existing.copy()
         enrichments = []
+        provenance = {}
         
-        # Add water info if missing
-        if extracted.get('hasWater') and not existing.get('_original', '').find('hasWater: true') > -1:
-            enriched['hasWater'] = True
-            enrichments.append('hasWater')
-            
-            if extracted.get('waterDistance'):
-                enriched['waterDistance'] = extracted['waterDistance']
-                enrichments.append('waterDistance')
-        
-        # Add privy info if missing
-        if extracted.get('hasPrivy') and not existing.get('_original', '').find('hasPrivy: true') > -1:
-            enriched['hasPrivy'] = True
-            enrichments.append('hasPrivy')
-        
-        # Add tenting info if missing
-        if extracted.get('isTenting') and not existing.get('_original', '').find('isTenting: true') > -1:
-            enriched['isTenting'] = True
-            enrichments.append('isTenting')
-        
-        # Add capacity if missing
-        if extracted.get('capacity') and not existing.get('_original', '').find('capacity:') > -1:
-            enriched['capacity'] = extracted['capacity']
-            enrichments.append('capacity')
+        for field in ENRICH_FIELDS:
+            value = fused.value(i, field)
+            if value is not None and value != field_value(existing, field):
+                enriched[field] = value
+                enrichments.append(field)
+                provenance[field] = fused.provenance(i, field)
         
         # Add services
         if extracted.get('services'):
@@ -141,6 +116,7 @@ class DataEnricher:
         
         if enrichments:
             enriched['_enrichments'] = enrichments
+            enriched['_provenance'] = provenance
             logger.info(f"Enriched '{existing['name']}' with: {', '.join(enrichments)}")
         
         return enriched
@@ -157,22 +133,21 @@ class DataEnricher:
         # Load existing
         existing_shelters = self.parse_existing_shelters()
         
-        # Match and enrich
-        enriched = []
+        # Match, then enrich all matches in one fusion pass
+        pairs = []
         new_items = []
-        enrichment_count = 0
         
         for extracted in calibrated_shelters:
             match = self.find_match(extracted, existing_shelters)
             
             if match:
-                enriched_item = self.enrich_shelter(match, extracted)
-                if enriched_item.get('_enrichments'):
-                    enriched.append(enriched_item)
-                    enrichment_count += 1
+                pairs.append((match, extracted))
             else:
                 new_items.append(extracted)
         
+        enriched = [item for item in self.enrich_shelters(pairs) if item.get('_enrichments')]
+        enrichment_count = len(enriched)
+        
         # Generate report
         report = {
             'summary': {
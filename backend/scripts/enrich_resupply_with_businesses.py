@@ -5,11 +5,12 @@ Creates Contact Directory structure with business details
 """
 
 import json
-import re
 from pathlib import Path
 from typing import Dict, List, Optional
 import logging
 
+from ts_literal import load_module
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -29,26 +30,15 @@ class ResupplyEnricher:
     def load_existing_resupply(self) -> List[Dict]:
         """Load existing resupply points from TypeScript"""
         resupply_file = self.webapp_data_dir / "resupply.ts"
-        content = resupply_file.read_text()
+        content, exports = load_module(resupply_file)
         
-        # Parse resupply objects
+        # Key fields of each resupply object, with its source text
         resupply_points = []
-        pattern = r'\{\s*id:[^}]+\}'
-        
-        for match in re.finditer(pattern, content, re.DOTALL):
-            obj_text = match.group(0)
-            
-            # Extract key fields
-            point = {'_original': obj_text}
-            
-            name_match = re.search(r'name:\s*["\']([^"\']+)["\']', obj_text)
-            if name_match:
-                point['name'] = name_match.group(1)
-            
-            id_match = re.search(r'id:\s*["\']([^"\']+)["\']', obj_text)
-            if id_match:
-                point['id'] = id_match.group(1)
-            
+        for record in exports.get('resupplyPoints', []):
+            point = {'_original': content[record.start:record.end]}
+            for field in ('name', 'id'):
+                if field in record:
+                    point[field] = record[field]
             resupply_points.append(point)
         
         logger.info(f"Loaded {len(resupply_points)} existing resupply points")
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Blocked entity resolution between extracted and existing trail records
+Existing records are bucketed by mile and by lat/lon cell once; each new
+record is scored only against the records sharing a block, by name
+similarity, GPS distance and mile difference, and gets ranked matches with
+the reasons behind each score
+"""
+
+import re
+from difflib import SequenceMatcher
+from typing import Dict, FrozenSet, List, Optional
+
+import numpy as np
+
+from geo_index import GridIndex, haversine_miles
+
+# Blocking: records within one mile bucket of each other, or within BLOCK_RADIUS miles
+MILE_BUCKET = 5.0
+BLOCK_RADIUS = 1.0
+
+# Proximity falls linearly to zero at these distances (miles); when both records have
+# coordinates, ones further apart than GPS_SCALE never match, whatever their miles say
+GPS_SCALE = 0.5
+MILE_SCALE = 2.0
+
+# Weights of the combined score and the score a match must exceed; a perfect name
+# alone scores exactly MATCH_SCORE, so a match also needs GPS or mile evidence
+NAME_WEIGHT = 0.6
+PROXIMITY_WEIGHT = 0.4
+MATCH_SCORE = 0.6
+# Distinct names at the same spot are neighbours, not duplicates
+MIN_NAME_SIMILARITY = 0.5
+# Character similarity counts only this close to identical (typos, joined words)
+MIN_CHAR_SIMILARITY = 0.85
+
+# Words that name the kind of place rather than the place itself
+GENERIC_WORDS = {'shelter', 'shelters', 'lean', 'to', 'leanto', 'lean-to', 'lean-tos', 'campsite', 'tentsite',
+                 'hut', 'the', 'of', 'at', 'and'}
+# Landform and feature words shared by unrelated places ("Cable Gap" vs "Cold Gap")
+PLACE_TYPE_WORDS = {'gap', 'mountain', 'mount', 'knob', 'bald', 'ridge', 'peak', 'top', 'notch', 'hollow',
+                    'creek', 'branch', 'brook', 'run', 'spring', 'springs', 'river', 'falls', 'pond', 'lake',
+                    'road', 'highway', 'trail', 'trailhead', 'field', 'camp'}
+# State suffixes of town names ("Glasgow, VA")
+STATE_CODES = {'ga', 'nc', 'tn', 'va', 'wv', 'md', 'pa', 'nj', 'ny', 'ct', 'ma', 'vt', 'nh', 'me'}
+ABBREVIATIONS = {'mtn': 'mountain', 'mt': 'mount', 'mt.': 'mount', 'st': 'saint', 'st.': 'saint', 'n': 'north',
+                 's': 'south', 'rd': 'road', 'hwy': 'highway', 'ft': 'fort'}
+
+def name_tokens(name: str) -> FrozenSet[str]:
+    """Distinctive lowercase tokens of a place name (abbreviations expanded, kind-of-place words and state codes dropped)
+    
+    Names made only of such words keep their place-type words, then all of them.
+    """
+    words = re.findall(r"[a-z0-9.'-]+", (name or '').lower())
+    tokens = [ABBREVIATIONS.get(w, w).strip(".'") for w in words if w not in STATE_CODES]
+    distinctive = frozenset(t for t in tokens if t and t not in GENERIC_WORDS and t not in PLACE_TYPE_WORDS)
+    typed = frozenset(t for t in tokens if t and t not in GENERIC_WORDS)
+    return distinctive or typed or frozenset(t for t in tokens if t)
+
+def name_similarity(tokens1: FrozenSet[str], tokens2: FrozenSet[str]) -> float:
+    """Token Jaccard, or character similarity of the token strings when that is near-identical (typos, joined words)"""
+    if not tokens1 or not tokens2:
+        return 0.0
+    jaccard = len(tokens1 & tokens2) / len(tokens1 | tokens2)
+    if jaccard == 1.0:
+        return 1.0
+    chars = SequenceMatcher(None, ' '.join(sorted(tokens1)), ' '.join(sorted(tokens2))).ratio()
+    return max(jaccard, chars) if chars >= MIN_CHAR_SIMILARITY else jaccard
+
+def _number(value) -> Optional[float]:
+    """Float of a numeric field, None when absent"""
+    return float(value) if isinstance(value, (int, float)) else None
+
+class EntityResolver:
+    """Match new records against an existing list through mile and geo-cell blocks"""
+    
+    def __init__(self, existing: List[Dict], min_score: float = MATCH_SCORE):
+        self.existing = existing
+        self.min_score = min_score
+        self.tokens = [name_tokens(e.get('name', '')) for e in existing]
+        self.miles = self._column(existing, 'mile')
+        self.lats = self._column(existing, 'lat')
+        self.lngs = self._column(existing, 'lng')
+        
+        self.mile_blocks: Dict[int, List[int]] = {}
+        for i, mile in enumerate(self.miles):
+            if not np.isnan(mile):
+                self.mile_blocks.setdefault(int(mile // MILE_BUCKET), []).append(i)
+                
+        self.located = np.flatnonzero(~np.isnan(self.lats) & ~np.isnan(self.lngs))
+        self.geo_index = GridIndex(self.lats[self.located], self.lngs[self.located]) if len(self.located) else None
+        
+    @staticmethod
+    def _column(records: List[Dict], field: str) -> np.ndarray:
+        """Numeric field as an array with NaN where it is missing"""
+        values = [_number(r.get(field)) for r in records]
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        
+    def candidates(self, item: Dict) -> np.ndarray:
+        """Positions of existing records sharing a mile bucket (or a neighbouring one) or a geo cell neighbourhood"""
+        found = set()
+        mile = _number(item.get('mile'))
+        if mile is not None:
+            bucket = int(mile // MILE_BUCKET)
+            for b in (bucket - 1, bucket, bucket + 1):
+                found.update(self.mile_blocks.get(b, ()))
+                
+        lat, lng = _number(item.get('lat')), _number(item.get('lng'))
+        if lat is not None and lng is not None and self.geo_index is not None:
+            nearby, _ = self.geo_index.query_radius(lat, lng, BLOCK_RADIUS)
+            found.update(self.located[nearby].tolist())
+            
+        return np.array(sorted(found), dtype=np.int64)
+        
+    def score(self, item: Dict, positions: np.ndarray) -> List[Dict]:
+        """Score item against the given existing positions; every result carries its reasons"""
+        if len(positions) == 0:
+            return []
+            
+        tokens = name_tokens(item.get('name', ''))
+        names = np.array([name_similarity(tokens, self.tokens[p]) for p in positions])
+        
+        mile = _number(item.get('mile'))
+        mile_deltas = np.abs(self.miles[positions] - mile) if mile is not None else np.full(len(positions), np.nan)
+        
+        distances = np.full(len(positions), np.nan)
+        lat, lng = _number(item.get('lat')), _number(item.get('lng'))
+        if lat is not None and lng is not None:
+            distances = haversine_miles(lat, lng, self.lats[positions], self.lngs[positions])
+            
+        # The stronger of the two proximity signals counts; a missing one counts as zero,
+        # and coordinates too far apart veto the mile signal
+        gps_score = np.nan_to_num(np.clip(1.0 - distances / GPS_SCALE, 0.0, 1.0))
+        mile_score = np.nan_to_num(np.clip(1.0 - mile_deltas / MILE_SCALE, 0.0, 1.0))
+        too_far = np.nan_to_num(distances, nan=0.0) > GPS_SCALE
+        proximity = np.where(too_far, 0.0, np.maximum(gps_score, mile_score))
+        scores = NAME_WEIGHT * names + PROXIMITY_WEIGHT * proximity
+        
+        results = []
+        for k, position in enumerate(positions):
+            reasons = [f"name similarity {names[k]:.2f}"]
+            if not np.isnan(distances[k]):
+                reasons.append(f"{distances[k]:.2f} mi apart" + (" (too far)" if too_far[k] else ""))
+            if not np.isnan(mile_deltas[k]):
+                reasons.append(f"mile differs by {mile_deltas[k]:.1f}")
+            results.append({
+                'index': int(position),
+                'record': self.existing[position],
+                'score': round(float(scores[k]), 3),
+                'nameSimilarity': round(float(names[k]), 3),
+                'proximity': round(float(proximity[k]), 3),
+                'distance': None if np.isnan(distances[k]) else round(float(distances[k]), 3),
+                'mileDelta': None if np.isnan(mile_deltas[k]) else round(float(mile_deltas[k]), 1),
+                'reasons': reasons,
+            })
+        return results
+        
+    def matches(self, item: Dict) -> List[Dict]:
+        """In-block existing records scoring above min_score with similar names and some GPS or mile proximity, best first"""
+        scored = [m for m in self.score(item, self.candidates(item))
+                  if m['score'] > self.min_score and m['proximity'] > 0 and m['nameSimilarity'] >= MIN_NAME_SIMILARITY]
+        scored.sort(key=lambda m: (-m['score'], m['index']))
+        return scored
+        
+    def best_match(self, item: Dict) -> Optional[Dict]:
+        """Highest-scoring match, or None"""
+        found = self.matches(item)
+        return found[0] if found else None
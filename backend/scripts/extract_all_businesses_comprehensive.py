@@ -11,6 +11,8 @@ from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import logging
 
+from ts_literal import load_records
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -35,16 +37,10 @@ class ComprehensiveBusinessExtractor:
     
     def load_resupply_points(self) -> List[Dict]:
         """Load resupply points from TypeScript file"""
-        content = self.resupply_file.read_text(encoding='utf-8')
-        
-        resupply_points = []
-        pattern = r'\{\s*id:\s*["\']([^"\']+)["\'][^}]+name:\s*["\']([^"\']+)["\']'
-        
-        for match in re.finditer(pattern, content, re.DOTALL):
-            resupply_points.append({
-                'id': match.group(1),
-                'name': match.group(2)
-            })
+        resupply_points = [
+            {'id': record['id'], 'name': record['name']}
+            for record in load_records(self.resupply_file, 'resupplyPoints') if 'name' in record
+        ]
         
         logger.info(f"Loaded {len(resupply_points)} resupply points")
         return resupply_points
@@ -14,6 +14,9 @@ from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
 import logging
 
+from state_index import default_state_index
+from trail_constants import official_trail_length
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -99,7 +102,7 @@ class ATDataExtractor:
         self.icon_templates = {}
         
         # Trail constants
-        self.TRAIL_LENGTH = 2197.4
+        self.TRAIL_LENGTH = official_trail_length()
         
     def load_icon_templates(self):
         """Load and prepare icon templates for recognition"""
@@ -437,28 +440,7 @@ class ATDataExtractor:
     
     def _determine_state_from_mile(self, mile: float) -> str:
         """Determine state based on mile marker"""
-        state_boundaries = {
-            'GA': (0, 78.5),
-            'NC': (78.5, 166.2),
-            'TN': (166.2, 444.8),
-            'VA': (444.8, 1033.0),
-            'WV': (1000.7, 1026.0),
-            'MD': (1026.0, 1070.0),
-            'PA': (1070.0, 1298.0),
-            'NJ': (1298.0, 1378.1),
-            'NY': (1378.1, 1472.9),
-            'CT': (1472.9, 1508.0),
-            'MA': (1508.0, 1599.0),
-            'VT': (1599.0, 1755.0),
-            'NH': (1755.0, 1898.0),
-            'ME': (1898.0, 2197.4),
-        }
-        
-        for state, (start, end) in state_boundaries.items():
-            if start <= mile <= end:
-                return state
-        
-        return 'UNKNOWN'
+        return default_state_index().state_at(mile)
     
     def extract_all(self):
         """Run all extraction methods"""
@@ -21,6 +21,8 @@ except ImportError:
     subprocess.run(["pip", "install", "Pillow"], check=True)
     from PIL import Image
 
+from trail_constants import official_trail_length
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -204,7 +206,7 @@ class ShelterIconExtractor:
                 
                 name = name_match.group(1).strip() if name_match else "Unknown"
                 mile = float(mile_match.group(1)) if mile_match else 0.0
-                sobo_mile = 2197.4 - mile if mile > 0 else 0.0
+                sobo_mile = official_trail_length() - mile if mile > 0 else 0.0
                 
                 current_shelter = ShelterData(
                     id=f"sh-temp-{len(shelters)+1:03d}",
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Field-level consensus over aligned records from several sources
+Each row holds one place as seen by the PDF extraction, ATC, tnlandforms and
+our current data; every fused field is computed for all rows at once from a
+(rows x sources) array, and keeps its provenance: which source won, how far
+the sources spread and which of them disagreed
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from geo_index import haversine_miles
+
+# Default trust in each source; a higher weight wins ties and outvotes lower ones
+SOURCE_WEIGHTS = {'atc': 3.0, 'tnlandforms': 2.0, 'pdf': 1.5, 'current': 1.0}
+
+# Record keys read under another name
+FIELD_ALIASES = {'lon': 'lng'}
+
+# The coordinate pair fused as one 'position' field, so lat and lng come from the same source
+POSITION_FIELDS = ('lat', 'lng')
+
+@dataclass
+class FieldRule:
+    """How one field is fused
+    
+    kind: 'numeric', 'position' (the lat/lng pair, tolerance in miles) or 'categorical'
+    tolerance: values this close to the weighted median agree with it
+    mode: numeric value of the winning source ('best') or weighted mean of the agreeing sources ('mean')
+    weights: per-source weights for this field, over the engine's
+    """
+    kind: str = 'numeric'
+    tolerance: float = 0.0
+    mode: str = 'best'
+    weights: Optional[Dict[str, float]] = None
+
+FIELD_RULES = {
+    'position': FieldRule('position', tolerance=0.1),
+    'elevation': FieldRule(tolerance=100.0),
+    'mile': FieldRule(tolerance=0.5),
+    'capacity': FieldRule(),
+    'waterDistance': FieldRule(tolerance=50.0),
+    'hasWater': FieldRule('categorical'),
+    'hasPrivy': FieldRule('categorical'),
+    'isTenting': FieldRule('categorical'),
+}
+
+def field_value(record: Optional[Dict], field: str):
+    """Field of a record, through FIELD_ALIASES; None when absent"""
+    if not record:
+        return None
+    if field in record:
+        return record[field]
+    for alias, name in FIELD_ALIASES.items():
+        if name == field and alias in record:
+            return record[alias]
+    return None
+
+def weighted_median(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Row-wise weighted (lower) median of a (rows, sources) array; NaN entries carry no weight"""
+    missing = np.isnan(values)
+    weights = np.where(missing, 0.0, weights)
+    order = np.argsort(np.where(missing, np.inf, values), axis=1, kind='stable')
+    sorted_values = np.take_along_axis(values, order, axis=1)
+    cumulative = np.cumsum(np.take_along_axis(weights, order, axis=1), axis=1)
+    total = cumulative[:, -1]
+    
+    crossing = np.argmax(cumulative >= total[:, None] / 2, axis=1)
+    median = sorted_values[np.arange(len(values)), crossing]
+    median[total == 0] = np.nan
+    return median
+
+class FusionResult:
+    """Fused columns of every field, with per-field provenance"""
+    
+    def __init__(self, sources: Sequence[str], rows: List[Dict], columns: Dict[str, Dict]):
+        self.sources = list(sources)
+        self.rows = rows
+        self.columns = columns
+        
+    def __len__(self) -> int:
+        return len(self.rows)
+        
+    def provenance(self, i: int, field: str) -> Optional[Dict]:
+        """Which source won the field in row i, the spread and the dissenting sources; None without data
+        
+        spread is max - min for numeric fields, the largest distance from the
+        consensus in miles for 'position' and the number of distinct values
+        for categorical fields.
+        """
+        column = self.columns[field]
+        winner = column['winner'][i]
+        if winner < 0:
+            return None
+        present = column['present'][i]
+        return {
+            'source': self.sources[winner],
+            'sources': [s for s, p in zip(self.sources, present) if p],
+            'agreement': round(float(column['agreement'][i]), 3),
+            'spread': round(float(column['spread'][i]), 5),
+            'outliers': [s for s, p, ok in zip(self.sources, present, column['inliers'][i]) if p and not ok],
+        }
+        
+    def value(self, i: int, field: str):
+        """Fused value of a field in row i (a (lat, lng) pair for 'position'), None without data"""
+        column = self.columns[field]
+        if column['winner'][i] < 0:
+            return None
+        if 'lat' in column:
+            return float(column['lat'][i]), float(column['lng'][i])
+        if column.get('exact'):
+            # The winning source's own value, so integers stay integers
+            return field_value(self.rows[i][self.sources[column['winner'][i]]], field)
+        value = column['value'][i]
+        return value.item() if isinstance(value, np.generic) else value
+        
+    def record(self, i: int) -> Dict:
+        """Fused record of row i, with a '_provenance' entry per fused field"""
+        fused: Dict = {}
+        provenance: Dict = {}
+        for field in self.columns:
+            value = self.value(i, field)
+            if value is None:
+                continue
+            if field == 'position':
+                fused['lat'], fused['lng'] = value
+            else:
+                fused[field] = value
+            provenance[field] = self.provenance(i, field)
+        fused['_provenance'] = provenance
+        return fused
+        
+    def records(self) -> List[Dict]:
+        """Fused records of all rows, in row order"""
+        return [self.record(i) for i in range(len(self.rows))]
+        
+    def disagreements(self, source: str, field: str) -> np.ndarray:
+        """Rows where the source has the field but disagrees with the consensus"""
+        k = self.sources.index(source)
+        column = self.columns[field]
+        return np.flatnonzero(column['present'][:, k] & ~column['inliers'][:, k])
+
+class FieldFusion:
+    """Per-field weighted consensus of aligned multi-source records
+    
+    Numeric fields: the weighted median (the weighted medoid for positions)
+    is the reference, sources within the rule's tolerance of it agree, and
+    the highest-weight agreeing source wins (or the agreeing sources are
+    averaged by weight). Categorical fields: a weighted vote, ties going to
+    the side of the highest-weight voter. A source without the field does
+    not take part, so a missing value is filled from whichever source has it.
+    """
+    
+    def __init__(self, sources: Sequence[str] = tuple(SOURCE_WEIGHTS),
+                 weights: Optional[Dict[str, float]] = None,
+                 rules: Optional[Dict[str, FieldRule]] = None):
+        self.sources = list(sources)
+        self.weights = dict(SOURCE_WEIGHTS, **(weights or {}))
+        self.rules = FIELD_RULES if rules is None else rules
+        
+    def _numeric(self, rows: List[Dict], field: str) -> np.ndarray:
+        """(rows, sources) float array of a field, NaN where missing"""
+        values = np.full((len(rows), len(self.sources)), np.nan)
+        for i, row in enumerate(rows):
+            for k, source in enumerate(self.sources):
+                value = field_value(row.get(source), field)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    values[i, k] = value
+        return values
+        
+    def _weights(self, rule: FieldRule) -> np.ndarray:
+        """Per-source weights of a field, in source order"""
+        weights = dict(self.weights, **(rule.weights or {}))
+        return np.array([weights.get(source, 1.0) for source in self.sources], dtype=np.float64)
+        
+    def _winner(self, agree: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Highest-weight agreeing source per row (earlier source on ties), -1 when none agree"""
+        # Tiny column penalty makes argmax prefer the earlier source among equal weights
+        ranked = np.where(agree, weights - np.arange(len(self.sources)) * 1e-9, -np.inf)
+        return np.where(agree.any(axis=1), ranked.argmax(axis=1), -1)
+        
+    def _fuse_numeric(self, values: np.ndarray, rule: FieldRule, weights: np.ndarray) -> Dict:
+        present = ~np.isnan(values)
+        center = weighted_median(values, np.broadcast_to(weights, values.shape))
+        deviation = np.abs(values - center[:, None])
+        inliers = present & (deviation <= rule.tolerance + 1e-9)
+        winner = self._winner(inliers, weights)
+        
+        rows = np.arange(len(values))
+        if rule.mode == 'mean':
+            w = np.where(inliers, weights, 0.0)
+            total = w.sum(axis=1)
+            value = np.divide((w * np.nan_to_num(values)).sum(axis=1), total,
+                              out=np.full(len(values), np.nan), where=total > 0)
+        else:
+            value = np.where(winner >= 0, values[rows, np.maximum(winner, 0)], np.nan)
+            
+        with np.errstate(all='ignore'):
+            spread = np.nan_to_num(np.nanmax(values, axis=1, initial=-np.inf) -
+                                   np.nanmin(values, axis=1, initial=np.inf), nan=0.0, neginf=0.0)
+        return self._column(present, inliers, winner, weights, spread, value=value, exact=rule.mode != 'mean')
+        
+    def _fuse_position(self, lats: np.ndarray, lngs: np.ndarray, rule: FieldRule, weights: np.ndarray) -> Dict:
+        present = ~np.isnan(lats) & ~np.isnan(lngs)
+        lats = np.where(present, lats, np.nan)
+        lngs = np.where(present, lngs, np.nan)
+        rows = np.arange(len(lats))
+        
+        # Reference point: the weighted medoid, i.e. the source closest in total to the others
+        # (a component-wise median could land between sources, away from all of them)
+        pairwise = np.nan_to_num(haversine_miles(lats[:, :, None], lngs[:, :, None], lats[:, None, :], lngs[:, None, :]))
+        cost = np.where(present, (pairwise * np.where(present, weights, 0.0)[:, None, :]).sum(axis=2), np.inf)
+        medoid = cost.argmin(axis=1)
+        distance = pairwise[rows, medoid]
+        
+        inliers = present & (distance <= rule.tolerance + 1e-9)
+        winner = self._winner(inliers, weights)
+        
+        pick = np.maximum(winner, 0)
+        spread = np.nan_to_num(np.nanmax(np.where(present, distance, -np.inf), axis=1, initial=0.0), neginf=0.0)
+        return self._column(present, inliers, winner, weights, spread,
+                            lat=np.where(winner >= 0, lats[rows, pick], np.nan),
+                            lng=np.where(winner >= 0, lngs[rows, pick], np.nan))
+                            
+    def _fuse_categorical(self, rows: List[Dict], field: str, weights: np.ndarray) -> Dict:
+        # Factorize values to codes so the vote is two np.add.at / np.maximum.at calls
+        levels: Dict = {}
+        codes = np.full((len(rows), len(self.sources)), -1, dtype=np.int64)
+        for i, row in enumerate(rows):
+            for k, source in enumerate(self.sources):
+                value = field_value(row.get(source), field)
+                if value is not None:
+                    codes[i, k] = levels.setdefault(value, len(levels))
+        labels = np.empty(len(levels), dtype=object)
+        for value, code in levels.items():
+            labels[code] = value
+            
+        present = codes >= 0
+        row_idx, src_idx = np.nonzero(present)
+        votes = np.zeros((len(rows), max(len(levels), 1)))
+        strongest = np.zeros_like(votes)
+        np.add.at(votes, (row_idx, codes[present]), weights[src_idx])
+        np.maximum.at(strongest, (row_idx, codes[present]), weights[src_idx])
+        
+        chosen = np.argmax(votes + strongest * 1e-6, axis=1)
+        inliers = present & (codes == chosen[:, None])
+        winner = self._winner(inliers, weights)
+        spread = (votes > 0).sum(axis=1).astype(np.float64)
+        value = np.where(winner >= 0, labels[chosen] if len(levels) else None, None)
+        return self._column(present, inliers, winner, weights, spread, value=value)
+        
+    @staticmethod
+    def _column(present, inliers, winner, weights, spread, **values) -> Dict:
+        total = np.where(present, weights, 0.0).sum(axis=1)
+        agreeing = np.where(inliers, weights, 0.0).sum(axis=1)
+        agreement = np.divide(agreeing, total, out=np.zeros(len(total)), where=total > 0)
+        return dict(values, present=present, inliers=inliers, winner=winner, agreement=agreement, spread=spread)
+        
+    def fuse(self, rows: List[Dict], fields: Optional[Sequence[str]] = None) -> FusionResult:
+        """Fuse aligned rows ({source: record or None}) over the given rule fields (all by default)"""
+        columns = {}
+        for field in fields or self.rules:
+            rule = self.rules[field]
+            weights = self._weights(rule)
+            if rule.kind == 'position':
+                columns[field] = self._fuse_position(self._numeric(rows, POSITION_FIELDS[0]),
+                                                     self._numeric(rows, POSITION_FIELDS[1]), rule, weights)
+            elif rule.kind == 'categorical':
+                columns[field] = self._fuse_categorical(rows, field, weights)
+            else:
+                columns[field] = self._fuse_numeric(self._numeric(rows, field), rule, weights)
+        return FusionResult(self.sources, rows, columns)
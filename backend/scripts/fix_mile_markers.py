@@ -11,17 +11,22 @@ from typing import List, Dict, Tuple
 import xml.etree.ElementTree as ET
 import logging
 
+from state_index import default_state_index
+from trail_constants import official_trail_length
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class MileMarkerFixer:
     """Fix mile markers using GPS distance calculations"""
     
-    def __init__(self, gpx_path: str):
+    def __init__(self, gpx_path: str, calibration=None):
         self.gpx_path = Path(gpx_path)
         self.track_points = []
         self.cumulative_miles = []
-        self.TRAIL_LENGTH = 2197.4
+        self.TRAIL_LENGTH = official_trail_length()
+        # Optional MileCalibrationModel converting GPX miles to official miles
+        self.calibration = calibration
         
     def load_gpx_track(self):
         """Load GPX track points with cumulative mileage"""
@@ -128,7 +133,7 @@ class MileMarkerFixer:
         """Fix mile markers for all waypoints"""
         logger.info(f"Fixing mile markers for {len(waypoints)} waypoints...")
         
-        fixed_count = 0
+        fixed = []
         
         for waypoint in waypoints:
             if waypoint.get('mile', 0) == 0.0:
@@ -137,22 +142,20 @@ class MileMarkerFixer:
                 
                 if lat and lon:
                     mile = self.find_mile_marker(lat, lon)
+                    waypoint['gpxMile'] = round(mile, 3)
                     waypoint['mile'] = round(mile, 1)
                     waypoint['soboMile'] = round(self.TRAIL_LENGTH - mile, 1)
-                    
-                    # Update state based on mile marker
-                    waypoint['state'] = self._determine_state(mile)
-                    
-                    fixed_count += 1
+                    fixed.append(waypoint)
         
-        logger.info(f"Fixed {fixed_count} waypoint mile markers")
+        self._finish(fixed)
+        logger.info(f"Fixed {len(fixed)} waypoint mile markers")
         return waypoints
     
     def fix_town_miles(self, towns: List[Dict]) -> List[Dict]:
         """Fix mile markers for all towns"""
         logger.info(f"Fixing mile markers for {len(towns)} towns...")
         
-        fixed_count = 0
+        fixed = []
         
         for town in towns:
             if town.get('mile', 0) == 0.0:
@@ -161,41 +164,26 @@ class MileMarkerFixer:
                 
                 if lat and lon:
                     mile = self.find_mile_marker(lat, lon)
+                    town['gpxMile'] = round(mile, 3)
                     town['mile'] = round(mile, 1)
                     town['soboMile'] = round(self.TRAIL_LENGTH - mile, 1)
-                    
-                    # Update state based on mile marker
-                    town['state'] = self._determine_state(mile)
-                    
-                    fixed_count += 1
+                    fixed.append(town)
         
-        logger.info(f"Fixed {fixed_count} town mile markers")
+        self._finish(fixed)
+        logger.info(f"Fixed {len(fixed)} town mile markers")
         return towns
     
+    def _finish(self, records: List[Dict]):
+        """Convert the fixed GPX miles to official miles (when calibrated) and set each state from the result"""
+        if self.calibration is not None:
+            self.calibration.apply_to_records(records)
+        for record in records:
+            # Update state based on mile marker
+            record['state'] = self._determine_state(record['mile'])
+    
     def _determine_state(self, mile: float) -> str:
         """Determine state from mile marker"""
-        boundaries = [
-            ('GA', 0, 78.5),
-            ('NC', 78.5, 166.2),
-            ('TN', 166.2, 444.8),
-            ('VA', 444.8, 1033.0),
-            ('WV', 1000.7, 1026.0),
-            ('MD', 1026.0, 1070.0),
-            ('PA', 1070.0, 1298.0),
-            ('NJ', 1298.0, 1378.1),
-            ('NY', 1378.1, 1472.9),
-            ('CT', 1472.9, 1508.0),
-            ('MA', 1508.0, 1599.0),
-            ('VT', 1599.0, 1755.0),
-            ('NH', 1755.0, 1898.0),
-            ('ME', 1898.0, 2197.4),
-        ]
-        
-        for state, start, end in boundaries:
-            if start <= mile <= end:
-                return state
-        
-        return 'UNKNOWN'
+        return default_state_index().state_at(mile)
 
 def main():
     """Main execution"""
@@ -209,6 +197,15 @@ def main():
     fixer = MileMarkerFixer(str(gpx_path))
     fixer.load_gpx_track()
     
+    # Convert GPX miles to official miles when a calibration model has been fitted
+    calibration_file = data_dir / "mile_calibration.json"
+    if calibration_file.exists() and fixer.cumulative_miles:
+        from mile_calibration import MileCalibrationModel
+        fixer.calibration = MileCalibrationModel.load(str(calibration_file))
+        if abs(fixer.calibration.gpx_knots[-1] - fixer.cumulative_miles[-1]) > 0.01:
+            logger.warning("Calibration was fitted on a different track; keeping raw GPX miles")
+            fixer.calibration = None
+    
     # Fix waypoints
     waypoints_file = extracted_dir / "comprehensive_waypoints.json"
     if waypoints_file.exists():
@@ -4,11 +4,13 @@ Generate complete enriched resupply.ts with business directories
 """
 
 import json
-import re
 from pathlib import Path
 from typing import Dict, List
 import logging
 
+from ts_literal import TsObject
+from ts_patch import TsPatch
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -25,124 +27,68 @@ class EnrichedResupplyGenerator:
         with open(enrichments_file, 'r', encoding='utf-8') as f:
             return json.load(f)
     
-    def parse_existing_resupply(self) -> List[Dict]:
-        """Parse existing resupply points"""
-        resupply_file = self.webapp_data_dir / "resupply.ts"
-        content = resupply_file.read_text(encoding='utf-8')
-        
-        resupply_points = []
-        pattern = r'\{[^}]+\}'
-        
-        for match in re.finditer(pattern, content, re.DOTALL):
-            obj_text = match.group(0)
-            
-            # Parse the object
-            point = {'_original': obj_text}
-            
-            # Extract ID
-            id_match = re.search(r'id:\s*["\']([^"\']+)["\']', obj_text)
-            if id_match:
-                point['id'] = id_match.group(1)
-            
-            resupply_points.append(point)
-        
-        logger.info(f"Parsed {len(resupply_points)} resupply points")
-        return resupply_points
-    
-    def _escape(self, s: str) -> str:
-        """Escape string for TypeScript"""
+    def _clean(self, s: str) -> str:
+        """Text with stray PDF characters replaced, on one line (quoting is done by the literal formatter)"""
         if not s:
             return ""
         # Remove problematic unicode characters
         s = s.replace('\u2019', "'").replace('\u2002', ' ').replace('\ufffd', '')
-        return s.replace("'", "\\'").replace('"', '\\"').replace('\n', ' ')
+        return s.replace('\n', ' ')
     
-    def generate_business_ts(self, businesses: List[Dict]) -> str:
-        """Generate TypeScript for businesses array"""
-        if not businesses:
-            return ""
-        
-        lines = []
-        lines.append("    businesses: [")
+    def business_records(self, businesses: List[Dict]) -> List[Dict]:
+        """Business objects as written to resupply.ts (fields without a value left out)"""
+        records = []
         for biz in businesses:
-            lines.append("      {")
-            lines.append(f"        name: '{self._escape(biz['name'])}',")
-            lines.append(f"        type: '{biz['type']}',")
-            
-            if biz.get('phone'):
-                lines.append(f"        phone: '{biz['phone']}',")
-            if biz.get('hours'):
-                lines.append(f"        hours: '{self._escape(biz['hours'])}',")
-            if biz.get('address'):
-                lines.append(f"        address: '{self._escape(biz['address'])}',")
-            if biz.get('website'):
-                lines.append(f"        website: '{biz['website']}',")
-            if biz.get('email'):
-                lines.append(f"        email: '{biz['email']}',")
-            
-            lines.append("      },")
-        lines.append("    ],")
-        
-        return "\n".join(lines)
+            record = {'name': self._clean(biz['name']), 'type': biz['type']}
+            for field in ('phone', 'hours', 'address', 'website', 'email'):
+                if biz.get(field):
+                    record[field] = self._clean(biz[field])
+            records.append(record)
+        return records
     
-    def enrich_resupply_object(self, obj_text: str, point_id: str, enrichments: Dict) -> str:
-        """Add businesses to a resupply object"""
+    def enrich_resupply_point(self, patch: TsPatch, point: TsObject, enrichments: Dict) -> bool:
+        """Queue the businesses of one resupply point on the patch; returns whether it is enriched"""
+        point_id = point.get('id')
         if point_id not in enrichments:
-            return obj_text
+            return False
         
         # Check if already has businesses
-        if 'businesses:' in obj_text:
-            return obj_text
+        if 'businesses' in point:
+            return False
         
         enrichment = enrichments[point_id]
-        businesses = enrichment['businesses']
-        
-        # Add businesses before closing brace
-        business_ts = self.generate_business_ts(businesses)
+        businesses = self.business_records(enrichment['businesses'])
+        if not businesses:
+            return False
         
-        # Insert before closing brace
-        enriched = obj_text.rstrip(' }')
-        enriched += ",\n" + business_ts + "\n  }"
+        # Add businesses after the last field, at the parsed offsets
+        patch.set_value(point, 'businesses', businesses)
         
         logger.info(f"Added {len(businesses)} businesses to {enrichment['town_name']}")
-        return enriched
+        return True
     
     def generate_file(self):
-        """Generate complete enriched resupply.ts"""
-        enrichments = self.load_enrichments()
-        existing_points = self.parse_existing_resupply()
+        """Generate complete enriched resupply.ts
         
-        # Generate header
-        lines = [
-            "import type { ResupplyPoint } from '../types';",
-            "",
-            "export const resupplyPoints: ResupplyPoint[] = [",
-        ]
+        All points are patched in one batch over the parsed file, so the
+        preview keeps everything else in resupply.ts as it is.
+        """
+        enrichments = self.load_enrichments()
+        resupply_file = self.webapp_data_dir / "resupply.ts"
+        patch, exports = TsPatch.load(resupply_file)
+        existing_points = exports.get('resupplyPoints', [])
+        logger.info(f"Parsed {len(existing_points)} resupply points")
         
         # Process each point
         enriched_count = 0
         for point in existing_points:
-            point_id = point.get('id')
-            obj_text = point['_original']
-            
-            if point_id:
-                enriched_obj = self.enrich_resupply_object(obj_text, point_id, enrichments)
-                if enriched_obj != obj_text:
-                    enriched_count += 1
-                lines.append(enriched_obj + ",")
-            else:
-                lines.append(obj_text + ",")
-        
-        # Add footer
-        lines.append("];")
-        lines.append("")
-        lines.append("export const RESUPPLY_COUNT = resupplyPoints.length;")
-        lines.append("")
+            if self.enrich_resupply_point(patch, point, enrichments):
+                enriched_count += 1
         
         # Save preview
         preview_file = self.extracted_dir / "resupply_enriched_PREVIEW.ts"
         with open(preview_file, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(lines))
+            f.write(patch.apply())
         
         logger.info(f"Generated preview: {preview_file}")
         
@@ -12,6 +12,9 @@ from pathlib import Path
 from typing import Dict, List, Optional
 import logging
 
+from trail_constants import official_trail_length
+from ts_literal import TsSyntaxError, load_module, parse_literal
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -73,14 +76,10 @@ class EnrichedSheltersGenerator:
     def parse_existing_shelters_full(self) -> List[str]:
         """Parse existing shelters preserving full text"""
         shelters_file = self.webapp_data_dir / "shelters.ts"
-        content = shelters_file.read_text()
-        
-        # Extract each shelter object as complete text
-        shelters = []
-        pattern = r'\{\s*id:[^}]+\}'
+        content, exports = load_module(shelters_file)
         
-        for match in re.finditer(pattern, content, re.DOTALL):
-            shelters.append(match.group(0))
+        # Each shelter object as its complete source text
+        shelters = [content[record.start:record.end] for record in exports.get('shelters', [])]
         
         logger.info(f"Parsed {len(shelters)} existing shelter objects")
         return shelters
@@ -88,12 +87,13 @@ class EnrichedSheltersGenerator:
     def enrich_shelter_text(self, shelter_text: str, enrichments: Dict) -> str:
         """Enrich shelter text with additional data"""
         # Extract shelter ID to match with enrichments
-        id_match = re.search(r"id:\s*['\"]([^'\"]+)['\"]", shelter_text)
-        if not id_match:
+        try:
+            shelter_id = parse_literal(shelter_text)[0].get('id')
+        except TsSyntaxError:
+            shelter_id = None
+        if not shelter_id:
             return shelter_text
         
-        shelter_id = id_match.group(1)
-        
         # Find enrichment data for this shelter
         enrichment_data = None
         for item in enrichments.get('enriched_items', []):
@@ -205,7 +205,7 @@ class EnrichedSheltersGenerator:
             "import type { Shelter } from '../types';",
             "",
             "// Trail total length",
-            "export const TRAIL_LENGTH = 2197.4;",
+            f"export const TRAIL_LENGTH = {official_trail_length()};",
             "",
             "// All 14 states the AT passes through",
             "export const AT_STATES = [",
@@ -227,7 +227,7 @@ class EnrichedSheltersGenerator:
             "  MA: { start: 1508.0, end: 1599.0, name: 'Massachusetts' },",
             "  VT: { start: 1599.0, end: 1755.0, name: 'Vermont' },",
             "  NH: { start: 1755.0, end: 1898.0, name: 'New Hampshire' },",
-            "  ME: { start: 1898.0, end: 2197.4, name: 'Maine' },",
+            f"  ME: {{ start: 1898.0, end: {official_trail_length()}, name: 'Maine' }},",
             "};",
             "",
             "// Comprehensive shelter data (enriched with PDF extraction)",
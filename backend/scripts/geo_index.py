@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Spatial helpers shared by the trail data scripts
+Vectorized haversine distances and a lat/lon grid index for radius queries
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Earth radius in miles (same constant as the per-point helpers in the scripts)
+EARTH_RADIUS_MILES = 3959.0
+
+# Approximate miles per degree of latitude
+MILES_PER_DEGREE_LAT = 69.0
+
+def haversine_miles(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Vectorized haversine distance in miles (inputs broadcast like numpy arrays)"""
+    lat1 = np.radians(lat1)
+    lat2 = np.radians(lat2)
+    d_lat = lat2 - lat1
+    d_lon = np.radians(np.asarray(lon2) - np.asarray(lon1))
+    
+    a = np.sin(d_lat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(d_lon / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    
+    return EARTH_RADIUS_MILES * c
+
+class GridIndex:
+    """Bucket points into fixed lat/lon cells for fast radius queries"""
+    
+    def __init__(self, lats: np.ndarray, lons: np.ndarray, cell_size: float = 0.02):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.cell_size = cell_size
+        
+        # Points sorted by cell key so each cell is one contiguous slice
+        keys = self._cell_keys(self.lats, self.lons)
+        self.order = np.argsort(keys, kind='stable')
+        self.sorted_keys = keys[self.order]
+        
+    def _cell_coords(self, lats, lons) -> Tuple[np.ndarray, np.ndarray]:
+        """Integer cell row/column for coordinates"""
+        rows = np.floor(np.asarray(lats) / self.cell_size).astype(np.int64)
+        cols = np.floor(np.asarray(lons) / self.cell_size).astype(np.int64)
+        return rows, cols
+        
+    def _cell_keys(self, lats, lons) -> np.ndarray:
+        """Single int64 key per cell"""
+        rows, cols = self._cell_coords(lats, lons)
+        return (rows << 32) + (cols & 0xFFFFFFFF)
+        
+    def query_radius(self, lat: float, lon: float, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (indices, distances) of points within radius miles, sorted by index"""
+        row, col = self._cell_coords(lat, lon)
+        
+        # Cells needed to cover the radius (longitude cells shrink with latitude)
+        lat_span = radius / MILES_PER_DEGREE_LAT
+        lon_span = lat_span / max(np.cos(np.radians(lat)), 0.01)
+        row_reach = int(np.ceil(lat_span / self.cell_size))
+        col_reach = int(np.ceil(lon_span / self.cell_size))
+        
+        rows = np.arange(row - row_reach, row + row_reach + 1, dtype=np.int64)
+        cols = np.arange(col - col_reach, col + col_reach + 1, dtype=np.int64)
+        keys = ((rows[:, None] << 32) + (cols[None, :] & 0xFFFFFFFF)).ravel()
+        
+        starts = np.searchsorted(self.sorted_keys, keys, side='left')
+        ends = np.searchsorted(self.sorted_keys, keys, side='right')
+        
+        slices = [self.order[s:e] for s, e in zip(starts, ends) if e > s]
+        if not slices:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+            
+        candidates = np.sort(np.concatenate(slices))
+        distances = haversine_miles(lat, lon, self.lats[candidates], self.lons[candidates])
+        within = distances <= radius
+        
+        return candidates[within], distances[within]
+        
+    def nearest(self, lat: float, lon: float, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (indices, distances) of the k nearest points by full scan"""
+        distances = haversine_miles(lat, lon, self.lats, self.lons)
+        k = min(k, len(distances))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+            
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        
+        return nearest, distances[nearest]
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+def geohash_encode(lats, lons, precision: int = 5) -> np.ndarray:
+    """Vectorized geohash encoding (returns an array of strings)"""
+    lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+    lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+    
+    total_bits = precision * 5
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    
+    # Quantize each axis, then interleave bits starting with longitude
+    lat_q = np.clip(((lats + 90.0) / 180.0 * (1 << lat_bits)).astype(np.int64), 0, (1 << lat_bits) - 1)
+    lon_q = np.clip(((lons + 180.0) / 360.0 * (1 << lon_bits)).astype(np.int64), 0, (1 << lon_bits) - 1)
+    
+    code = np.zeros(len(lats), dtype=np.int64)
+    for bit in range(total_bits):
+        if bit % 2 == 0:
+            source, shift = lon_q, lon_bits - 1 - bit // 2
+        else:
+            source, shift = lat_q, lat_bits - 1 - bit // 2
+        code = (code << 1) | ((source >> shift) & 1)
+        
+    chars = []
+    for pos in range(precision):
+        shift = 5 * (precision - 1 - pos)
+        chars.append(np.array(list(GEOHASH_ALPHABET))[(code >> shift) & 31])
+        
+    return np.array([''.join(parts) for parts in zip(*chars)]) if chars else np.array([''] * len(lats))
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """(lat, lon) size in degrees of one geohash cell"""
+    total_bits = precision * 5
+    lat_bits = total_bits // 2
+    lon_bits = (total_bits + 1) // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+class GeohashIndex:
+    """Points bucketed by geohash cell, with radius queries in ground miles"""
+    
+    def __init__(self, lats, lons, precision: int = 5):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.precision = precision
+        self.buckets: Dict[str, List[int]] = {}
+        
+        if len(self.lats):
+            for i, cell in enumerate(geohash_encode(self.lats, self.lons, precision)):
+                self.buckets.setdefault(str(cell), []).append(i)
+                
+    def _covering_cells(self, lat: float, lon: float, radius: float) -> List[str]:
+        """Geohash cells overlapping the bounding box of a radius query"""
+        cell_lat, cell_lon = geohash_cell_size(self.precision)
+        lat_span = radius / MILES_PER_DEGREE_LAT
+        lon_span = lat_span / max(np.cos(np.radians(lat)), 0.01)
+        
+        sample_lats = np.arange(lat - lat_span, lat + lat_span + cell_lat, cell_lat)
+        sample_lons = np.arange(lon - lon_span, lon + lon_span + cell_lon, cell_lon)
+        grid_lats, grid_lons = np.meshgrid(np.minimum(sample_lats, lat + lat_span),
+                                           np.minimum(sample_lons, lon + lon_span))
+                                           
+        return sorted(set(geohash_encode(grid_lats.ravel(), grid_lons.ravel(), self.precision).tolist()))
+        
+    def query_radius(self, lat: float, lon: float, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (indices, distances) of points within radius miles, nearest first"""
+        members = [i for cell in self._covering_cells(lat, lon, radius) for i in self.buckets.get(cell, [])]
+        if not members:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+            
+        candidates = np.array(members, dtype=np.int64)
+        distances = haversine_miles(lat, lon, self.lats[candidates], self.lons[candidates])
+        order = np.argsort(distances, kind='stable')
+        order = order[distances[order] <= radius]
+        
+        return candidates[order], distances[order]
+        
+    def to_dict(self) -> Dict:
+        """JSON-serializable form"""
+        return {
+            'precision': self.precision,
+            'lats': self.lats.tolist(),
+            'lons': self.lons.tolist(),
+            'buckets': self.buckets,
+        }
+        
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'GeohashIndex':
+        """Rebuild from to_dict() output without re-encoding"""
+        index = cls([], [], data['precision'])
+        index.lats = np.asarray(data['lats'], dtype=np.float64)
+        index.lons = np.asarray(data['lons'], dtype=np.float64)
+        index.buckets = {cell: list(members) for cell, members in data['buckets'].items()}
+        return index
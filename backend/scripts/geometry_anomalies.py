@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Mile/coordinate consistency check for the trail waypoints
+Sorts waypoints by mile and compares each mile step with the great-circle and
+along-track distance between the same coordinates in vectorized passes;
+waypoints whose disagreement is an outlier by robust z-score are written as a
+ranked list, capped to the worst MAX_ANOMALIES
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+import numpy as np
+
+from atomic_write import write_if_changed
+from geo_index import haversine_miles
+from gpx_track import GpxTrack
+from trail_constants import official_trail_length
+from ts_records import load_ts_records
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Modified z-score above which a waypoint is an outlier; guidebook and track miles
+# disagree by several miles in places, so this sits above the usual 3.5
+Z_THRESHOLD = 5.0
+
+# Disagreements below this many miles are never reported, whatever their z-score
+MIN_DISCREPANCY = 10.0
+
+# Ranked anomalies written out; the summary still counts every flagged waypoint
+MAX_ANOMALIES = 25
+
+# Waypoints (centered) in the rolling median that removes regional calibration drift
+LOCAL_WINDOW = 9
+
+# Track vertices compared per block in the nearest-vertex pass
+VERTEX_BLOCK = 256
+
+def robust_z(values: np.ndarray) -> np.ndarray:
+    """Modified z-scores from the median and MAD (mean absolute deviation when MAD is 0)"""
+    values = np.asarray(values, dtype=np.float64)
+    finite = values[np.isfinite(values)]
+    if len(finite) == 0:
+        return np.zeros_like(values)
+        
+    median = np.median(finite)
+    mad = np.median(np.abs(finite - median))
+    if mad > 0:
+        return 0.6745 * (values - median) / mad
+        
+    mean_dev = np.mean(np.abs(finite - median))
+    if mean_dev > 0:
+        return (values - median) / (1.253314 * mean_dev)
+    return np.zeros_like(values)
+
+def rolling_median(values: np.ndarray, window: int) -> np.ndarray:
+    """Centered rolling median, with the window shrunk to fit at the ends"""
+    values = np.asarray(values, dtype=np.float64)
+    half = window // 2
+    if len(values) <= window:
+        return np.full(len(values), np.median(values))
+        
+    padded = np.concatenate((values[:half][::-1], values, values[-half:][::-1]))
+    return np.median(np.lib.stride_tricks.sliding_window_view(padded, 2 * half + 1), axis=1)
+
+class GeometryAnomalyDetector:
+    """Rank waypoints whose coordinates disagree with their miles"""
+    
+    def __init__(self, waypoints: List[Dict], track: Optional[GpxTrack] = None,
+                 calibration=None, trail_length: Optional[float] = None):
+        # Approach trail (negative miles) is not on the track and has no mile/geometry relation to test
+        located = [
+            w for w in waypoints
+            if isinstance(w.get('mile'), (int, float)) and w['mile'] >= 0
+            and isinstance(w.get('lat'), (int, float)) and isinstance(w.get('lng'), (int, float))
+        ]
+        order = np.argsort([w['mile'] for w in located], kind='stable')
+        self.waypoints = [located[i] for i in order]
+        self.miles = np.array([w['mile'] for w in self.waypoints], dtype=np.float64)
+        self.lats = np.array([w['lat'] for w in self.waypoints], dtype=np.float64)
+        self.lngs = np.array([w['lng'] for w in self.waypoints], dtype=np.float64)
+        self.track = track
+        self.calibration = calibration
+        self.trail_length = trail_length if trail_length is not None else official_trail_length()
+        
+    def nearest_vertices(self):
+        """(vertex index, distance in miles) of the nearest track vertex for every waypoint, in blocked passes"""
+        vertices = np.zeros(len(self.lats), dtype=np.int64)
+        distances = np.zeros(len(self.lats))
+        for start in range(0, len(self.lats), VERTEX_BLOCK):
+            block = slice(start, start + VERTEX_BLOCK)
+            d = haversine_miles(self.lats[block, None], self.lngs[block, None], self.track.lats[None, :], self.track.lons[None, :])
+            vertices[block] = d.argmin(axis=1)
+            distances[block] = d.min(axis=1)
+        return vertices, distances
+        
+    def track_miles(self):
+        """Official mile implied by each waypoint's coordinates, and its distance from the track"""
+        vertices, off_trail = self.nearest_vertices()
+        gpx_miles = self.track.cumulative_miles[vertices]
+        if self.calibration is not None:
+            return self.calibration.to_official(gpx_miles), off_trail
+        return gpx_miles * (self.trail_length / self.track.total_miles), off_trail
+        
+    @staticmethod
+    def _adjacent_min(pair_values: np.ndarray, size: int) -> np.ndarray:
+        """Per-waypoint smaller value of its two adjacent pairs (the single pair at either end)
+        
+        A bad coordinate spoils both pairs it belongs to, while a single bad
+        pair between two good waypoints raises neither waypoint's minimum.
+        """
+        if size == 1:
+            return np.zeros(1)
+        before = np.concatenate(([np.inf], pair_values))
+        after = np.concatenate((pair_values, [np.inf]))
+        return np.minimum(before, after)
+        
+    def analyze(self, limit: Optional[int] = MAX_ANOMALIES) -> Dict:
+        """Score every waypoint and return the ranked outliers, at most limit of them (None for all)"""
+        size = len(self.miles)
+        if size == 0:
+            return {'summary': {'waypoints': 0, 'flagged': 0, 'reported': 0}, 'anomalies': []}
+            
+        d_mile = np.diff(self.miles)
+        d_gc = haversine_miles(self.lats[:-1], self.lngs[:-1], self.lats[1:], self.lngs[1:])
+        
+        # Trail distance can never be shorter than the straight line between two points
+        gc_excess = self._adjacent_min(d_gc - d_mile, size)
+        gc_z = robust_z(gc_excess)
+        
+        implied = np.full(size, np.nan)
+        off_trail = np.full(size, np.nan)
+        along_gap = np.full(size, np.nan)
+        residual = np.zeros(size)
+        local_residual = np.zeros(size)
+        residual_z = np.zeros(size)
+        if self.track is not None:
+            implied, off_trail = self.track_miles()
+            residual = self.miles - implied
+            # Neighbours share any regional drift between guidebook and track miles; a bad point does not
+            local_residual = residual - rolling_median(residual, LOCAL_WINDOW)
+            residual_z = robust_z(local_residual)
+            along_gap = self._adjacent_min(np.abs(np.diff(implied) - d_mile), size)
+            
+        score = np.maximum(np.abs(residual_z), gc_z)
+        discrepancy = np.maximum(np.abs(local_residual), gc_excess)
+        flagged = np.flatnonzero((score > Z_THRESHOLD) & (discrepancy > MIN_DISCREPANCY))
+        ranked = flagged[np.argsort(-score[flagged], kind='stable')][:limit]
+        
+        def value(array, i):
+            return None if not np.isfinite(array[i]) else round(float(array[i]), 3)
+            
+        anomalies = [{
+            'rank': rank + 1,
+            'id': self.waypoints[i].get('id'),
+            'name': self.waypoints[i].get('name'),
+            'source': self.waypoints[i].get('source'),
+            'mile': float(self.miles[i]),
+            'lat': float(self.lats[i]),
+            'lng': float(self.lngs[i]),
+            'impliedMile': value(implied, i),
+            'mileResidual': value(residual, i),
+            'localResidual': value(local_residual, i),
+            'offTrail': value(off_trail, i),
+            'greatCircleExcess': value(gc_excess, i),
+            'alongTrackGap': value(along_gap, i),
+            'score': round(float(score[i]), 2),
+        } for rank, i in enumerate(ranked)]
+        
+        return {
+            'summary': {
+                'waypoints': size,
+                'flagged': len(flagged),
+                'reported': len(anomalies),
+                'zThreshold': Z_THRESHOLD,
+                'minDiscrepancy': MIN_DISCREPANCY,
+                'medianAbsResidual': round(float(np.median(np.abs(residual))), 3),
+            },
+            'anomalies': anomalies,
+        }
+
+def main():
+    """Main execution"""
+    script_dir = Path(__file__).parent
+    backend_dir = script_dir.parent
+    webapp_data_dir = backend_dir.parent / "webapp" / "src" / "data"
+    
+    if len(sys.argv) > 1:
+        # A JSON waypoint list, e.g. a merge result before it is written to shelters.ts
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            waypoints = json.load(f)
+    else:
+        # Resupply coordinates are in town, off the trail, so only on-trail records are checked
+        waypoints = []
+        for name in ('shelters.ts', 'features.ts'):
+            for record in load_ts_records(webapp_data_dir / name):
+                record['source'] = name
+                waypoints.append(record)
+                
+    track = GpxTrack(str(webapp_data_dir / "at-elevation.gpx")).load()
+    
+    calibration = None
+    calibration_file = backend_dir / "data" / "mile_calibration.json"
+    if calibration_file.exists():
+        from mile_calibration import MileCalibrationModel
+        calibration = MileCalibrationModel.load(str(calibration_file))
+        if abs(calibration.gpx_knots[-1] - track.total_miles) > 0.01:
+            logger.warning("Calibration was fitted on a different track; scaling GPX miles instead")
+            calibration = None
+            
+    results = GeometryAnomalyDetector(waypoints, track, calibration).analyze()
+    summary = results['summary']
+    logger.info(f"Checked {summary['waypoints']} waypoints: {summary['flagged']} anomalies, "
+                f"{summary['reported']} reported")
+    for anomaly in results['anomalies'][:10]:
+        logger.info(f"  #{anomaly['rank']} {anomaly['name']} (mile {anomaly['mile']}): "
+                    f"implied mile {anomaly['impliedMile']}, score {anomaly['score']}")
+                    
+    output_file = backend_dir / "data" / "extracted" / "geometry_anomalies.json"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    write_if_changed(output_file, json.dumps(results, indent=2))
+    logger.info(f"Saved ranked anomalies to {output_file}")
+
+if __name__ == "__main__":
+    main()
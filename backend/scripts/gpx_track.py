@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Shared GPX track loader
+Loads trail track points into numpy arrays with cumulative GPX mileage,
+projects coordinates onto the track, and indexes named GPX waypoints
+"""
+
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from geo_index import GeohashIndex, GridIndex, MILES_PER_DEGREE_LAT, haversine_miles
+
+logger = logging.getLogger(__name__)
+
+GPX_NS = {'gpx': 'http://www.topografix.com/GPX/1/1'}
+
+def normalize_waypoint_name(name: str) -> str:
+    """Lowercase and collapse punctuation/whitespace for name lookups"""
+    return re.sub(r'[^a-z0-9]+', ' ', name.lower()).strip()
+
+class NamedWaypointIndex:
+    """GPX named waypoints with a geohash spatial index and name lookup tables"""
+    
+    def __init__(self, waypoints: List[Dict], precision: int = 5):
+        self.records = waypoints
+        self.spatial = GeohashIndex(
+            [wp['lat'] for wp in waypoints],
+            [wp['lon'] for wp in waypoints],
+            precision
+        )
+        self._build_name_tables()
+        
+    def _build_name_tables(self):
+        """Exact (lowercase) and normalized name -> record position"""
+        self.by_name: Dict[str, int] = {}
+        self.by_normalized: Dict[str, List[int]] = {}
+        
+        for i, wp in enumerate(self.records):
+            # Later duplicates win on exact names
+            self.by_name[wp['name'].lower()] = i
+            self.by_normalized.setdefault(normalize_waypoint_name(wp['name']), []).append(i)
+            
+    def __len__(self) -> int:
+        return len(self.records)
+        
+    def lookup(self, name: str) -> Optional[Dict]:
+        """Waypoint by exact (case-insensitive) name, then by normalized name"""
+        i = self.by_name.get(name.lower())
+        if i is None:
+            matches = self.by_normalized.get(normalize_waypoint_name(name))
+            i = matches[0] if matches else None
+        return self.records[i] if i is not None else None
+        
+    def within(self, lat: float, lon: float, radius: float) -> List[Tuple[Dict, float]]:
+        """Waypoints within radius miles, nearest first"""
+        indices, distances = self.spatial.query_radius(lat, lon, radius)
+        return [(self.records[i], float(d)) for i, d in zip(indices, distances)]
+        
+    def nearest(self, lat: float, lon: float, max_distance: float) -> Optional[Dict]:
+        """Closest waypoint within max_distance miles"""
+        hits = self.within(lat, lon, max_distance)
+        return hits[0][0] if hits else None
+        
+    def to_dict(self) -> Dict:
+        """JSON-serializable form"""
+        return {'records': self.records, 'spatial': self.spatial.to_dict()}
+        
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'NamedWaypointIndex':
+        """Rebuild from to_dict() output"""
+        index = cls.__new__(cls)
+        index.records = data['records']
+        index.spatial = GeohashIndex.from_dict(data['spatial'])
+        index._build_name_tables()
+        return index
+
+class GpxTrack:
+    """Trail track as parallel numpy arrays (lat, lon, elevation, cumulative miles)"""
+    
+    def __init__(self, gpx_path: str):
+        self.gpx_path = Path(gpx_path)
+        self.lats = np.empty(0)
+        self.lons = np.empty(0)
+        self.elevations = np.empty(0)
+        self.cumulative_miles = np.empty(0)
+        self.index: Optional[GridIndex] = None
+        self.waypoints = NamedWaypointIndex([])
+        
+    def load(self, cache_path: Optional[str] = None) -> 'GpxTrack':
+        """Parse the GPX file (or a fresh cache of it) and build the indexes"""
+        cache = Path(cache_path) if cache_path else None
+        if cache and cache.exists() and cache.stat().st_mtime >= self.gpx_path.stat().st_mtime:
+            self._load_cache(cache)
+            logger.info(f"Loaded {len(self.lats)} track points and {len(self.waypoints)} waypoints from cache {cache}")
+            return self
+            
+        logger.info(f"Loading GPX track from {self.gpx_path}")
+        
+        tree = ET.parse(self.gpx_path)
+        root = tree.getroot()
+        
+        lats = []
+        lons = []
+        elevations = []
+        for trkpt in root.findall('.//gpx:trkpt', GPX_NS):
+            lats.append(float(trkpt.get('lat')))
+            lons.append(float(trkpt.get('lon')))
+            
+            ele_elem = trkpt.find('gpx:ele', GPX_NS)
+            elevations.append(float(ele_elem.text) if ele_elem is not None else np.nan)
+            
+        waypoints = []
+        for wpt in root.findall('.//gpx:wpt', GPX_NS):
+            name_elem = wpt.find('gpx:name', GPX_NS)
+            if name_elem is None or not name_elem.text:
+                continue
+                
+            ele_elem = wpt.find('gpx:ele', GPX_NS)
+            waypoints.append({
+                'name': name_elem.text.strip(),
+                'lat': float(wpt.get('lat')),
+                'lon': float(wpt.get('lon')),
+                'elevation': float(ele_elem.text) if ele_elem is not None else None
+            })
+            
+        self.lats = np.array(lats)
+        self.lons = np.array(lons)
+        self.elevations = np.array(elevations)
+        self._calculate_cumulative_miles()
+        self.index = GridIndex(self.lats, self.lons)
+        self.waypoints = NamedWaypointIndex(waypoints)
+        
+        logger.info(f"Loaded {len(self.lats)} track points ({self.total_miles:.1f} miles) and {len(self.waypoints)} waypoints")
+        
+        if cache:
+            self.save_cache(cache)
+            
+        return self
+        
+    def save_cache(self, cache_path: Path):
+        """Serialize track arrays and the waypoint index to a single .npz file"""
+        np.savez_compressed(
+            cache_path,
+            lats=self.lats,
+            lons=self.lons,
+            elevations=self.elevations,
+            cumulative_miles=self.cumulative_miles,
+            waypoints=np.array(json.dumps(self.waypoints.to_dict()))
+        )
+        logger.info(f"Saved GPX cache to {cache_path}")
+        
+    def _load_cache(self, cache_path: Path):
+        """Restore state written by save_cache()"""
+        with np.load(cache_path) as data:
+            self.lats = data['lats']
+            self.lons = data['lons']
+            self.elevations = data['elevations']
+            self.cumulative_miles = data['cumulative_miles']
+            self.waypoints = NamedWaypointIndex.from_dict(json.loads(str(data['waypoints'])))
+            
+        self.index = GridIndex(self.lats, self.lons)
+        
+    def _calculate_cumulative_miles(self):
+        """Cumulative haversine distance along the track"""
+        if len(self.lats) == 0:
+            self.cumulative_miles = np.empty(0)
+            return
+            
+        steps = haversine_miles(self.lats[:-1], self.lons[:-1], self.lats[1:], self.lons[1:])
+        self.cumulative_miles = np.concatenate(([0.0], np.cumsum(steps)))
+        
+    @property
+    def total_miles(self) -> float:
+        """Total GPX track length in miles"""
+        return float(self.cumulative_miles[-1]) if len(self.cumulative_miles) else 0.0
+        
+    def project(self, lat: float, lon: float, vertices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Project a coordinate onto the segments starting at each vertex
+        
+        Returns (miles, distances) for each vertex's outgoing segment, using a
+        local equirectangular approximation, which is accurate at segment scale.
+        """
+        last = len(self.lats) - 1
+        start = np.clip(vertices, 0, max(last - 1, 0))
+        end = np.minimum(start + 1, last)
+        
+        scale_x = MILES_PER_DEGREE_LAT * np.cos(np.radians(lat))
+        ax = (self.lons[start] - lon) * scale_x
+        ay = (self.lats[start] - lat) * MILES_PER_DEGREE_LAT
+        bx = (self.lons[end] - lon) * scale_x
+        by = (self.lats[end] - lat) * MILES_PER_DEGREE_LAT
+        
+        dx = bx - ax
+        dy = by - ay
+        seg_sq = dx * dx + dy * dy
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = np.where(seg_sq > 0, -(ax * dx + ay * dy) / seg_sq, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        
+        px = ax + t * dx
+        py = ay + t * dy
+        distances = np.sqrt(px * px + py * py)
+        miles = self.cumulative_miles[start] + t * (self.cumulative_miles[end] - self.cumulative_miles[start])
+        
+        return miles, distances
+        
+    def candidates(self, lat: float, lon: float, k: int = 5, radius: float = 1.0) -> List[Tuple[float, float]]:
+        """Candidate (mile, distance) snaps, one per distinct pass of the track
+        
+        Track vertices within the radius are grouped into contiguous runs; each
+        run is a separate pass (switchback leg, out-and-back side). The best
+        projection of every pass is returned first, remaining slots go to the
+        next-best segments. Falls back to the k nearest vertices when nothing
+        lies within the radius.
+        """
+        vertices, _ = self.index.query_radius(lat, lon, radius)
+        if len(vertices) == 0:
+            vertices, _ = self.index.nearest(lat, lon, k)
+            vertices = np.sort(vertices)
+            
+        # Evaluate both segments touching each vertex
+        segments = np.unique(np.concatenate((vertices - 1, vertices)))
+        segments = segments[(segments >= 0) & (segments < max(len(self.lats) - 1, 1))]
+        miles, distances = self.project(lat, lon, segments)
+        
+        # Split into runs of consecutive segments
+        breaks = np.flatnonzero(np.diff(segments) > 1) + 1
+        run_ids = np.zeros(len(segments), dtype=np.int64)
+        run_ids[breaks] = 1
+        run_ids = np.cumsum(run_ids)
+        
+        # Best snap of every pass first, then the next-best segments overall
+        by_distance = np.argsort(distances, kind='stable')
+        _, first_of_run = np.unique(run_ids[by_distance], return_index=True)
+        pass_best = by_distance[np.sort(first_of_run)]
+        rest = np.setdiff1d(by_distance, pass_best, assume_unique=True)
+        rest = rest[np.argsort(distances[rest], kind='stable')]
+        
+        chosen = np.concatenate((pass_best, rest))[:k]
+        return [(float(miles[i]), float(distances[i])) for i in chosen]
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+JSON-module emitter for the web app data files
+Moves the big literal of a data module (shelters, resupply points, contacts)
+into a .json file next to it and leaves a small typed TS wrapper that imports
+it; Vite ships large JSON imports as JSON.parse calls, which browsers parse
+much faster than the same data as object-literal source. Keys are written in
+one stable order, minified by default or pretty-printed
+"""
+
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Any, Optional, Tuple
+import logging
+
+from atomic_write import write_if_changed
+from ts_literal import export_spans, format_literal, parse_module
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Data file -> (export moved to JSON, indent and inline depth used when inlining it back)
+JSON_MODULES = {
+    'shelters.ts': ('shelters', ' ', 1),
+    'resupply.ts': ('resupplyPoints', '  ', None),
+    'contacts.ts': ('resupplyContacts', '  ', None),
+}
+
+# Keys written first, in this order; the rest follow alphabetically
+KEY_ORDER = ('id', 'resupplyId', 'name', 'mile', 'soboMile', 'elevation', 'lat', 'lng', 'state', 'county', 'type')
+
+IMPORT_LINE = re.compile(r"^import [^\n]*;\n", re.MULTILINE)
+DECLARATION = re.compile(r'export const (\w+)\s*(?::\s*([^=]*?))?\s*=\s*$')
+
+def order_keys(value: Any) -> Any:
+    """Copy of a value with every object's keys in the stable KEY_ORDER-then-alphabetical order
+    
+    Records with the same fields then also share one key order, so the JS
+    engine builds them with one object shape.
+    """
+    if isinstance(value, dict):
+        leading = [k for k in KEY_ORDER if k in value]
+        rest = sorted(k for k in value if k not in KEY_ORDER)
+        return {k: order_keys(value[k]) for k in leading + rest}
+    if isinstance(value, list):
+        return [order_keys(v) for v in value]
+    return value
+
+def dumps(value: Any, pretty: bool = False) -> str:
+    """JSON text of a value in stable key order; minified unless pretty"""
+    if pretty:
+        return json.dumps(order_keys(value), ensure_ascii=False, indent=2) + '\n'
+    return json.dumps(order_keys(value), ensure_ascii=False, separators=(',', ':')) + '\n'
+
+def json_binding(export: str) -> str:
+    """Name the wrapper imports the JSON data under"""
+    return f"{export}Data"
+
+def _declared_type(text: str, start: int) -> Optional[str]:
+    """Type annotation of the `export const` whose literal starts at start, if any"""
+    line_start = text.rfind('export const', 0, start)
+    match = DECLARATION.search(text[line_start:start])
+    return match.group(2) if match else None
+
+def to_json_module(text: str, export: str, json_name: str, pretty: bool = False) -> Tuple[str, str]:
+    """Split a data module into (wrapper TS text, JSON text) for one literal export
+    
+    The literal becomes the imported JSON, cast to the declared type; other
+    declarations and functions in the module stay as they are.
+    """
+    exports = export_spans(text)
+    if export not in exports:
+        raise KeyError(f"No literal exported as {export}")
+    value, start, end = exports[export]
+    
+    binding = json_binding(export)
+    declared = _declared_type(text, start)
+    expression = f"{binding} as unknown as {declared}" if declared else binding
+    wrapper = text[:start] + expression + text[end:]
+    
+    # The import goes after the module's last import line, or on top
+    import_line = f"import {binding} from './{json_name}';\n"
+    imports = list(IMPORT_LINE.finditer(wrapper))
+    position = imports[-1].end() if imports else 0
+    wrapper = wrapper[:position] + import_line + wrapper[position:]
+    return wrapper, dumps(value, pretty)
+
+def from_json_module(text: str, export: str, json_text: str, indent: str = '  ',
+                     inline_depth: Optional[int] = None) -> str:
+    """Inverse of to_json_module: put the JSON data back into the wrapper as a literal"""
+    binding = json_binding(export)
+    import_line = re.compile(rf"^import {binding} from '[^']*';\n", re.MULTILINE)
+    if not import_line.search(text):
+        raise KeyError(f"{export} is not imported from JSON")
+    text = import_line.sub('', text, count=1)
+    literal = format_literal(json.loads(json_text), indent, inline_depth)
+    return re.sub(rf"\b{binding}(?: as unknown as [^;\n]*)?(?=;)", lambda _: literal, text, count=1)
+
+def write_json_module(ts_file: Path, export: str, pretty: bool = False, text: Optional[str] = None) -> Path:
+    """Write ts_file as a JSON-backed wrapper (from its current content, or from text); returns the JSON path
+    
+    Both files are written atomically, and only when their content changed.
+    """
+    ts_file = Path(ts_file)
+    json_file = ts_file.with_suffix('.json')
+    if text is None:
+        text = ts_file.read_text(encoding='utf-8')
+    wrapper, json_text = to_json_module(text, export, json_file.name, pretty)
+    write_if_changed(json_file, json_text)
+    write_if_changed(ts_file, wrapper)
+    return json_file
+
+def inline_json_module(ts_file: Path, export: str, indent: str = '  ', inline_depth: Optional[int] = None):
+    """Turn a JSON-backed wrapper back into a literal data module and remove its JSON file"""
+    ts_file = Path(ts_file)
+    json_file = ts_file.with_suffix('.json')
+    text = from_json_module(ts_file.read_text(encoding='utf-8'), export,
+                            json_file.read_text(encoding='utf-8'), indent, inline_depth)
+    write_if_changed(ts_file, text)
+    json_file.unlink()
+
+def main():
+    """Main execution"""
+    script_dir = Path(__file__).parent
+    backend_dir = script_dir.parent
+    webapp_data_dir = backend_dir.parent / "webapp" / "src" / "data"
+    
+    args = sys.argv[1:]
+    if args and args[0] not in ('--pretty', '--inline'):
+        logger.error("Usage: python json_module.py [--pretty | --inline]")
+        sys.exit(1)
+        
+    for filename, (export, indent, inline_depth) in JSON_MODULES.items():
+        ts_file = webapp_data_dir / filename
+        text = ts_file.read_text(encoding='utf-8')
+        is_wrapper = export not in parse_module(text)
+        
+        if args and args[0] == '--inline':
+            if is_wrapper:
+                inline_json_module(ts_file, export, indent, inline_depth)
+                logger.info(f"Inlined {ts_file.with_suffix('.json').name} back into {filename}")
+            continue
+        if is_wrapper:
+            logger.info(f"{filename} already imports its data from JSON")
+            continue
+            
+        json_file = write_json_module(ts_file, export, pretty=bool(args), text=text)
+        logger.info(f"{filename}: {len(text.encode('utf-8')):,} bytes -> {json_file.name} "
+                    f"{json_file.stat().st_size:,} bytes + {ts_file.stat().st_size:,} byte wrapper")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Monotonic map-matching of guidebook-ordered waypoints onto the GPX track
+Picks one track snap per waypoint with a Viterbi pass over the k best
+candidates so that miles never run backwards along the guidebook order
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+import numpy as np
+
+from atomic_write import write_if_changed
+from gpx_track import GpxTrack
+from trail_constants import official_trail_length
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class WaypointMapMatcher:
+    """Assign track miles to an ordered waypoint list under a monotonic-mile constraint"""
+    
+    def __init__(self, track: GpxTrack, k: int = 5, radius: float = 1.0,
+                 mile_tolerance: float = 0.05, backtrack_penalty: float = 5.0,
+                 hint_weight: float = 0.0, calibration=None):
+        self.track = track
+        self.k = k
+        self.radius = radius
+        # Allow tiny reversals caused by waypoints sharing a location
+        self.mile_tolerance = mile_tolerance
+        # Cost (in off-trail miles) of breaking monotonicity when no ordered path exists
+        self.backtrack_penalty = backtrack_penalty
+        # Optional pull towards an existing mile value on the record
+        self.hint_weight = hint_weight
+        # Optional MileCalibrationModel converting GPX miles to official miles
+        self.calibration = calibration
+        self.TRAIL_LENGTH = official_trail_length()
+        
+    def _emission_costs(self, candidates: List, hint: Optional[float]) -> np.ndarray:
+        """Cost of each candidate for a single waypoint"""
+        miles = np.array([c[0] for c in candidates])
+        costs = np.array([c[1] for c in candidates])
+        
+        if hint and self.hint_weight > 0:
+            costs = costs + self.hint_weight * np.abs(miles - hint)
+            
+        return costs
+        
+    def match(self, waypoints: List[Dict]) -> List[Optional[Dict]]:
+        """Match waypoints in list order; returns one result per waypoint (None if no coordinates)"""
+        results: List[Optional[Dict]] = [None] * len(waypoints)
+        
+        # Waypoints without coordinates do not take part in the chain
+        positions = [i for i, wp in enumerate(waypoints) if wp.get('lat') and wp.get('lng')]
+        if not positions:
+            return results
+            
+        cand_miles = []
+        cand_dists = []
+        costs = []
+        backpointers = []
+        backtracked = []
+        
+        prev_cost = None
+        prev_miles_sorted = None
+        prev_order = None
+        prefix_min = None
+        prefix_arg = None
+        
+        for pos in positions:
+            wp = waypoints[pos]
+            candidates = self.track.candidates(wp['lat'], wp['lng'], k=self.k, radius=self.radius)
+            miles = np.array([c[0] for c in candidates])
+            dists = np.array([c[1] for c in candidates])
+            emission = self._emission_costs(candidates, wp.get('mile'))
+            
+            if prev_cost is None:
+                total = emission
+                pointer = np.full(len(candidates), -1)
+                reversed_step = np.zeros(len(candidates), dtype=bool)
+            else:
+                # Best ordered predecessor: prefix minimum over previous miles <= current mile
+                cut = np.searchsorted(prev_miles_sorted, miles + self.mile_tolerance, side='right')
+                ordered_cost = np.where(cut > 0, prefix_min[np.maximum(cut - 1, 0)], np.inf)
+                ordered_arg = np.where(cut > 0, prefix_arg[np.maximum(cut - 1, 0)], -1)
+                
+                # Any predecessor, paying the backtrack penalty
+                global_arg = int(np.argmin(prev_cost))
+                backtrack_cost = prev_cost[global_arg] + self.backtrack_penalty
+                
+                reversed_step = ordered_cost > backtrack_cost
+                total = emission + np.where(reversed_step, backtrack_cost, ordered_cost)
+                pointer = np.where(reversed_step, global_arg, prev_order[ordered_arg])
+                
+            cand_miles.append(miles)
+            cand_dists.append(dists)
+            costs.append(total)
+            backpointers.append(pointer)
+            backtracked.append(reversed_step)
+            
+            # Sorted view of this step for the next one
+            prev_cost = total
+            prev_order = np.argsort(miles, kind='stable')
+            prev_miles_sorted = miles[prev_order]
+            sorted_cost = total[prev_order]
+            prefix_min = np.minimum.accumulate(sorted_cost)
+            prefix_arg = np.zeros(len(sorted_cost), dtype=np.int64)
+            for j in range(1, len(sorted_cost)):
+                prefix_arg[j] = j if sorted_cost[j] < prefix_min[j - 1] else prefix_arg[j - 1]
+                
+        # Backtrack the cheapest path
+        choice = int(np.argmin(costs[-1]))
+        for step in range(len(positions) - 1, -1, -1):
+            results[positions[step]] = {
+                'mile': float(cand_miles[step][choice]),
+                'offTrail': float(cand_dists[step][choice]),
+                'candidates': len(cand_miles[step]),
+                'backtrack': bool(backtracked[step][choice]),
+            }
+            choice = int(backpointers[step][choice])
+            
+        return results
+        
+    def match_waypoints(self, waypoints: List[Dict]) -> List[Dict]:
+        """Write matched miles back onto the waypoint records"""
+        logger.info(f"Map-matching {len(waypoints)} waypoints onto the track...")
+        
+        results = self.match(waypoints)
+        matched_count = 0
+        backtrack_count = 0
+        
+        for waypoint, result in zip(waypoints, results):
+            if result is None:
+                continue
+                
+            mile = result['mile']
+            waypoint['gpxMile'] = round(mile, 3)
+            waypoint['mile'] = round(mile, 1)
+            waypoint['soboMile'] = round(self.TRAIL_LENGTH - mile, 1)
+            matched_count += 1
+            
+            if result['offTrail'] > 0.5:
+                logger.warning(f"{waypoint.get('name')}: matched {result['offTrail']:.2f} miles from trail")
+            if result['backtrack']:
+                backtrack_count += 1
+                logger.warning(f"{waypoint.get('name')}: out of guidebook order at mile {mile:.1f}")
+                
+        if self.calibration is not None:
+            self.calibration.apply_to_records(waypoints)
+            
+        logger.info(f"Matched {matched_count} waypoints ({backtrack_count} out of order)")
+        return waypoints
+
+def main():
+    """Main execution"""
+    script_dir = Path(__file__).parent
+    backend_dir = script_dir.parent
+    data_dir = backend_dir / "data"
+    gpx_path = data_dir / "appalachian-trail.gpx"
+    extracted_dir = data_dir / "extracted"
+    
+    track = GpxTrack(str(gpx_path)).load()
+    
+    # Convert GPX miles to official miles when a calibration model has been fitted
+    calibration = None
+    calibration_file = data_dir / "mile_calibration.json"
+    if calibration_file.exists():
+        from mile_calibration import MileCalibrationModel
+        calibration = MileCalibrationModel.load(str(calibration_file))
+        if abs(calibration.gpx_knots[-1] - track.total_miles) > 0.01:
+            logger.warning("Calibration was fitted on a different track; keeping raw GPX miles")
+            calibration = None
+            
+    matcher = WaypointMapMatcher(track, calibration=calibration)
+    
+    # Waypoints are stored in guidebook (page) order by the extractors
+    waypoints_file = extracted_dir / "comprehensive_waypoints.json"
+    if not waypoints_file.exists():
+        logger.error(f"Waypoints file not found: {waypoints_file}")
+        return
+        
+    with open(waypoints_file, 'r', encoding='utf-8') as f:
+        waypoints = json.load(f)
+        
+    waypoints = matcher.match_waypoints(waypoints)
+    
+    output_file = extracted_dir / "matched_waypoints.json"
+    write_if_changed(output_file, json.dumps(waypoints, indent=2))
+        
+    logger.info(f"Saved matched waypoints to {output_file}")
+
+if __name__ == "__main__":
+    main()
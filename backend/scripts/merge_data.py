@@ -5,11 +5,17 @@ Handles deduplication, data enrichment, and TypeScript code generation
 """
 
 import json
-import re
 from pathlib import Path
-from typing import Dict, List, Set, Any, Optional
+from typing import Dict, List, Set, Any, Optional, Tuple
 import logging
 
+import numpy as np
+
+from atomic_write import write_if_changed
+from json_module import to_json_module
+from name_index import TokenIndex
+from ts_literal import format_string, parse_module
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -34,73 +40,53 @@ class DataMerger:
     
     def parse_typescript_array(self, content: str, array_name: str) -> List[Dict]:
         """Parse TypeScript array from file content"""
-        # This is a simplified parser - for production, use a proper TS parser
-        # For now, we'll just extract the array data
-        
-        pattern = rf'{array_name}\s*:\s*\w+\[\]\s*=\s*\[(.*?)\];'
-        match = re.search(pattern, content, re.DOTALL)
-        
-        if not match:
-            return []
-        
-        # Extract object literals
-        objects = []
-        array_content = match.group(1)
-        
-        # Simple object extraction (this is a basic implementation)
-        object_pattern = r'\{[^}]+\}'
-        for obj_match in re.finditer(object_pattern, array_content):
-            obj_str = obj_match.group(0)
-            # Convert to JSON-like format (simplified)
-            # In production, use a proper parser
-            objects.append({})
-        
-        return objects
+        return [dict(record) for record in parse_module(content).get(array_name, [])]
     
     def normalize_name(self, name: str) -> str:
         """Normalize waypoint/town name for comparison"""
         return name.lower().strip().replace('  ', ' ')
     
-    def find_duplicate(self, item: Dict, existing: List[Dict], threshold: float = 0.9) -> Optional[Dict]:
-        """Find duplicate item in existing data"""
-        item_name = self.normalize_name(item.get('name', ''))
-        
-        for existing_item in existing:
-            existing_name = self.normalize_name(existing_item.get('name', ''))
-            
-            # Exact name match
-            if item_name == existing_name:
-                return existing_item
-            
-            # Fuzzy name match (simple implementation)
-            if self._similarity(item_name, existing_name) >= threshold:
-                return existing_item
-            
-            # GPS proximity match (within ~100m)
-            if self._gps_distance(item, existing_item) < 0.001:
-                return existing_item
+    def build_duplicate_index(self, existing: List[Dict]) -> Dict:
+        """Name lookups and coordinate arrays for find_duplicate, built once per list"""
+        names = [self.normalize_name(e.get('name', '')) for e in existing]
+        exact = {}
+        for i, name in enumerate(names):
+            exact.setdefault(name, i)
         
-        return None
+        return {
+            'exact': exact,
+            'tokens': TokenIndex(names),
+            'lats': np.array([e.get('lat', 0) for e in existing], dtype=np.float64),
+            'lngs': np.array([e.get('lng', 0) for e in existing], dtype=np.float64),
+        }
     
-    def _similarity(self, s1: str, s2: str) -> float:
-        """Calculate string similarity (Jaccard similarity)"""
-        set1 = set(s1.split())
-        set2 = set(s2.split())
+    def find_duplicate(self, item: Dict, existing: List[Dict], threshold: float = 0.9,
+                       index: Optional[Dict] = None) -> Optional[Dict]:
+        """Find duplicate item in existing data (earliest item matching by name, similarity or GPS)"""
+        if not existing:
+            return None
+        if index is None:
+            index = self.build_duplicate_index(existing)
+        
+        item_name = self.normalize_name(item.get('name', ''))
+        hits = []
         
-        if not set1 or not set2:
-            return 0.0
+        # Exact name match
+        exact = index['exact'].get(item_name)
+        if exact is not None:
+            hits.append(exact)
         
-        intersection = len(set1 & set2)
-        union = len(set1 | set2)
+        # Fuzzy name match, scored only against names sharing a token
+        similar = index['tokens'].first_at_least(item_name, threshold)
+        if similar is not None:
+            hits.append(similar)
         
-        return intersection / union if union > 0 else 0.0
-    
-    def _gps_distance(self, item1: Dict, item2: Dict) -> float:
-        """Calculate simple GPS distance"""
-        lat1, lng1 = item1.get('lat', 0), item1.get('lng', 0)
-        lat2, lng2 = item2.get('lat', 0), item2.get('lng', 0)
+        # GPS proximity match (within ~100m)
+        near = np.flatnonzero(np.hypot(index['lats'] - item.get('lat', 0), index['lngs'] - item.get('lng', 0)) < 0.001)
+        if len(near):
+            hits.append(int(near[0]))
         
-        return ((lat1 - lat2) ** 2 + (lng1 - lng2) ** 2) ** 0.5
+        return existing[min(hits)] if hits else None
     
     def merge_waypoint_data(self, existing: Dict, extracted: Dict) -> Dict:
         """Merge two waypoint records, preferring more complete data"""
@@ -150,8 +136,9 @@ class DataMerger:
         logger.info(f"Unique extracted waypoints: {len(unique_extracted)}")
         
         # Merge with existing
+        existing_index = self.build_duplicate_index(existing)
         for extracted_item in unique_extracted:
-            duplicate = self.find_duplicate(extracted_item, existing)
+            duplicate = self.find_duplicate(extracted_item, existing, index=existing_index)
             
             if duplicate:
                 # Merge data
@@ -162,8 +149,9 @@ class DataMerger:
                 self.merged_waypoints.append(extracted_item)
         
         # Add existing items not in extracted
+        extracted_index = self.build_duplicate_index(unique_extracted)
         for existing_item in existing:
-            if not self.find_duplicate(existing_item, unique_extracted):
+            if not self.find_duplicate(existing_item, unique_extracted, index=extracted_index):
                 self.merged_waypoints.append(existing_item)
         
         logger.info(f"Total merged waypoints: {len(self.merged_waypoints)}")
@@ -184,12 +172,12 @@ class DataMerger:
                     continue
                 
                 if isinstance(value, str):
-                    lines.append(f"    {key}: '{value}',")
+                    lines.append(f"    {key}: {format_string(value)},")
                 elif isinstance(value, bool):
                     lines.append(f"    {key}: {str(value).lower()},")
                 elif isinstance(value, list):
                     if all(isinstance(x, str) for x in value):
-                        items = ", ".join(f"'{x}'" for x in value)
+                        items = ", ".join(format_string(x) for x in value)
                         lines.append(f"    {key}: [{items}],")
                     else:
                         lines.append(f"    {key}: {json.dumps(value)},")
@@ -203,22 +191,33 @@ class DataMerger:
         
         return "\n".join(lines)
     
+    def generate_json_module(self, data: List[Dict], type_name: str, json_name: str,
+                             pretty: bool = False) -> Tuple[str, str]:
+        """Generate (typed TS wrapper, JSON data) for the same module as generate_typescript_code"""
+        ts_code = self.generate_typescript_code(data, type_name)
+        return to_json_module(ts_code, f"{type_name.lower()}s", json_name, pretty)
+    
     def save_merged_data(self):
         """Save merged data to JSON files"""
         # Save merged waypoints
         output_file = self.extracted_dir / "merged_waypoints.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(self.merged_waypoints, f, indent=2)
+        write_if_changed(output_file, json.dumps(self.merged_waypoints, indent=2))
         
         logger.info(f"Saved {len(self.merged_waypoints)} merged waypoints to {output_file}")
         
         # Generate TypeScript code
         ts_code = self.generate_typescript_code(self.merged_waypoints[:10], 'Waypoint')
         ts_file = self.extracted_dir / "merged_waypoints_sample.ts"
-        with open(ts_file, 'w', encoding='utf-8') as f:
-            f.write(ts_code)
+        write_if_changed(ts_file, ts_code)
         
         logger.info(f"Generated TypeScript sample: {ts_file}")
+        
+        # Full merged set as a JSON module (data in .json, typed wrapper in .ts)
+        wrapper, json_text = self.generate_json_module(self.merged_waypoints, 'Waypoint', 'merged_waypoints_module.json')
+        write_if_changed(self.extracted_dir / "merged_waypoints_module.ts", wrapper)
+        write_if_changed(self.extracted_dir / "merged_waypoints_module.json", json_text)
+        
+        logger.info(f"Generated JSON module: {self.extracted_dir / 'merged_waypoints_module.ts'}")
     
     def generate_merge_report(self) -> str:
         """Generate merge report"""
@@ -238,6 +237,7 @@ class DataMerger:
             "Files Generated:",
             f"  - {self.extracted_dir / 'merged_waypoints.json'}",
             f"  - {self.extracted_dir / 'merged_waypoints_sample.ts'}",
+            f"  - {self.extracted_dir / 'merged_waypoints_module.ts'} (+ .json)",
             "",
             "="*80
         ]
@@ -264,8 +264,7 @@ def main():
     print(report)
     
     report_file = extracted_dir / "merge_report.txt"
-    with open(report_file, 'w', encoding='utf-8') as f:
-        f.write(report)
+    write_if_changed(report_file, report)
     
     logger.info(f"Merge report saved to {report_file}")
 
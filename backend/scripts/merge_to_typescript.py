@@ -6,20 +6,27 @@ Creates backups for easy rollback
 
 import json
 import shutil
+import sys
 from pathlib import Path
 from typing import Dict, List, Set
 from datetime import datetime
 import logging
 
+from atomic_write import is_changed, write_if_changed
+from json_module import to_json_module
+from trail_constants import official_trail_length
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class TypeScriptMerger:
     """Merge JSON data into TypeScript files with backup"""
     
-    def __init__(self, extracted_dir: str, webapp_data_dir: str):
+    def __init__(self, extracted_dir: str, webapp_data_dir: str, output_format: str = 'ts'):
         self.extracted_dir = Path(extracted_dir)
         self.webapp_data_dir = Path(webapp_data_dir)
+        # 'ts' (object literals), 'json' or 'json-pretty' (data in .json next to a typed wrapper)
+        self.output_format = output_format
         self.backup_dir = self.webapp_data_dir / ".backup"
         self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
@@ -31,7 +38,7 @@ class TypeScriptMerger:
         backup_subdir = self.backup_dir / self.timestamp
         backup_subdir.mkdir(exist_ok=True)
         
-        files_to_backup = ['shelters.ts', 'features.ts', 'resupply.ts']
+        files_to_backup = ['shelters.ts', 'features.ts', 'resupply.ts', 'shelters.json', 'resupply.json']
         
         for filename in files_to_backup:
             source = self.webapp_data_dir / filename
@@ -95,13 +102,14 @@ Location: `webapp/src/data/.backup/{self.timestamp}/`
     
     def generate_shelter_typescript(self, waypoints: List[Dict]) -> str:
         """Generate TypeScript code for shelters"""
-        shelters = [wp for wp in waypoints if wp.get('type') == 'shelter']
+        shelters = sorted((wp for wp in waypoints if wp.get('type') == 'shelter'),
+                          key=lambda wp: (wp['mile'], wp['name']))
         
         lines = [
             "import type { Shelter } from '../types';",
             "",
             "// Trail constants",
-            "export const TRAIL_LENGTH = 2197.4;",
+            f"export const TRAIL_LENGTH = {official_trail_length()};",
             "",
             "export const STATE_BOUNDARIES = {",
             "  GA: { start: 0, end: 78.5 },",
@@ -117,7 +125,7 @@ Location: `webapp/src/data/.backup/{self.timestamp}/`
             "  MA: { start: 1508.0, end: 1599.0 },",
             "  VT: { start: 1599.0, end: 1755.0 },",
             "  NH: { start: 1755.0, end: 1898.0 },",
-            "  ME: { start: 1898.0, end: 2197.4 },",
+            f"  ME: {{ start: 1898.0, end: {official_trail_length()} }},",
             "};",
             "",
             "export const shelters: Shelter[] = ["
@@ -167,7 +175,7 @@ Location: `webapp/src/data/.backup/{self.timestamp}/`
             "export const resupplyPoints: ResupplyPoint[] = ["
         ]
         
-        for town in towns:
+        for town in sorted(towns, key=lambda t: (t['mile'], t['name'])):
             lines.append("  {")
             lines.append(f"    id: '{self._generate_id(town['name'])}',")
             lines.append(f"    name: '{self._escape_string(town['name'])}',")
@@ -207,11 +215,13 @@ Location: `webapp/src/data/.backup/{self.timestamp}/`
         return s.replace("'", "\\'").replace('"', '\\"')
     
     def merge_data(self):
-        """Perform the merge"""
-        logger.info("Starting data merge...")
+        """Perform the merge
         
-        # Create backups
-        backup_dir = self.create_backups()
+        Every file is rendered first; only files whose content changed are
+        backed up and (atomically) rewritten, so a rerun on the same data
+        touches nothing.
+        """
+        logger.info("Starting data merge...")
         
         # Load calibrated data
         data = self.load_calibrated_data()
@@ -219,18 +229,25 @@ Location: `webapp/src/data/.backup/{self.timestamp}/`
         # Generate new TypeScript files
         logger.info("Generating new TypeScript files...")
         
+        outputs = {}
         shelters_ts = self.generate_shelter_typescript(data['waypoints'])
-        shelters_file = self.webapp_data_dir / "shelters.ts"
-        with open(shelters_file, 'w', encoding='utf-8') as f:
-            f.write(shelters_ts)
-        logger.info(f"Generated {shelters_file}")
+        outputs.update(self._render_module(self.webapp_data_dir / "shelters.ts", shelters_ts, 'shelters'))
         
         resupply_ts = self.generate_resupply_typescript(data['towns'])
-        resupply_file = self.webapp_data_dir / "resupply.ts"
-        with open(resupply_file, 'w', encoding='utf-8') as f:
-            f.write(resupply_ts)
-        logger.info(f"Generated {resupply_file}")
+        outputs.update(self._render_module(self.webapp_data_dir / "resupply.ts", resupply_ts, 'resupplyPoints'))
+        
+        changed = [path for path, content in outputs.items() if is_changed(path, content)]
+        if not changed:
+            logger.info("Data files already up to date - nothing written")
+            return
+            
+        # Create backups
+        backup_dir = self.create_backups()
         
+        for path in changed:
+            write_if_changed(path, outputs[path])
+            logger.info(f"Generated {path}")
+            
         # Generate merge report
         report = self._generate_merge_report(data, backup_dir)
         report_file = self.extracted_dir / "merge_report.txt"
@@ -240,6 +257,14 @@ Location: `webapp/src/data/.backup/{self.timestamp}/`
         logger.info(f"Merge report saved to {report_file}")
         print(report)
     
+    def _render_module(self, ts_file: Path, ts_code: str, export: str) -> Dict[Path, str]:
+        """Files of a generated module: the TS literals, or the JSON data plus a typed wrapper"""
+        if self.output_format == 'ts':
+            return {ts_file: ts_code}
+        json_file = ts_file.with_suffix('.json')
+        wrapper, json_text = to_json_module(ts_code, export, json_file.name, pretty=self.output_format == 'json-pretty')
+        return {ts_file: wrapper, json_file: json_text}
+    
     def _generate_merge_report(self, data: Dict, backup_dir: Path) -> str:
         """Generate merge report"""
         report = [
@@ -300,7 +325,13 @@ def main():
     extracted_dir = backend_dir / "data" / "extracted"
     webapp_data_dir = backend_dir.parent / "webapp" / "src" / "data"
     
-    merger = TypeScriptMerger(str(extracted_dir), str(webapp_data_dir))
+    # --json / --json-pretty write the data as JSON modules
+    output_format = sys.argv[1].lstrip('-') if len(sys.argv) > 1 else 'ts'
+    if output_format not in ('ts', 'json', 'json-pretty'):
+        logger.error("Usage: python merge_to_typescript.py [--json | --json-pretty]")
+        sys.exit(1)
+    
+    merger = TypeScriptMerger(str(extracted_dir), str(webapp_data_dir), output_format)
     merger.merge_data()
     
     logger.info("Merge complete! Ready to deploy.")
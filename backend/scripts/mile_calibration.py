@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Piecewise-linear calibration between GPX track distance and official miles
+Fits knot arrays (gpx_mile -> official_mile) from anchor waypoints whose
+guidebook miles are trusted, records residual statistics, and persists the
+model so every stage converts miles with the same interpolation
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+import numpy as np
+
+from atomic_write import write_if_changed
+from calibrate_miles import MileCalibrator
+from gpx_track import GpxTrack
+from map_matcher import WaypointMapMatcher
+from trail_constants import official_trail_length
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class MileCalibrationModel:
+    """Monotone piecewise-linear map from GPX track miles to official trail miles"""
+    
+    def __init__(self, gpx_knots, official_knots, residuals: Optional[Dict] = None):
+        self.gpx_knots = np.asarray(gpx_knots, dtype=np.float64)
+        self.official_knots = np.asarray(official_knots, dtype=np.float64)
+        self.residuals = residuals or {}
+        
+    @classmethod
+    def fit(cls, gpx_miles, official_miles, gpx_length: float, trail_length: Optional[float] = None,
+            tolerance: float = 2.0, min_knot_spacing: float = 2.0, slope_range=(0.5, 2.0)) -> 'MileCalibrationModel':
+        """Fit knots from anchor pairs
+        
+        Anchors with a wrong guidebook mile or a bad snap are rejected by
+        keeping the longest chain (pinned to 0 and the trail length at the
+        track ends) whose segment slopes stay within slope_range. Knots are
+        then chosen from that chain by residual: starting from the two ends,
+        the worst-fitting anchor becomes a knot until every anchor is within
+        tolerance official miles (knots at least min_knot_spacing GPX miles
+        apart). Residuals are reported in-sample and leave-one-out, where each
+        anchor is predicted by a model fitted without it. trail_length
+        defaults to the official length from shelters.ts.
+        """
+        if trail_length is None:
+            trail_length = official_trail_length()
+        gpx_miles = np.asarray(gpx_miles, dtype=np.float64)
+        official_miles = np.asarray(official_miles, dtype=np.float64)
+        order = np.argsort(gpx_miles, kind='stable')
+        
+        # Endpoints bracket the anchors so the chain always spans the whole track
+        chain_gpx = np.concatenate(([0.0], gpx_miles[order], [gpx_length]))
+        chain_official = np.concatenate(([0.0], official_miles[order], [trail_length]))
+        inliers = np.array(cls._longest_chain(chain_gpx, chain_official, slope_range), dtype=np.int64)
+        inlier_gpx = chain_gpx[inliers]
+        inlier_official = chain_official[inliers]
+        
+        knots = cls._select_knots(inlier_gpx, inlier_official, tolerance, min_knot_spacing)
+        model = cls(inlier_gpx[knots], inlier_official[knots])
+        
+        # Held-out prediction of every interior anchor
+        held_out = np.empty(len(inliers) - 2)
+        for j in range(1, len(inliers) - 1):
+            kept = np.delete(np.arange(len(inliers)), j)
+            loo_knots = kept[cls._select_knots(inlier_gpx[kept], inlier_official[kept], tolerance, min_knot_spacing)]
+            held_out[j - 1] = np.interp(inlier_gpx[j], inlier_gpx[loo_knots], inlier_official[loo_knots])
+            
+        model.residuals = {
+            'inSample': model.residual_stats(inlier_gpx[1:-1], inlier_official[1:-1]),
+            'leaveOneOut': cls._stats(inlier_official[1:-1] - held_out),
+            'rejected': len(gpx_miles) - (len(inliers) - 2),
+            'knots': len(knots),
+            'tolerance': tolerance,
+        }
+        return model
+        
+    @staticmethod
+    def _select_knots(gpx: np.ndarray, official: np.ndarray, tolerance: float, min_knot_spacing: float) -> np.ndarray:
+        """Indices of the knots (always the first and last point) chosen greedily by worst residual"""
+        knots = [0, len(gpx) - 1]
+        while True:
+            ordered = np.sort(knots)
+            errors = np.abs(official - np.interp(gpx, gpx[ordered], official[ordered]))
+            gaps = np.abs(gpx[:, None] - gpx[ordered][None, :]).min(axis=1)
+            errors[gaps < min_knot_spacing] = 0.0
+            worst = int(np.argmax(errors))
+            if errors[worst] <= tolerance:
+                return ordered
+            knots.append(worst)
+            
+    @staticmethod
+    def _longest_chain(gpx: np.ndarray, official: np.ndarray, slope_range) -> List[int]:
+        """Longest index chain from first to last point with every slope inside slope_range"""
+        n = len(gpx)
+        low, high = slope_range
+        length = np.full(n, -1, dtype=np.int64)
+        parent = np.full(n, -1, dtype=np.int64)
+        length[0] = 0
+        
+        for j in range(1, n):
+            d_gpx = gpx[j] - gpx[:j]
+            d_official = official[j] - official[:j]
+            ok = (length[:j] >= 0) & (d_gpx > 0) & (d_official >= low * d_gpx) & (d_official <= high * d_gpx)
+            if ok.any():
+                best = int(np.argmax(np.where(ok, length[:j], -1)))
+                length[j] = length[best] + 1
+                parent[j] = best
+                
+        # The end point may be unreachable only if the slope range excludes the overall scale
+        last = n - 1 if length[n - 1] >= 0 else int(np.argmax(length))
+        chain = [last]
+        while parent[chain[-1]] >= 0:
+            chain.append(int(parent[chain[-1]]))
+        return chain[::-1]
+        
+    def _convert(self, miles, source: np.ndarray, target: np.ndarray) -> np.ndarray:
+        """np.interp with linear extrapolation past the end knots (approach trail, overshoot)"""
+        miles = np.asarray(miles, dtype=np.float64)
+        result = np.interp(miles, source, target)
+        
+        low_slope = (target[1] - target[0]) / (source[1] - source[0])
+        high_slope = (target[-1] - target[-2]) / (source[-1] - source[-2])
+        result = np.where(miles < source[0], target[0] + (miles - source[0]) * low_slope, result)
+        result = np.where(miles > source[-1], target[-1] + (miles - source[-1]) * high_slope, result)
+        return result
+        
+    def to_official(self, gpx_miles) -> np.ndarray:
+        """Official trail miles for GPX track miles"""
+        return self._convert(gpx_miles, self.gpx_knots, self.official_knots)
+        
+    def to_gpx(self, official_miles) -> np.ndarray:
+        """GPX track miles for official trail miles"""
+        return self._convert(official_miles, self.official_knots, self.gpx_knots)
+        
+    def residual_stats(self, gpx_miles, official_miles) -> Dict:
+        """Official-mile residuals of the model over anchor pairs"""
+        return self._stats(np.asarray(official_miles, dtype=np.float64) - self.to_official(gpx_miles))
+        
+    @staticmethod
+    def _stats(residuals: np.ndarray) -> Dict:
+        """Summary of official-mile residuals"""
+        if len(residuals) == 0:
+            return {'anchors': 0}
+            
+        abs_residuals = np.abs(residuals)
+        return {
+            'anchors': len(residuals),
+            'mean': round(float(residuals.mean()), 3),
+            'rms': round(float(np.sqrt(np.mean(residuals ** 2))), 3),
+            'p95': round(float(np.percentile(abs_residuals, 95)), 3),
+            'max': round(float(abs_residuals.max()), 3),
+        }
+        
+    def apply_to_records(self, records: List[Dict], gpx_field: str = 'gpxMile'):
+        """Set mile/soboMile on every record carrying a GPX mile, in one vectorized call"""
+        located = [r for r in records if r.get(gpx_field) is not None]
+        if not located:
+            return records
+            
+        miles = self.to_official([r[gpx_field] for r in located])
+        trail_length = float(self.official_knots[-1])
+        for record, mile in zip(located, miles):
+            record['mile'] = round(float(mile), 1)
+            record['soboMile'] = round(trail_length - float(mile), 1)
+            
+        return records
+        
+    def to_dict(self) -> Dict:
+        """JSON-serializable form"""
+        return {
+            'trailLength': float(self.official_knots[-1]),
+            'gpxLength': float(self.gpx_knots[-1]),
+            'gpxKnots': np.round(self.gpx_knots, 4).tolist(),
+            'officialKnots': np.round(self.official_knots, 4).tolist(),
+            'residuals': self.residuals,
+        }
+        
+    def save(self, path: str):
+        """Persist the model as JSON"""
+        write_if_changed(Path(path), json.dumps(self.to_dict(), indent=2))
+            
+    @classmethod
+    def load(cls, path: str) -> 'MileCalibrationModel':
+        """Load a model written by save()"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['gpxKnots'], data['officialKnots'], data.get('residuals'))
+
+def collect_anchors(track: GpxTrack, references: List[Dict], max_offset: float = 0.2) -> List[Dict]:
+    """Snap mile-ordered reference waypoints onto the track and keep confident on-trail matches"""
+    matcher = WaypointMapMatcher(track)
+    anchors = []
+    for ref, result in zip(references, matcher.match(references)):
+        if result is None or result['backtrack'] or result['offTrail'] > max_offset:
+            continue
+        anchors.append({'name': ref['name'], 'gpxMile': result['mile'], 'mile': ref['mile']})
+        
+    logger.info(f"Using {len(anchors)} of {len(references)} reference waypoints as anchors")
+    return anchors
+
+def main():
+    """Main execution"""
+    script_dir = Path(__file__).parent
+    backend_dir = script_dir.parent
+    project_dir = backend_dir.parent
+    webapp_data_dir = project_dir / "webapp" / "src" / "data"
+    gpx_path = Path(sys.argv[1]) if len(sys.argv) > 1 else webapp_data_dir / "at-elevation.gpx"
+    
+    track = GpxTrack(str(gpx_path)).load()
+    
+    # Shelters, features and resupply points with trusted miles, in mile order
+    calibrator = MileCalibrator(str(webapp_data_dir))
+    calibrator.load_reference_waypoints()
+    references = [ref for ref in calibrator.reference_waypoints if 0 < ref['mile'] < official_trail_length()]
+    
+    anchors = collect_anchors(track, references)
+    model = MileCalibrationModel.fit(
+        [a['gpxMile'] for a in anchors], [a['mile'] for a in anchors], track.total_miles
+    )
+    
+    stats = model.residuals
+    logger.info(f"Fitted {stats['knots']} knots ({stats['rejected']} anchors rejected): "
+                f"in-sample RMS {stats['inSample'].get('rms')} mi, "
+                f"leave-one-out RMS {stats['leaveOneOut'].get('rms')} mi, max {stats['leaveOneOut'].get('max')} mi")
+                
+    output_file = backend_dir / "data" / "mile_calibration.json"
+    model.save(str(output_file))
+    logger.info(f"Saved calibration model to {output_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Token inverted index for fuzzy name matching
+Precomputes each name's token set once and maps tokens to the names that
+contain them, so Jaccard similarity is only computed for names sharing at
+least one token with the query
+"""
+
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+class TokenIndex:
+    """Inverted index token -> name positions, with Jaccard scoring over candidates"""
+    
+    def __init__(self, names: Iterable[str] = (), tokenize: Callable[[str], List[str]] = str.split):
+        self.tokenize = tokenize
+        self.token_sets: List[FrozenSet[str]] = []
+        self.postings: Dict[str, List[int]] = {}
+        for name in names:
+            self.add(name)
+            
+    def __len__(self) -> int:
+        return len(self.token_sets)
+        
+    def add(self, name: str) -> int:
+        """Index a name; returns its position"""
+        position = len(self.token_sets)
+        tokens = frozenset(self.tokenize(name))
+        self.token_sets.append(tokens)
+        for token in tokens:
+            self.postings.setdefault(token, []).append(position)
+        return position
+        
+    def candidates(self, tokens: Iterable[str]) -> List[int]:
+        """Positions of names sharing at least one token, in insertion order"""
+        found = set()
+        for token in tokens:
+            found.update(self.postings.get(token, ()))
+        return sorted(found)
+        
+    def scores(self, name: str) -> List[Tuple[int, float]]:
+        """(position, Jaccard similarity) for every candidate, in insertion order"""
+        query = frozenset(self.tokenize(name))
+        results = []
+        for position in self.candidates(query):
+            tokens = self.token_sets[position]
+            results.append((position, len(query & tokens) / len(query | tokens)))
+        return results
+        
+    def best_match(self, name: str, min_score: float = 0.0) -> Optional[Tuple[int, float]]:
+        """Highest-scoring name strictly above min_score; earliest position wins ties"""
+        best = None
+        for position, score in self.scores(name):
+            if score > min_score and (best is None or score > best[1]):
+                best = (position, score)
+        return best
+        
+    def first_at_least(self, name: str, threshold: float) -> Optional[int]:
+        """Earliest position whose similarity reaches threshold"""
+        for position, score in self.scores(name):
+            if score >= threshold:
+                return position
+        return None
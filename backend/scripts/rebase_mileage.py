@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Rebase every mile field in the web app data from one mileage edition to another
+Maps old official miles to new ones through anchor correspondences (piecewise
+linear), rewrites shelters, features, resupply, contacts and the elevation
+profile in vectorized passes through the parsed literals, and recomputes the derived soboMile values
+
+Edition file format (JSON; "edition" optionally renames the year in the
+"Official YYYY AT length" comments):
+    {"fromLength": 2197.4, "toLength": 2197.9, "anchors": [[old_mile, new_mile], ...], "edition": "2026"}
+"""
+
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+import numpy as np
+
+from atomic_write import write_if_changed
+from mile_calibration import MileCalibrationModel
+from ts_literal import export_spans, iter_records
+from ts_patch import TsPatch
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+NUMBER = r'-?\d+(?:\.\d+)?'
+
+CONTACT_MILES = re.compile(rf'(NOBO Mile |\(Mile )({NUMBER})')
+OFFICIAL_YEAR = re.compile(r'(Official )\d{4}( AT length)')
+
+# Data file -> literal export the rebase reads; files converted by json_module.py
+# or elevation_binary.py no longer hold it and have to be inlined first
+LITERAL_EXPORTS = {
+    'shelters.ts': 'shelters',
+    'features.ts': 'features',
+    'resupply.ts': 'resupplyPoints',
+    'contacts.ts': 'resupplyContacts',
+    'elevation.ts': 'elevationProfile',
+}
+
+# Constants that hold the trail length itself
+LENGTH_CONSTANTS = ('TRAIL_LENGTH', 'TRAIL_END')
+
+def format_like(value: float, original: str) -> str:
+    """Format a rebased number with the precision of the text it replaces"""
+    decimals = len(original.split('.')[1]) if '.' in original else 0
+    rounded = round(float(value), max(decimals, 1))
+    if decimals == 0 and rounded == int(rounded):
+        return str(int(rounded))
+    return f"{rounded:.{max(decimals, 1)}f}"
+
+def js_number(value: float, decimals: int) -> str:
+    """Round and print a number the way the TypeScript generators do (no trailing .0)"""
+    rounded = round(float(value), decimals)
+    return str(int(rounded)) if rounded == int(rounded) else repr(rounded)
+
+def require_literal(filename: str, content: str):
+    """Raise ValueError when a data file does not hold its data as a literal export"""
+    export = LITERAL_EXPORTS.get(filename)
+    if export and export not in export_spans(content):
+        raise ValueError(
+            f"{filename} has no {export} literal (JSON or binary wrapper?); "
+            f"run json_module.py --inline or elevation_binary.py --inline before rebasing"
+        )
+
+class MileageRebaser:
+    """Piecewise-linear map between two official mileage editions"""
+    
+    def __init__(self, from_length: float, to_length: float, anchors: List = None,
+                 edition: Optional[str] = None):
+        anchors = sorted(anchors or [])
+        old = [0.0] + [a[0] for a in anchors if 0 < a[0] < from_length] + [from_length]
+        new = [0.0] + [a[1] for a in anchors if 0 < a[0] < from_length] + [to_length]
+        if np.any(np.diff(new) <= 0):
+            raise ValueError("Anchor correspondences must increase in both editions")
+            
+        self.from_length = from_length
+        self.to_length = to_length
+        self.edition = edition
+        self.model = MileCalibrationModel(old, new)
+        
+    @classmethod
+    def from_file(cls, path: str) -> 'MileageRebaser':
+        """Load an edition file"""
+        with open(path, 'r', encoding='utf-8') as f:
+            edition = json.load(f)
+        return cls(edition['fromLength'], edition['toLength'], edition.get('anchors'), edition.get('edition'))
+        
+    def rebase(self, miles) -> np.ndarray:
+        """New-edition miles; approach-trail (negative) miles are measured from Springer and stay put"""
+        miles = np.asarray(miles, dtype=np.float64)
+        return np.where(miles <= 0, miles, self.model.to_official(miles))
+        
+    def rebase_records(self, content: str) -> str:
+        """mile/soboMile fields of shelters, features and resupply points"""
+        records = [
+            record
+            for value, _, _ in export_spans(content).values()
+            for record in iter_records(value)
+            if isinstance(record.get('mile'), (int, float)) and not isinstance(record.get('mile'), bool)
+        ]
+        if not records:
+            return content
+            
+        miles = self.rebase([record['mile'] for record in records])
+        patch = TsPatch(content)
+        for record, mile in zip(records, miles):
+            for key, value in (('mile', mile), ('soboMile', self.to_length - mile)):
+                if key in record.value_spans:
+                    start, end = record.value_spans[key]
+                    patch.replace(start, end, format_like(value, content[start:end]))
+        return patch.apply()
+        
+    def rebase_constants(self, content: str) -> str:
+        """TRAIL_LENGTH, TRAIL_END, STATE_BOUNDARIES start/end miles and the length in header comments"""
+        exports = export_spans(content)
+        patch = TsPatch(content)
+        for name in LENGTH_CONSTANTS:
+            if name in exports:
+                _, start, end = exports[name]
+                patch.replace(start, end, str(self.to_length))
+                
+        if 'STATE_BOUNDARIES' in exports:
+            bands = list(exports['STATE_BOUNDARIES'][0].values())
+            starts = self.rebase([band['start'] for band in bands])
+            ends = self.rebase([band['end'] for band in bands])
+            for band, start_mile, end_mile in zip(bands, starts, ends):
+                for key, value in (('start', start_mile), ('end', end_mile)):
+                    start, end = band.value_spans[key]
+                    patch.replace(start, end, format_like(value, content[start:end]))
+        content = patch.apply()
+        
+        # Header comments: "Official 2026 AT length: 2,197.9 miles", "Mile 2197.9 = Mt. Katahdin"
+        content = re.sub(rf'(length: ){re.escape(f"{self.from_length:,}")}( miles)',
+                         lambda m: f"{m.group(1)}{self.to_length:,}{m.group(2)}", content)
+        content = re.sub(rf'(\* Mile ){re.escape(str(self.from_length))}( =)',
+                         lambda m: f"{m.group(1)}{self.to_length}{m.group(2)}", content)
+        if self.edition:
+            content = OFFICIAL_YEAR.sub(lambda m: f"{m.group(1)}{self.edition}{m.group(2)}", content)
+        return content
+        
+    def rebase_contacts(self, content: str) -> str:
+        """Mile references in contact comments and notes ("NOBO Mile 31.7", "(Mile -8.5)")"""
+        matches = list(CONTACT_MILES.finditer(content))
+        if not matches:
+            return content
+        miles = self.rebase([float(m.group(2)) for m in matches])
+        patch = TsPatch(content)
+        for match, mile in zip(matches, miles):
+            patch.replace(match.start(2), match.end(2), format_like(mile, match.group(2)))
+        return patch.apply()
+        
+    def rebase_elevation(self, content: str) -> str:
+        """Resample the 0.1 mile elevation profile onto the new edition's mile grid"""
+        profile, start, end = export_spans(content)['elevationProfile']
+        if not profile:
+            return self.rebase_constants(content)
+        points = np.array([[p['mile'], p['elevation'], p['lat'], p['lng']] for p in profile], dtype=np.float64)
+        
+        step = 0.1
+        grid = np.round(np.arange(points[0, 0], self.to_length + step / 2, step), 1)
+        # Inverse map: where each new-edition grid mile sat in the old edition
+        old_miles = np.where(grid <= 0, grid, self.model.to_gpx(grid))
+        elevations = np.round(np.interp(old_miles, points[:, 0], points[:, 1])).astype(int)
+        lats = np.interp(old_miles, points[:, 0], points[:, 2])
+        lngs = np.interp(old_miles, points[:, 0], points[:, 3])
+        
+        lines = [
+            f"  {{ mile: {js_number(m, 1)}, elevation: {e}, lat: {js_number(lat, 4)}, lng: {js_number(lng, 4)} }}"
+            for m, e, lat, lng in zip(grid, elevations, lats, lngs)
+        ]
+        content = content[:start] + '[\n' + ',\n'.join(lines) + '\n]' + content[end:]
+        
+        # Header comment: point count
+        content = re.sub(r'\* \d+ data points', f"* {len(grid)} data points", content)
+        return self.rebase_constants(content)
+        
+    def run(self, webapp_data_dir: str, dry_run: bool = False) -> Dict[str, bool]:
+        """Rebase every data file; returns which files changed"""
+        data_dir = Path(webapp_data_dir)
+        steps = {
+            'shelters.ts': lambda c: self.rebase_constants(self.rebase_records(c)),
+            'features.ts': self.rebase_records,
+            'resupply.ts': self.rebase_records,
+            'contacts.ts': self.rebase_contacts,
+            'elevation.ts': self.rebase_elevation,
+        }
+        
+        # Check every file before writing any, so a wrapper-form file cannot leave a half-rebased tree
+        originals = {}
+        for filename in steps:
+            path = data_dir / filename
+            if not path.exists():
+                logger.warning(f"Skipping {filename}: not found")
+                continue
+            originals[filename] = path.read_text(encoding='utf-8')
+            require_literal(filename, originals[filename])
+            
+        changed = {}
+        for filename, original in originals.items():
+            updated = steps[filename](original)
+            changed[filename] = updated != original
+            if changed[filename] and not dry_run:
+                write_if_changed(data_dir / filename, updated)
+            logger.info(f"{filename}: {'updated' if changed[filename] else 'unchanged'}")
+            
+        return changed
+
+def main():
+    """Main execution"""
+    if len(sys.argv) < 2:
+        print("Usage: python rebase_mileage.py <edition.json> [--dry-run]")
+        sys.exit(1)
+        
+    script_dir = Path(__file__).parent
+    webapp_data_dir = script_dir.parent.parent / "webapp" / "src" / "data"
+    
+    rebaser = MileageRebaser.from_file(sys.argv[1])
+    logger.info(f"Rebasing miles from the {rebaser.from_length} edition to {rebaser.to_length}")
+    rebaser.run(str(webapp_data_dir), dry_run='--dry-run' in sys.argv)
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,11 @@ Restore TypeScript data files from backup
 """
 
 import sys
-import shutil
 from pathlib import Path
 import logging
 
+from atomic_write import copy_if_changed
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -30,14 +31,17 @@ def restore_backup(timestamp: str):
     
     logger.info(f"Restoring from backup: {timestamp}")
     
-    files_to_restore = ['shelters.ts', 'features.ts', 'resupply.ts']
+    files_to_restore = ['shelters.ts', 'features.ts', 'resupply.ts', 'shelters.json', 'resupply.json']
     
     for filename in files_to_restore:
         source = backup_dir / filename
         if source.exists():
             dest = webapp_data_dir / filename
-            shutil.copy2(source, dest)
-            logger.info(f"Restored {filename}")
+            # Atomic copy, skipped when the file already matches the backup
+            if copy_if_changed(source, dest):
+                logger.info(f"Restored {filename}")
+            else:
+                logger.info(f"{filename} already matches the backup")
     
     logger.info("Restore complete!")
     return True
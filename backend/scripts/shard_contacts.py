@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Sharded contacts emitter with a lazy-load manifest
+Splits the contact directory (and optionally the resupply point details) into
+one JSON shard per state or per mile band, and writes a small manifest module
+mapping each resupply id to its shard and each shard to its mile range, with
+dynamic-import loaders, so the app only fetches the shards for the towns a
+hiker is looking at
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+from atomic_write import write_if_changed
+from json_module import dumps
+from trail_constants import official_trail_length
+from ts_literal import format_string, load_module
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SHARD_DIR = 'contact-shards'
+MANIFEST = 'manifest.ts'
+
+# Resupply fields every view needs; the rest are details that can be sharded
+RESUPPLY_CORE_FIELDS = ('id', 'name', 'mile', 'soboMile', 'elevation', 'lat', 'lng', 'state', 'type')
+
+# Default mile band width for 'mile' sharding
+DEFAULT_BAND = 250.0
+
+class ShardPlan:
+    """Assigns resupply points to shards by state (optionally grouped) or by mile band"""
+    
+    def __init__(self, mode: str = 'state', boundaries: Optional[Sequence[float]] = None,
+                 state_groups: Optional[Sequence[Sequence[str]]] = None):
+        if mode not in ('state', 'mile'):
+            raise ValueError(f"Unknown shard mode {mode}")
+        self.mode = mode
+        self.boundaries = sorted(boundaries) if boundaries else None
+        # State -> shard name, for states sharing a shard ("wv-md")
+        self.state_shard: Dict[str, str] = {}
+        for group in state_groups or ():
+            name = '-'.join(s.lower() for s in group)
+            for state in group:
+                self.state_shard[state.upper()] = name
+                
+    def _band(self, mile: float) -> Tuple[float, float]:
+        """Mile band holding mile: between the configured boundaries, or DEFAULT_BAND wide"""
+        if self.boundaries:
+            lower = [b for b in self.boundaries if b <= mile]
+            upper = [b for b in self.boundaries if b > mile]
+            return (lower[-1] if lower else float('-inf')), (upper[0] if upper else float('inf'))
+        start = (mile // DEFAULT_BAND) * DEFAULT_BAND
+        return start, start + DEFAULT_BAND
+        
+    def shard_of(self, point: Dict) -> str:
+        """Shard name of one resupply point"""
+        if self.mode == 'state':
+            state = (point.get('state') or '').upper()
+            return self.state_shard.get(state, state.lower() or 'other')
+        mile = point.get('mile')
+        if not isinstance(mile, (int, float)):
+            return 'other'
+        start, end = self._band(mile)
+        low = 'start' if start == float('-inf') else f"{int(start):04d}"
+        high = 'end' if end == float('inf') else f"{int(end):04d}"
+        return f"mi-{low}-{high}"
+
+def plan_shards(points: List[Dict], plan: ShardPlan) -> Tuple[Dict[str, str], Dict[str, Dict]]:
+    """(resupply id -> shard, shard -> {start, end, count}) over the resupply points, shards in trail order
+    
+    start and end are the miles of the shard's first and last point; count
+    is filled in with its number of contact groups by emit_shards.
+    """
+    by_id: Dict[str, str] = {}
+    shards: Dict[str, Dict] = {}
+    for point in sorted(points, key=lambda p: (p.get('mile', 0), p['id'])):
+        shard = plan.shard_of(point)
+        by_id[point['id']] = shard
+        mile = point.get('mile')
+        info = shards.setdefault(shard, {'start': mile, 'end': mile, 'count': 0})
+        if isinstance(mile, (int, float)):
+            info['start'] = mile if info['start'] is None else min(info['start'], mile)
+            info['end'] = mile if info['end'] is None else max(info['end'], mile)
+    return by_id, shards
+
+def split_contacts(contacts: List[Dict], by_id: Dict[str, str]) -> Dict[str, List[Dict]]:
+    """Contact groups per shard, in file order (groups of unknown points go to 'other')"""
+    shards: Dict[str, List[Dict]] = {}
+    for group in contacts:
+        shards.setdefault(by_id.get(group['resupplyId'], 'other'), []).append(group)
+    return shards
+
+def split_resupply_details(points: List[Dict], by_id: Dict[str, str]) -> Dict[str, Dict[str, Dict]]:
+    """Detail fields (everything but RESUPPLY_CORE_FIELDS) per shard, keyed by resupply id"""
+    shards: Dict[str, Dict[str, Dict]] = {}
+    for point in points:
+        details = {k: v for k, v in point.items() if k not in RESUPPLY_CORE_FIELDS}
+        if details:
+            shards.setdefault(by_id[point['id']], {})[point['id']] = details
+    return shards
+
+def _ts_object(entries: Dict[str, str], indent: str = '  ') -> str:
+    """Object literal from pre-rendered values, one entry per line"""
+    lines = ''.join(f"{indent}{format_string(key)}: {value},\n" for key, value in entries.items())
+    return '{\n' + lines + '}'
+
+def render_manifest(shards: Dict[str, Dict], by_id: Dict[str, str], contact_shards: Sequence[str],
+                    detail_shards: Sequence[str] = ()) -> str:
+    """Manifest module: shard mile ranges, id -> shard, and cached dynamic-import loaders"""
+    def mile(value) -> str:
+        return 'null' if value is None else repr(value)
+        
+    ranges = {name: f"{{ start: {mile(info['start'])}, end: {mile(info['end'])}, count: {info['count']} }}"
+              for name, info in shards.items()}
+    ids = {point_id: format_string(shard) for point_id, shard in by_id.items()}
+    contact_loaders = {name: f"() => import('./contacts-{name}.json')" for name in contact_shards}
+    
+    lines = [
+        "// Generated by backend/scripts/shard_contacts.py - do not edit by hand",
+        "import type { ContactInfo, ResupplyPoint } from '../../types';",
+        "",
+        "export interface ContactShard {",
+        "  start: number | null;",
+        "  end: number | null;",
+        "  count: number;",
+        "}",
+        "",
+        "// Mile range and number of contact groups of each shard",
+        f"export const contactShards: Record<string, ContactShard> = {_ts_object(ranges)};",
+        "",
+        "// Shard holding each resupply point",
+        f"export const shardByResupplyId: Record<string, string> = {_ts_object(ids)};",
+        "",
+        "type Loader = () => Promise<{ default: unknown }>;",
+        "",
+        f"const contactLoaders: Record<string, Loader> = {_ts_object(contact_loaders)};",
+        "",
+        "const loadedContacts = new Map<string, Promise<ContactInfo[]>>();",
+        "",
+        "// Contacts of one shard (fetched once)",
+        "export function loadContactShard(shard: string): Promise<ContactInfo[]> {",
+        "  let shardContacts = loadedContacts.get(shard);",
+        "  if (!shardContacts) {",
+        "    const loader = contactLoaders[shard];",
+        "    shardContacts = loader ? loader().then(m => m.default as ContactInfo[]) : Promise.resolve([]);",
+        "    loadedContacts.set(shard, shardContacts);",
+        "  }",
+        "  return shardContacts;",
+        "}",
+        "",
+        "// Contacts of one resupply point, loading only its shard",
+        "export async function loadContactsByResupplyId(resupplyId: string): Promise<ContactInfo | undefined> {",
+        "  const shard = shardByResupplyId[resupplyId];",
+        "  if (!shard) return undefined;",
+        "  const shardContacts = await loadContactShard(shard);",
+        "  return shardContacts.find(c => c.resupplyId === resupplyId);",
+        "}",
+        "",
+        "// Shards overlapping a mile range (e.g. the next few days of hiking)",
+        "export function contactShardsInRange(startMile: number, endMile: number): string[] {",
+        "  return Object.keys(contactShards).filter(shard => {",
+        "    const { start, end } = contactShards[shard];",
+        "    return start === null || end === null || (end >= startMile && start <= endMile);",
+        "  });",
+        "}",
+    ]
+    
+    if detail_shards:
+        detail_loaders = {name: f"() => import('./resupply-{name}.json')" for name in detail_shards}
+        lines += [
+            "",
+            "export type ResupplyDetails = Omit<Partial<ResupplyPoint>, "
+            + ' | '.join(f"'{f}'" for f in RESUPPLY_CORE_FIELDS) + ">;",
+            "",
+            f"const detailLoaders: Record<string, Loader> = {_ts_object(detail_loaders)};",
+            "",
+            "const loadedDetails = new Map<string, Promise<Record<string, ResupplyDetails>>>();",
+            "",
+            "// Detail fields (notes, services, ...) of one resupply point, loading only its shard",
+            "export async function loadResupplyDetails(resupplyId: string): Promise<ResupplyDetails | undefined> {",
+            "  const shard = shardByResupplyId[resupplyId];",
+            "  const loader = shard ? detailLoaders[shard] : undefined;",
+            "  if (!loader) return undefined;",
+            "  let details = loadedDetails.get(shard);",
+            "  if (!details) {",
+            "    details = loader().then(m => m.default as Record<string, ResupplyDetails>);",
+            "    loadedDetails.set(shard, details);",
+            "  }",
+            "  return (await details)[resupplyId];",
+            "}",
+        ]
+    return '\n'.join(lines) + '\n'
+
+def emit_shards(webapp_data_dir: Path, plan: ShardPlan, include_resupply: bool = False,
+                pretty: bool = False) -> Dict[str, int]:
+    """Write the shards and manifest under webapp_data_dir/SHARD_DIR; returns bytes per written file
+    
+    Files are only rewritten when their content changes; shards left over
+    from an earlier plan are removed.
+    """
+    webapp_data_dir = Path(webapp_data_dir)
+    _, resupply_exports = load_module(webapp_data_dir / "resupply.ts")
+    _, contact_exports = load_module(webapp_data_dir / "contacts.ts")
+    points = resupply_exports.get('resupplyPoints', [])
+    contacts = contact_exports.get('resupplyContacts', [])
+    
+    by_id, shards = plan_shards(points, plan)
+    contact_shards = split_contacts(contacts, by_id)
+    for shard, groups in contact_shards.items():
+        shards.setdefault(shard, {'start': None, 'end': None, 'count': 0})['count'] = len(groups)
+    detail_shards = split_resupply_details(points, by_id) if include_resupply else {}
+    
+    files: Dict[str, str] = {}
+    for shard, groups in contact_shards.items():
+        files[f"contacts-{shard}.json"] = dumps(groups, pretty)
+    for shard, details in detail_shards.items():
+        files[f"resupply-{shard}.json"] = dumps(details, pretty)
+    files[MANIFEST] = render_manifest({s: i for s, i in shards.items() if s in contact_shards or s in detail_shards},
+                                      by_id, list(contact_shards), list(detail_shards))
+                                      
+    shard_dir = webapp_data_dir / SHARD_DIR
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    written = {}
+    for name, content in files.items():
+        if write_if_changed(shard_dir / name, content):
+            written[name] = len(content.encode('utf-8'))
+    for stale in shard_dir.glob('*.json'):
+        if stale.name not in files:
+            stale.unlink()
+            logger.info(f"Removed stale shard {stale.name}")
+    return written
+
+def parse_args(args: List[str]) -> Tuple[ShardPlan, bool, bool]:
+    """state [GA+NC,WV+MD] | mile [width | b1,b2,...], plus --resupply and --pretty"""
+    flags = {a for a in args if a.startswith('--')}
+    args = [a for a in args if not a.startswith('--')]
+    mode = args[0] if args else 'state'
+    option = args[1] if len(args) > 1 else None
+    
+    if mode == 'mile':
+        if option and ',' in option:
+            plan = ShardPlan('mile', boundaries=[float(b) for b in option.split(',')])
+        else:
+            width = float(option) if option else DEFAULT_BAND
+            plan = ShardPlan('mile', boundaries=[i * width for i in range(int(official_trail_length() // width) + 1)])
+    else:
+        groups = [g.split('+') for g in option.split(',')] if option else None
+        plan = ShardPlan(mode, state_groups=groups)
+    return plan, '--resupply' in flags, '--pretty' in flags
+
+def main():
+    """Main execution"""
+    script_dir = Path(__file__).parent
+    backend_dir = script_dir.parent
+    webapp_data_dir = backend_dir.parent / "webapp" / "src" / "data"
+    
+    try:
+        plan, include_resupply, pretty = parse_args(sys.argv[1:])
+    except ValueError as e:
+        logger.error(f"{e}")
+        logger.info("Usage: python shard_contacts.py [state [GA+NC,WV+MD] | mile [250 | 0,450,1000,1500]] "
+                    "[--resupply] [--pretty]")
+        sys.exit(1)
+        
+    written = emit_shards(webapp_data_dir, plan, include_resupply, pretty)
+    shard_dir = webapp_data_dir / SHARD_DIR
+    total = sum(f.stat().st_size for f in shard_dir.glob('*.json'))
+    logger.info(f"{len(list(shard_dir.glob('*.json')))} shards ({total:,} bytes) in {shard_dir}, "
+                f"{len(written)} file(s) written")
+    for name, size in written.items():
+        logger.info(f"  {name}: {size:,} bytes")
+
+if __name__ == "__main__":
+    main()
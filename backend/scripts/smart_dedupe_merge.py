@@ -5,11 +5,13 @@ Extracts business details from PDF for resupply points
 """
 
 import json
-import re
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import logging
 
+from entity_resolution import EntityResolver
+from ts_literal import load_module
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -19,96 +21,47 @@ class SmartDedupeMerger:
     def __init__(self, extracted_dir: str, webapp_data_dir: str):
         self.extracted_dir = Path(extracted_dir)
         self.webapp_data_dir = Path(webapp_data_dir)
-        
+        self.matches: List[Dict] = []
+        
+    def _parse_points(self, filename: str, export: str) -> List[Dict]:
+        """id/name/mile/lat/lng of every record in one exported array"""
+        _, exports = load_module(self.webapp_data_dir / filename)
+        points = []
+        for record in exports.get(export, []):
+            if all(key in record for key in ('id', 'name', 'mile', 'lat', 'lng')):
+                points.append({
+                    'id': record['id'],
+                    'name': record['name'],
+                    'mile': float(record['mile']),
+                    'lat': float(record['lat']),
+                    'lng': float(record['lng'])
+                })
+        return points
+    
     def parse_existing_shelters(self) -> List[Dict]:
         """Parse existing shelters from TypeScript file"""
-        shelters_file = self.webapp_data_dir / "shelters.ts"
-        content = shelters_file.read_text()
-        
-        shelters = []
-        # Find all shelter objects
-        pattern = r'\{\s*id:\s*["\']([^"\']+)["\'][^}]+name:\s*["\']([^"\']+)["\'][^}]+mile:\s*(\d+\.?\d*)[^}]+lat:\s*(-?\d+\.?\d*)[^}]+lng:\s*(-?\d+\.?\d*)'
-        
-        for match in re.finditer(pattern, content, re.DOTALL):
-            shelters.append({
-                'id': match.group(1),
-                'name': match.group(2),
-                'mile': float(match.group(3)),
-                'lat': float(match.group(4)),
-                'lng': float(match.group(5))
-            })
-        
+        shelters = self._parse_points("shelters.ts", 'shelters')
         logger.info(f"Parsed {len(shelters)} existing shelters")
         return shelters
     
     def parse_existing_resupply(self) -> List[Dict]:
         """Parse existing resupply points from TypeScript file"""
-        resupply_file = self.webapp_data_dir / "resupply.ts"
-        content = resupply_file.read_text()
-        
-        resupply = []
-        pattern = r'\{\s*id:\s*["\']([^"\']+)["\'][^}]+name:\s*["\']([^"\']+)["\'][^}]+mile:\s*(\d+\.?\d*)[^}]+lat:\s*(-?\d+\.?\d*)[^}]+lng:\s*(-?\d+\.?\d*)'
-        
-        for match in re.finditer(pattern, content, re.DOTALL):
-            resupply.append({
-                'id': match.group(1),
-                'name': match.group(2),
-                'mile': float(match.group(3)),
-                'lat': float(match.group(4)),
-                'lng': float(match.group(5))
-            })
-        
+        resupply = self._parse_points("resupply.ts", 'resupplyPoints')
         logger.info(f"Parsed {len(resupply)} existing resupply points")
         return resupply
     
-    def is_duplicate(self, new_item: Dict, existing_items: List[Dict]) -> bool:
-        """Check if item already exists (by name similarity or GPS proximity)"""
-        new_name = self._normalize_name(new_item.get('name', ''))
-        new_lat = new_item.get('lat', 0)
-        new_lng = new_item.get('lng', 0)
-        
-        for existing in existing_items:
-            existing_name = self._normalize_name(existing.get('name', ''))
-            existing_lat = existing.get('lat', 0)
-            existing_lng = existing.get('lng', 0)
-            
-            # Name match
-            if self._names_similar(new_name, existing_name):
-                logger.debug(f"Duplicate by name: '{new_item['name']}' matches '{existing['name']}'")
-                return True
-            
-            # GPS proximity (within ~100m)
-            if abs(new_lat - existing_lat) < 0.001 and abs(new_lng - existing_lng) < 0.001:
-                logger.debug(f"Duplicate by GPS: '{new_item['name']}' near '{existing['name']}'")
-                return True
-        
-        return False
-    
-    def _normalize_name(self, name: str) -> str:
-        """Normalize name for comparison"""
-        return name.lower().strip().replace('  ', ' ')
-    
-    def _names_similar(self, name1: str, name2: str) -> bool:
-        """Check if two names are similar enough to be duplicates"""
-        # Exact match
-        if name1 == name2:
+    def is_duplicate(self, new_item: Dict, existing_items: List[Dict],
+                     resolver: Optional[EntityResolver] = None) -> bool:
+        """Check if item already exists (in-block name similarity, GPS distance and mile)"""
+        resolver = resolver or EntityResolver(existing_items)
+        match = resolver.best_match(new_item)
+        if match:
+            logger.debug(f"Duplicate: '{new_item['name']}' matches '{match['record']['name']}' "
+                         f"({match['score']}: {', '.join(match['reasons'])})")
+            self.matches.append({'name': new_item.get('name'), 'mile': new_item.get('mile'),
+                                 'matchedId': match['record'].get('id'), 'matchedName': match['record'].get('name'),
+                                 'score': match['score'], 'reasons': match['reasons']})
             return True
-        
-        # Remove common words
-        for word in [' shelter', ' mountain', ' gap', ' creek', ' spring']:
-            name1 = name1.replace(word, '')
-            name2 = name2.replace(word, '')
-        
-        name1 = name1.strip()
-        name2 = name2.strip()
-        
-        if name1 == name2:
-            return True
-        
-        # One contains the other
-        if name1 in name2 or name2 in name1:
-            return True
-        
         return False
     
     def find_new_shelters(self) -> List[Dict]:
@@ -124,9 +77,10 @@ class SmartDedupeMerger:
         calibrated_shelters = [w for w in calibrated if w.get('type') == 'shelter']
         
         # Find truly new ones
+        resolver = EntityResolver(existing)
         new_shelters = []
         for shelter in calibrated_shelters:
-            if not self.is_duplicate(shelter, existing):
+            if not self.is_duplicate(shelter, existing, resolver):
                 new_shelters.append(shelter)
         
         logger.info(f"Found {len(new_shelters)} NEW shelters (out of {len(calibrated_shelters)} extracted)")
@@ -142,9 +96,10 @@ class SmartDedupeMerger:
             calibrated = json.load(f)
         
         # Find truly new ones
+        resolver = EntityResolver(existing)
         new_resupply = []
         for town in calibrated:
-            if not self.is_duplicate(town, existing):
+            if not self.is_duplicate(town, existing, resolver):
                 new_resupply.append(town)
         
         logger.info(f"Found {len(new_resupply)} NEW resupply points (out of {len(calibrated)} extracted)")
@@ -152,6 +107,7 @@ class SmartDedupeMerger:
     
     def generate_report(self):
         """Generate report of new items to add"""
+        self.matches = []
         new_shelters = self.find_new_shelters()
         new_resupply = self.find_new_resupply()
         
@@ -160,10 +116,12 @@ class SmartDedupeMerger:
             'summary': {
                 'new_shelters': len(new_shelters),
                 'new_resupply': len(new_resupply),
-                'total_new': len(new_shelters) + len(new_resupply)
+                'total_new': len(new_shelters) + len(new_resupply),
+                'matched_existing': len(self.matches)
             },
             'new_shelters': new_shelters,
-            'new_resupply': new_resupply
+            'new_resupply': new_resupply,
+            'matched_existing': self.matches
         }
         
         json_file = self.extracted_dir / "new_items_only.json"
@@ -180,6 +138,7 @@ class SmartDedupeMerger:
             f"- **New Shelters**: {len(new_shelters)}",
             f"- **New Resupply Points**: {len(new_resupply)}",
             f"- **Total New Items**: {len(new_shelters) + len(new_resupply)}",
+            f"- **Matched Existing Records**: {len(self.matches)}",
             "",
             "## New Shelters",
             ""
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Mile -> state lookup over STATE_BOUNDARIES
+Flattens the (possibly overlapping) state bands from shelters.ts into sorted,
+non-overlapping segments once, then answers single lookups with bisect and
+whole mile arrays with np.searchsorted
+"""
+
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from trail_constants import load_state_boundaries
+
+UNKNOWN_STATE = 'UNKNOWN'
+
+class StateIndex:
+    """Non-overlapping [start, end) mile segments labelled with a state
+    
+    Where bands overlap (VA 444.8-1033.0 contains WV 1000.7-1026.0, and MD
+    starts at 1026.0 inside VA) the band that starts later wins, so nested
+    border-walk sections are returned instead of being shadowed by the state
+    that encloses them. A shared boundary mile belongs to the state starting
+    there. Overrides are applied on top of the bands, in order, and win over
+    everything else. The end of the last segment is inclusive.
+    """
+    
+    def __init__(self, boundaries: Iterable[Tuple[str, float, float]],
+                 overrides: Iterable[Tuple[str, float, float]] = ()):
+        # Priority: overrides (last one highest), then later start, then later row
+        bands = sorted(enumerate(boundaries), key=lambda row: (row[1][1], row[0]))
+        ranked = [band for _, band in bands] + list(overrides)
+        
+        edges = sorted({mile for _, start, end in ranked for mile in (start, end)})
+        self.starts: List[float] = []
+        self.ends: List[float] = []
+        self.states: List[str] = []
+        for start, end in zip(edges[:-1], edges[1:]):
+            owner = None
+            for state, band_start, band_end in ranked:
+                if band_start <= start and end <= band_end:
+                    owner = state
+            if owner is None:
+                continue
+            if self.states and self.states[-1] == owner and self.ends[-1] == start:
+                self.ends[-1] = end
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+                self.states.append(owner)
+                
+        self._starts = np.array(self.starts, dtype=np.float64)
+        self._ends = np.array(self.ends, dtype=np.float64)
+        self._states = np.array(self.states + [UNKNOWN_STATE], dtype=object)
+        
+    @classmethod
+    def from_shelters(cls, overrides: Iterable[Tuple[str, float, float]] = ()) -> 'StateIndex':
+        """Index over STATE_BOUNDARIES as exported by shelters.ts"""
+        return cls(load_state_boundaries(), overrides)
+        
+    def segments(self) -> List[Tuple[str, float, float]]:
+        """(state, start, end) of every resolved segment, in mile order"""
+        return list(zip(self.states, self.starts, self.ends))
+        
+    def state_at(self, mile: Optional[float], default: str = UNKNOWN_STATE) -> str:
+        """State containing one mile"""
+        if mile is None or not self.starts:
+            return default
+        i = bisect_right(self.starts, mile) - 1
+        if i < 0:
+            return default
+        if mile < self.ends[i] or (i == len(self.ends) - 1 and mile == self.ends[i]):
+            return self.states[i]
+        return default
+        
+    def label(self, miles, default: str = UNKNOWN_STATE) -> np.ndarray:
+        """States for a whole mile array at once (object array; NaN and out-of-range miles get default)"""
+        miles = np.asarray(miles, dtype=np.float64)
+        if not self.starts:
+            return np.full(miles.shape, default, dtype=object)
+            
+        i = np.searchsorted(self._starts, miles, side='right') - 1
+        clipped = np.clip(i, 0, len(self.starts) - 1)
+        inside = (i >= 0) & ((miles < self._ends[clipped]) |
+                             ((clipped == len(self.starts) - 1) & (miles == self._ends[clipped])))
+                             
+        labels = self._states[np.where(inside, clipped, len(self.starts))]
+        if default != UNKNOWN_STATE:
+            labels = np.where(inside, labels, default)
+        return labels
+
+@lru_cache(maxsize=None)
+def default_state_index() -> StateIndex:
+    """StateIndex over the STATE_BOUNDARIES of shelters.ts, built once on first use"""
+    return StateIndex.from_shelters()
@@ -0,0 +1,6 @@
+"""Put backend/scripts on the import path, as running a script from there does"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,27 @@
+"""Fingerprint index: chain stores across towns are not duplicates, same-town and shared-number matches are"""
+
+from business_index import BusinessFingerprintIndex, find_cross_town_duplicates
+
+def test_chain_store_name_across_towns_is_not_reported():
+    contacts = [
+        ('town-a', [{'name': 'Food Lion', 'type': 'grocery'}]),
+        ('town-b', [{'name': 'Food Lion', 'type': 'grocery'}]),
+        ('town-c', [{'name': 'Dollar General', 'phone': '(540) 555-0100'}]),
+        ('town-d', [{'name': 'Dollar General', 'phone': '(540) 555-0199'}]),
+    ]
+    assert find_cross_town_duplicates(contacts) == []
+
+def test_shared_number_across_towns_is_reported():
+    contacts = [
+        ('town-a', [{'name': 'Mountain Shuttle', 'phone': '540-555-0123'}]),
+        ('town-b', [{'name': 'Mountain Shuttles LLC', 'phone': '(540) 555-0123'}]),
+    ]
+    found = find_cross_town_duplicates(contacts)
+    assert [(f['town'], f['matchTown'], f['matchedOn']) for f in found] == [('town-b', 'town-a', ['phone'])]
+
+def test_name_only_match_within_town():
+    index = BusinessFingerprintIndex()
+    index.add({'name': 'The Station at 19E'}, 'town-a')
+    assert [m['town'] for m in index.lookup({'name': 'Station at 19E'}, 'town-a')] == ['town-a']
+    assert index.lookup({'name': 'Station at 19E'}, 'town-b') == []
+    assert index.lookup({'name': 'Station at 19E', 'phone': '828-555-0100'}, 'town-a')
@@ -0,0 +1,47 @@
+"""Batch mile calibration (find_calibrated_miles) against the scalar find_calibrated_mile"""
+
+import numpy as np
+
+from calibrate_miles import MileCalibrator
+
+def make_calibrator(count: int = 120, seed: int = 0) -> MileCalibrator:
+    """References along a wiggly line heading north-east, with some duplicated coordinates"""
+    rng = np.random.default_rng(seed)
+    miles = np.sort(rng.uniform(0, 300, count)).round(1)
+    lats = 35.0 + miles / 69.0 + rng.normal(0, 0.01, count)
+    lngs = -84.0 + miles / 80.0 + rng.normal(0, 0.01, count)
+    lats[1::10], lngs[1::10] = lats[0::10], lngs[0::10]
+
+    calibrator = MileCalibrator('.')
+    calibrator.reference_waypoints = [
+        {'name': f"Ref {i}", 'mile': float(m), 'lat': float(la), 'lng': float(ln)}
+        for i, (m, la, ln) in enumerate(zip(miles, lats, lngs))
+    ]
+    return calibrator
+
+def test_batch_matches_scalar():
+    calibrator = make_calibrator()
+    refs = np.array([[r['lat'], r['lng']] for r in calibrator.reference_waypoints])
+    rng = np.random.default_rng(1)
+    picks = refs[rng.integers(0, len(refs), 1500)]
+    points = np.concatenate([
+        refs,
+        picks[:1000] + rng.normal(0, 0.02, (1000, 2)),
+        picks[1000:] + rng.normal(0, 0.3, (500, 2)),
+        [[45.0, -70.0], [30.0, -90.0]],
+    ])
+
+    batch = calibrator.find_calibrated_miles(points[:, 0], points[:, 1])
+    scalar = [calibrator.find_calibrated_mile(lat, lon) for lat, lon in points]
+    assert batch == scalar
+
+def test_reloading_references_rebuilds_arrays():
+    calibrator = make_calibrator()
+    calibrator.find_calibrated_miles([35.5], [-83.5])
+
+    calibrator.reference_waypoints = calibrator.reference_waypoints[:10]
+    calibrator.reference_miles = None
+    assert calibrator.find_calibrated_miles([35.5], [-83.5]) == [calibrator.find_calibrated_mile(35.5, -83.5)]
+
+def test_no_references():
+    assert MileCalibrator('.').find_calibrated_miles([35.0, 36.0], [-84.0, -83.0]) == [(0.0, 'UNKNOWN')] * 2
@@ -0,0 +1,68 @@
+"""Round trip of the binary elevation profile: encode -> decode, and --inline restoring elevation.ts"""
+
+from pathlib import Path
+
+import pytest
+
+from elevation_binary import (COLUMNS, PROFILE_EXPORT, check_round_trip, decode, encode,
+                              from_binary_module, to_binary_module)
+from ts_literal import parse_module
+
+ELEVATION_TS = Path(__file__).resolve().parents[3] / "webapp" / "src" / "data" / "elevation.ts"
+
+SAMPLE_TS = """/**
+ * Sample profile
+ */
+
+export interface ElevationPoint {
+  mile: number;
+  elevation: number;
+  lat: number;
+  lng: number;
+}
+
+export const elevationProfile: ElevationPoint[] = [
+  { mile: -8.5, elevation: 1820, lat: 34.5665, lng: -84.2497 },
+  { mile: 0, elevation: 3780, lat: 34.6266, lng: -84.1939 },
+  { mile: 0.1, elevation: 3755, lat: 34.62781, lng: -84.19298 },
+  { mile: 2197.9, elevation: 5267, lat: 45.9044, lng: -68.9213 }
+];
+
+export const TRAIL_END = 2197.9; // Mt. Katahdin
+"""
+
+def _real_source():
+    if not ELEVATION_TS.exists():
+        pytest.skip("elevation.ts not present")
+    text = ELEVATION_TS.read_text(encoding='utf-8')
+    if PROFILE_EXPORT not in parse_module(text):
+        pytest.skip("elevation.ts is already in binary form")
+    return text
+
+@pytest.fixture(params=['sample', 'elevation.ts'])
+def source(request):
+    return SAMPLE_TS if request.param == 'sample' else _real_source()
+
+def test_decode_is_within_one_quantization_step(source):
+    profile = parse_module(source)[PROFILE_EXPORT]
+    decoded = decode(encode(profile))
+    
+    assert len(decoded) == len(profile)
+    for name, scale in COLUMNS:
+        worst = max(abs(a[name] - b[name]) for a, b in zip(profile, decoded))
+        assert worst < 1 / scale, name
+    check_round_trip(profile, encode(profile))
+
+def test_inline_restores_the_exact_text(source):
+    profile = parse_module(source)[PROFILE_EXPORT]
+    wrapper = to_binary_module(source)
+    
+    assert PROFILE_EXPORT not in parse_module(wrapper)
+    assert from_binary_module(wrapper, decode(encode(profile))) == source
+
+def test_wide_deltas_fall_back_to_int32():
+    profile = [
+        {'mile': 0, 'elevation': 0, 'lat': 10, 'lng': -80},
+        {'mile': 0.1, 'elevation': 40000, 'lat': 11, 'lng': -79},
+    ]
+    assert decode(encode(profile)) == profile
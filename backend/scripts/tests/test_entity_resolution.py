@@ -0,0 +1,55 @@
+"""Entity resolution on the web app data: known different places must not merge, true duplicates must"""
+
+from pathlib import Path
+
+import pytest
+
+from entity_resolution import EntityResolver, name_similarity, name_tokens
+from ts_records import load_ts_records
+
+DATA_DIR = Path(__file__).resolve().parents[3] / "webapp" / "src" / "data"
+
+# Different places that share a word, a landform or a region
+DIFFERENT_PLACES = [
+    ("Firewarden Cabin", "Glencliff, NH / Warren, NH"),
+    ("Glasgow, VA", "Big Island, VA"),
+    ("Carter Gap Shelter", "Cable Gap Shelter"),
+    ("Calf Mountain Shelter", "Crystal Mountain Campsite"),
+    ("Bellvale Farms Creamery, NY", "Bellvale, NY"),
+    ("Rock Spring Hut", "Hemlock Springs Campsite"),
+    ("Standing Indian Shelter", "Standing Indian Mountain"),
+]
+
+@pytest.fixture(scope='module')
+def records():
+    found = []
+    for name in ('shelters.ts', 'features.ts', 'resupply.ts'):
+        found.extend(r for r in load_ts_records(DATA_DIR / name) if 'name' in r)
+    return found
+
+def by_name(records, name):
+    return next(r for r in records if r['name'] == name)
+
+@pytest.mark.parametrize('first, second', DIFFERENT_PLACES)
+def test_different_places_do_not_merge(records, first, second):
+    resolver = EntityResolver(records)
+    matched = {m['record']['name'] for m in resolver.matches(by_name(records, first))}
+    assert second not in matched
+
+def test_state_suffix_and_place_type_are_ignored(records):
+    resolver = EntityResolver(records)
+    item = dict(by_name(records, "Harpers Ferry"), id='new')
+    assert "Harpers Ferry, WV" in {m['record']['name'] for m in resolver.matches(item)}
+
+def test_identical_name_alone_is_not_a_match():
+    resolver = EntityResolver([{'name': 'Cable Gap Shelter', 'mile': 40.0}])
+    assert resolver.matches({'name': 'Cable Gap Shelter', 'mile': 44.0}) == []
+
+def test_far_coordinates_veto_mile_agreement():
+    resolver = EntityResolver([{'name': 'Cable Gap Shelter', 'mile': 40.0, 'lat': 35.0, 'lng': -83.0}])
+    assert resolver.matches({'name': 'Cable Gap Shelter', 'mile': 40.0, 'lat': 35.02, 'lng': -83.0}) == []
+    assert resolver.matches({'name': 'Cable Gap Shelter', 'mile': 40.0, 'lat': 35.001, 'lng': -83.0})
+
+def test_typos_still_match():
+    assert name_similarity(name_tokens("Stover Creek Shelter"), name_tokens("Stover Crek Shelter")) >= 0.5
+    assert name_similarity(name_tokens("Carter Gap Shelter"), name_tokens("Cable Gap Shelter")) == 0.0
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Trail-wide constants shared by the data scripts
+The trail length and state boundaries are read from webapp/src/data/shelters.ts
+on first use, so the scripts and the web app agree on a single official trail
+length; importing this module reads no files
+"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Tuple
+import logging
+
+from ts_literal import TsSyntaxError, load_module
+
+logger = logging.getLogger(__name__)
+
+# Official 2026 AT length, used when shelters.ts cannot be read
+DEFAULT_TRAIL_LENGTH = 2197.9
+
+SHELTERS_TS = Path(__file__).resolve().parent.parent.parent / "webapp" / "src" / "data" / "shelters.ts"
+
+# STATE_BOUNDARIES of shelters.ts, used when the file cannot be read
+DEFAULT_STATE_BOUNDARIES = [
+    ('GA', 0, 78.5),
+    ('NC', 78.5, 166.2),
+    ('TN', 166.2, 444.8),
+    ('VA', 444.8, 1033.0),
+    ('WV', 1000.7, 1026.0),
+    ('MD', 1026.0, 1070.0),
+    ('PA', 1070.0, 1298.0),
+    ('NJ', 1298.0, 1378.1),
+    ('NY', 1378.1, 1472.9),
+    ('CT', 1472.9, 1508.0),
+    ('MA', 1508.0, 1599.0),
+    ('VT', 1599.0, 1755.0),
+    ('NH', 1755.0, 1898.0),
+    ('ME', 1898.0, DEFAULT_TRAIL_LENGTH),
+]
+
+def _exports(shelters_file: Path) -> dict:
+    """Literal exports of shelters.ts, empty when it is missing or does not parse"""
+    if not shelters_file.exists():
+        return {}
+    try:
+        return load_module(shelters_file)[1]
+    except (OSError, TsSyntaxError) as e:
+        logger.warning(f"Could not read {shelters_file}: {e}; using default trail constants")
+        return {}
+
+def load_trail_length(shelters_file: Path = SHELTERS_TS) -> float:
+    """TRAIL_LENGTH exported by shelters.ts"""
+    length = _exports(shelters_file).get('TRAIL_LENGTH')
+    return float(length) if isinstance(length, (int, float)) else DEFAULT_TRAIL_LENGTH
+
+def load_state_boundaries(shelters_file: Path = SHELTERS_TS) -> List[Tuple[str, float, float]]:
+    """(state, start, end) rows of STATE_BOUNDARIES in shelters.ts, in file order"""
+    bands = _exports(shelters_file).get('STATE_BOUNDARIES')
+    if not isinstance(bands, dict):
+        return list(DEFAULT_STATE_BOUNDARIES)
+    return [(state, float(band['start']), float(band['end'])) for state, band in bands.items()]
+
+@lru_cache(maxsize=None)
+def official_trail_length() -> float:
+    """TRAIL_LENGTH of shelters.ts, read once on first use"""
+    return load_trail_length()
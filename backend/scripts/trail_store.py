@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+SQLite canonical store for the trail data
+Holds shelters, resupply points, features, contact businesses and the
+elevation profile in indexed tables (by id, mile, state, town and type), so
+updates run as transactions and lookups such as "hostels within 50 miles"
+are index range scans; the web app TS files are generated from the store,
+with only the records that changed rewritten, and the data scripts make their
+changes through it (open_store re-imports any file edited by hand since)
+"""
+
+import json
+import sqlite3
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import logging
+
+from atomic_write import content_hash, file_hash, write_if_changed
+from ts_literal import export_spans, load_module
+from ts_patch import TsPatch
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Point tables -> (data file, export name)
+POINT_TABLES = {
+    'shelters': ('shelters.ts', 'shelters'),
+    'resupply': ('resupply.ts', 'resupplyPoints'),
+    'features': ('features.ts', 'features'),
+}
+CONTACTS = ('contacts.ts', 'resupplyContacts')
+ELEVATION = ('elevation.ts', 'elevationProfile')
+ELEVATION_FIELDS = ('mile', 'elevation', 'lat', 'lng')
+
+# Layout of each generated file: (indent, depth from which objects stay on one line)
+FILE_FORMATS = {
+    'shelters.ts': (' ', 1),
+    'resupply.ts': ('  ', None),
+    'features.ts': ('  ', 1),
+    'contacts.ts': ('  ', None),
+    'elevation.ts': ('  ', 1),
+}
+
+# Columns copied out of each record for indexing; the full record is kept as JSON
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    name TEXT,
+    mile REAL,
+    state TEXT,
+    type TEXT,
+    lat REAL,
+    lng REAL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {table}_mile ON {table} (mile);
+CREATE INDEX IF NOT EXISTS {table}_state ON {table} (state, mile);
+"""
+
+# Elevation columns are untyped so integer and float values come back as they went in
+EXTRA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS businesses (
+    resupply_id TEXT NOT NULL,
+    id TEXT,
+    group_position INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT,
+    type TEXT,
+    phone TEXT,
+    record TEXT NOT NULL,
+    PRIMARY KEY (group_position, position)
+);
+CREATE INDEX IF NOT EXISTS businesses_resupply ON businesses (resupply_id);
+CREATE INDEX IF NOT EXISTS businesses_type ON businesses (type);
+CREATE TABLE IF NOT EXISTS elevation (
+    position INTEGER PRIMARY KEY,
+    mile,
+    elevation,
+    lat,
+    lng
+);
+CREATE INDEX IF NOT EXISTS elevation_mile ON elevation (mile);
+CREATE TABLE IF NOT EXISTS meta (
+    file TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (file, name)
+);
+CREATE TABLE IF NOT EXISTS files (
+    file TEXT PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+"""
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_DB = SCRIPT_DIR.parent / "data" / "trail_store.sqlite"
+WEBAPP_DATA_DIR = SCRIPT_DIR.parent.parent / "webapp" / "src" / "data"
+
+class TrailStore:
+    """Trail data in one SQLite file; changes are made inside transaction()"""
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(''.join(SCHEMA.format(table=table) for table in POINT_TABLES) + EXTRA_SCHEMA)
+        
+    def close(self):
+        self.conn.close()
+        
+    @contextmanager
+    def transaction(self) -> Iterator['TrailStore']:
+        """Commit everything done in the block at once, or nothing if it raises"""
+        with self.conn:
+            yield self
+            
+    @staticmethod
+    def _check_table(table: str):
+        if table not in POINT_TABLES:
+            raise KeyError(f"Unknown table {table}")
+            
+    # Updates
+    
+    def upsert(self, table: str, record: Dict):
+        """Insert a record or replace the one with its id (keeping that one's place in the file)"""
+        self._check_table(table)
+        row = self.conn.execute(f"SELECT position FROM {table} WHERE id = ?", (record['id'],)).fetchone()
+        if row:
+            position = row['position']
+        else:
+            position = self.conn.execute(f"SELECT COALESCE(MAX(position) + 1, 0) FROM {table}").fetchone()[0]
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO {table} (id, position, name, mile, state, type, lat, lng, record) "
+            f"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (record['id'], position, record.get('name'), record.get('mile'), record.get('state'),
+             record.get('type'), record.get('lat'), record.get('lng'), json.dumps(record, ensure_ascii=False)))
+             
+    def delete(self, table: str, record_id: str) -> bool:
+        """Remove a record by id; returns whether it existed"""
+        self._check_table(table)
+        return self.conn.execute(f"DELETE FROM {table} WHERE id = ?", (record_id,)).rowcount > 0
+        
+    def replace_businesses(self, resupply_id: str, businesses: List[Dict]):
+        """Set the contact businesses of one resupply point
+        
+        contacts.ts lists a few points in two groups; they become one, in the
+        place of the first. A new point's group goes last.
+        """
+        group_position = self.conn.execute(
+            "SELECT MIN(group_position) FROM businesses WHERE resupply_id = ?", (resupply_id,)).fetchone()[0]
+        if group_position is None:
+            group_position = self.conn.execute(
+                "SELECT COALESCE(MAX(group_position) + 1, 0) FROM businesses").fetchone()[0]
+        self.conn.execute("DELETE FROM businesses WHERE resupply_id = ?", (resupply_id,))
+        self._insert_group(group_position, resupply_id, businesses)
+        
+    def _insert_group(self, group_position: int, resupply_id: str, businesses: List[Dict]):
+        self.conn.executemany(
+            "INSERT INTO businesses (resupply_id, id, group_position, position, name, type, phone, record) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(resupply_id, b.get('id'), group_position, i, b.get('name'), b.get('type'), b.get('phone'),
+              json.dumps(b, ensure_ascii=False)) for i, b in enumerate(businesses)])
+              
+    def set_meta(self, file: str, name: str, value):
+        """Store one other exported constant of a data file (TRAIL_LENGTH, STATE_BOUNDARIES, ...)"""
+        self.conn.execute("INSERT OR REPLACE INTO meta (file, name, value) VALUES (?, ?, ?)",
+                          (file, name, json.dumps(value, ensure_ascii=False)))
+                          
+    def import_webapp(self, webapp_data_dir: Path):
+        """Replace the store's contents with the web app data files, in one transaction"""
+        webapp_data_dir = Path(webapp_data_dir)
+        with self.transaction():
+            for table in POINT_TABLES:
+                self.conn.execute(f"DELETE FROM {table}")
+            for table in ('businesses', 'elevation', 'meta', 'files'):
+                self.conn.execute(f"DELETE FROM {table}")
+                
+            for table, (filename, export) in POINT_TABLES.items():
+                exports = self._load_literals(webapp_data_dir, filename, export)
+                for record in exports.pop(export):
+                    self.upsert(table, record)
+                self._import_meta(filename, exports)
+                
+            exports = self._load_literals(webapp_data_dir, *CONTACTS)
+            for group_position, group in enumerate(exports.pop(CONTACTS[1])):
+                self._insert_group(group_position, group['resupplyId'], group.get('businesses', []))
+            self._import_meta(CONTACTS[0], exports)
+            
+            exports = self._load_literals(webapp_data_dir, *ELEVATION)
+            self.conn.executemany(
+                "INSERT INTO elevation (position, mile, elevation, lat, lng) VALUES (?, ?, ?, ?, ?)",
+                [(i, *(point.get(f) for f in ELEVATION_FIELDS)) for i, point in enumerate(exports.pop(ELEVATION[1]))])
+            self._import_meta(ELEVATION[0], exports)
+            
+    def _load_literals(self, webapp_data_dir: Path, filename: str, export: str) -> Dict:
+        """Literal exports of one data file, recording its hash; raises ValueError when export is not a literal"""
+        text, exports = load_module(webapp_data_dir / filename)
+        if export not in exports:
+            raise ValueError(f"{filename} has no {export} literal (JSON or binary wrapper?); "
+                             f"run json_module.py --inline or elevation_binary.py --inline first")
+        self._set_file_hash(filename, content_hash(text))
+        return exports
+        
+    def _import_meta(self, filename: str, exports: Dict):
+        for name, value in exports.items():
+            self.set_meta(filename, name, value)
+            
+    def _set_file_hash(self, filename: str, digest: str):
+        self.conn.execute("INSERT OR REPLACE INTO files (file, hash) VALUES (?, ?)", (filename, digest))
+        
+    def is_empty(self) -> bool:
+        """Whether nothing has been imported yet"""
+        return self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0] == 0
+        
+    def stale_files(self, webapp_data_dir: Path) -> List[str]:
+        """Data files whose content differs from what the store last imported or exported"""
+        known = {row['file']: row['hash'] for row in self.conn.execute("SELECT file, hash FROM files")}
+        return [filename for filename in FILE_FORMATS
+                if known.get(filename) != file_hash(Path(webapp_data_dir) / filename)]
+            
+    # Reads
+    
+    def records(self, table: str) -> List[Dict]:
+        """Every record of a point table, in file order"""
+        self._check_table(table)
+        return [json.loads(row['record']) for row in
+                self.conn.execute(f"SELECT record FROM {table} ORDER BY position")]
+                
+    def get(self, table: str, record_id: str) -> Optional[Dict]:
+        """One record by id, or None"""
+        self._check_table(table)
+        row = self.conn.execute(f"SELECT record FROM {table} WHERE id = ?", (record_id,)).fetchone()
+        return json.loads(row['record']) if row else None
+        
+    def in_mile_range(self, table: str, start: float, end: float, state: Optional[str] = None) -> List[Dict]:
+        """Records between two miles (inclusive), optionally in one state, by mile"""
+        self._check_table(table)
+        query = f"SELECT record FROM {table} WHERE mile BETWEEN ? AND ?"
+        params: List = [start, end]
+        if state:
+            query += " AND state = ?"
+            params.append(state)
+        return [json.loads(row['record']) for row in self.conn.execute(query + " ORDER BY mile", params)]
+        
+    def businesses_near(self, mile: float, radius: float, business_type: Optional[str] = None) -> List[Dict]:
+        """Businesses of the resupply points within radius trail miles, nearest point first
+        
+        Each business gets the resupplyId, resupplyName and resupplyMile of its town.
+        """
+        query = ("SELECT b.record, r.id AS resupply_id, r.name AS resupply_name, r.mile AS resupply_mile "
+                 "FROM resupply r JOIN businesses b ON b.resupply_id = r.id "
+                 "WHERE r.mile BETWEEN ? AND ?")
+        params: List = [mile - radius, mile + radius]
+        if business_type:
+            query += " AND b.type = ?"
+            params.append(business_type)
+        query += " ORDER BY ABS(r.mile - ?), r.mile, b.position"
+        params.append(mile)
+        
+        found = []
+        for row in self.conn.execute(query, params):
+            business = json.loads(row['record'])
+            business.update(resupplyId=row['resupply_id'], resupplyName=row['resupply_name'],
+                            resupplyMile=row['resupply_mile'])
+            found.append(business)
+        return found
+        
+    def contacts(self) -> List[Dict]:
+        """Contact groups ({resupplyId, businesses}) in file order"""
+        groups: Dict[int, Dict] = {}
+        for row in self.conn.execute(
+                "SELECT group_position, resupply_id, record FROM businesses ORDER BY group_position, position"):
+            group = groups.setdefault(row['group_position'], {'resupplyId': row['resupply_id'], 'businesses': []})
+            group['businesses'].append(json.loads(row['record']))
+        return list(groups.values())
+        
+    def elevation_profile(self, start: Optional[float] = None, end: Optional[float] = None) -> List[Dict]:
+        """Elevation points in file order, or the ones between two miles"""
+        columns = ', '.join(ELEVATION_FIELDS)
+        if start is None:
+            rows = self.conn.execute(f"SELECT {columns} FROM elevation ORDER BY position")
+        else:
+            rows = self.conn.execute(f"SELECT {columns} FROM elevation WHERE mile BETWEEN ? AND ? ORDER BY position",
+                                     (start, end))
+        return [{f: row[f] for f in ELEVATION_FIELDS if row[f] is not None} for row in rows]
+        
+    def meta(self, file: str) -> Dict:
+        """Other stored constants of one data file"""
+        return {row['name']: json.loads(row['value'])
+                for row in self.conn.execute("SELECT name, value FROM meta WHERE file = ?", (file,))}
+                
+    # Generation
+    
+    def file_exports(self) -> Dict[str, Dict]:
+        """Data file -> {export name: value} for everything in the store"""
+        files: Dict[str, Dict] = {}
+        for table, (filename, export) in POINT_TABLES.items():
+            files[filename] = {export: self.records(table)}
+        files[CONTACTS[0]] = {CONTACTS[1]: self.contacts()}
+        files[ELEVATION[0]] = {ELEVATION[1]: self.elevation_profile()}
+        for filename, values in files.items():
+            values.update(self.meta(filename))
+        return files
+        
+    def export_webapp(self, webapp_data_dir: Path) -> List[str]:
+        """Bring the web app data files in line with the store; returns the files that changed
+        
+        Each exported literal is patched (TsPatch.update) rather than
+        regenerated: records, fields and constants equal to the store keep
+        their exact text, comments and layout, so exporting a store that was
+        just imported changes nothing. Files are written atomically and only
+        when their content changes.
+        """
+        webapp_data_dir = Path(webapp_data_dir)
+        changed = []
+        for filename, values in self.file_exports().items():
+            path = webapp_data_dir / filename
+            indent, inline_depth = FILE_FORMATS[filename]
+            patch = TsPatch(path.read_text(encoding='utf-8'), indent, inline_depth)
+            present = export_spans(patch.text)
+            for name, value in values.items():
+                if name in present:
+                    old, start, end = present[name]
+                    patch.update(old, value, (start, end))
+            new_text = patch.apply()
+            if write_if_changed(path, new_text):
+                changed.append(filename)
+            self._set_file_hash(filename, content_hash(new_text))
+        self.conn.commit()
+        return changed
+        
+    def export_json(self, output_file: Path):
+        """Write every table to one JSON file"""
+        data = {table: self.records(table) for table in POINT_TABLES}
+        data['contacts'] = self.contacts()
+        data['elevation'] = self.elevation_profile()
+        data['meta'] = {filename: self.meta(filename) for filename in FILE_FORMATS}
+        write_if_changed(output_file, json.dumps(data, indent=2, ensure_ascii=False))
+
+def open_store(db_file: Optional[Path] = None, webapp_data_dir: Optional[Path] = None) -> TrailStore:
+    """The trail store, imported from the web app data first if it is new or a file was edited by hand since"""
+    db_file = Path(db_file or DEFAULT_DB)
+    webapp_data_dir = Path(webapp_data_dir or WEBAPP_DATA_DIR)
+    db_file.parent.mkdir(parents=True, exist_ok=True)
+    store = TrailStore(db_file)
+    stale = store.stale_files(webapp_data_dir)
+    if stale:
+        if not store.is_empty():
+            logger.warning(f"{', '.join(stale)} changed outside the store; re-importing")
+        store.import_webapp(webapp_data_dir)
+    return store
+
+def main():
+    """Main execution"""
+    backend_dir = SCRIPT_DIR.parent
+    webapp_data_dir = WEBAPP_DATA_DIR
+    db_file = DEFAULT_DB
+    
+    if len(sys.argv) < 2 or sys.argv[1] not in ('import', 'export', 'json', 'near'):
+        logger.error("Usage: python trail_store.py import|export|json|near <mile> <radius> [type]")
+        logger.info("Example: python trail_store.py near 470 50 hostel")
+        sys.exit(1)
+        
+    command = sys.argv[1]
+    db_file.parent.mkdir(parents=True, exist_ok=True)
+    store = TrailStore(db_file)
+    try:
+        if command == 'import':
+            store.import_webapp(webapp_data_dir)
+            counts = {table: len(store.records(table)) for table in POINT_TABLES}
+            logger.info(f"Imported {counts}, {sum(len(g['businesses']) for g in store.contacts())} businesses "
+                        f"and {len(store.elevation_profile())} elevation points into {db_file}")
+        elif command == 'export':
+            changed = store.export_webapp(webapp_data_dir)
+            logger.info(f"Regenerated {', '.join(changed) if changed else 'nothing (files up to date)'}")
+        elif command == 'json':
+            output_file = backend_dir / "data" / "extracted" / "trail_store.json"
+            store.export_json(output_file)
+            logger.info(f"Saved {output_file}")
+        else:
+            mile, radius = float(sys.argv[2]), float(sys.argv[3])
+            business_type = sys.argv[4] if len(sys.argv) > 4 else None
+            found = store.businesses_near(mile, radius, business_type)
+            kind = f"{business_type} businesses" if business_type else "businesses"
+            logger.info(f"{len(found)} {kind} within {radius:g} mi of mile {mile:g}")
+            for business in found:
+                logger.info(f"  mile {business['resupplyMile']:>7} {business['resupplyName']}: {business['name']}")
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Single-pass parser for the object-literal subset of the web app data files
+Reads `export const NAME[: Type] = <literal>;` declarations whose values are
+objects, arrays, strings, numbers, booleans or null, with comments and
+trailing commas, in one linear scan. Objects and arrays come back as dict and
+list subclasses that remember where they (and every field value) sit in the
+source text, so scripts can read typed records and patch them in place
+"""
+
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Whitespace and comments between tokens
+SKIP = re.compile(r'(?:\s+|//[^\n]*|/\*.*?\*/)*', re.DOTALL)
+STRING = re.compile(r"'(?:[^'\\\n]|\\.)*'|\"(?:[^\"\\\n]|\\.)*\"", re.DOTALL)
+NUMBER = re.compile(r'-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+IDENTIFIER = re.compile(r'[A-Za-z_$][\w$]*')
+ESCAPE = re.compile(r"\\(u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|.)", re.DOTALL)
+EXPORT_CONST = re.compile(r'^export const (\w+)\s*(?::[^=]*?)?=(?![=>])', re.MULTILINE)
+
+KEYWORDS = {'true': True, 'false': False, 'null': None, 'undefined': None}
+ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v', '0': '\0'}
+
+class TsSyntaxError(ValueError):
+    """Text outside the supported literal subset"""
+    
+    def __init__(self, message: str, text: str, pos: int):
+        self.pos = pos
+        self.line = text.count('\n', 0, pos) + 1
+        super().__init__(f"{message} at line {self.line}")
+
+class TsObject(dict):
+    """Object literal; start/end are the offsets of its braces (end exclusive)
+    
+    value_spans: key -> (start, end) of the value text
+    entry_spans: key -> (start, end) from the key to the end of the value
+    """
+    
+    def __init__(self, start: int):
+        super().__init__()
+        self.start = start
+        self.end = start
+        self.value_spans: Dict[str, Tuple[int, int]] = {}
+        self.entry_spans: Dict[str, Tuple[int, int]] = {}
+        
+    def scalars(self) -> Dict[str, Any]:
+        """Fields that are not objects or arrays, in source order"""
+        return {key: value for key, value in self.items() if not isinstance(value, (dict, list))}
+
+class TsArray(list):
+    """Array literal; start/end are the offsets of its brackets (end exclusive)"""
+    
+    def __init__(self, start: int):
+        super().__init__()
+        self.start = start
+        self.end = start
+
+def decode_string(literal: str) -> str:
+    """Python value of a quoted string literal"""
+    def unescape(match):
+        code = match.group(1)
+        if code[0] in 'ux' and len(code) > 1:
+            return chr(int(code[1:], 16))
+        return ESCAPES.get(code, code)
+    return ESCAPE.sub(unescape, literal[1:-1])
+
+class _Parser:
+    """Recursive-descent parser over one text; pos only ever moves forward"""
+    
+    def __init__(self, text: str):
+        self.text = text
+        
+    def skip(self, pos: int) -> int:
+        return SKIP.match(self.text, pos).end()
+        
+    def value(self, pos: int) -> Tuple[Any, int]:
+        """Parse the value starting at pos (after whitespace); returns it and the offset after it"""
+        pos = self.skip(pos)
+        char = self.text[pos:pos + 1]
+        if char == '{':
+            return self.object(pos)
+        if char == '[':
+            return self.array(pos)
+        if char in ('"', "'"):
+            match = STRING.match(self.text, pos)
+            if not match:
+                raise TsSyntaxError("Unterminated string", self.text, pos)
+            return decode_string(match.group(0)), match.end()
+        match = NUMBER.match(self.text, pos)
+        if match:
+            number = match.group(0)
+            return (int(number) if re.fullmatch(r'-?\d+', number) else float(number)), match.end()
+        match = IDENTIFIER.match(self.text, pos)
+        if match and match.group(0) in KEYWORDS:
+            return KEYWORDS[match.group(0)], match.end()
+        raise TsSyntaxError(f"Unsupported value {self.text[pos:pos + 20]!r}", self.text, pos)
+        
+    def key(self, pos: int) -> Tuple[str, int]:
+        char = self.text[pos:pos + 1]
+        if char in ('"', "'"):
+            match = STRING.match(self.text, pos)
+            if match:
+                return decode_string(match.group(0)), match.end()
+        match = IDENTIFIER.match(self.text, pos) or NUMBER.match(self.text, pos)
+        if not match:
+            raise TsSyntaxError("Expected a key", self.text, pos)
+        return match.group(0), match.end()
+        
+    def object(self, pos: int) -> Tuple[TsObject, int]:
+        obj = TsObject(pos)
+        pos = self.skip(pos + 1)
+        while self.text[pos:pos + 1] != '}':
+            key_start = pos
+            key, pos = self.key(pos)
+            pos = self.skip(pos)
+            if self.text[pos:pos + 1] != ':':
+                raise TsSyntaxError(f"Expected ':' after {key!r}", self.text, pos)
+            value_start = self.skip(pos + 1)
+            value, pos = self.value(value_start)
+            obj[key] = value
+            obj.value_spans[key] = (value_start, pos)
+            obj.entry_spans[key] = (key_start, pos)
+            pos = self.separator(pos, '}')
+        obj.end = pos + 1
+        return obj, obj.end
+        
+    def array(self, pos: int) -> Tuple[TsArray, int]:
+        arr = TsArray(pos)
+        pos = self.skip(pos + 1)
+        while self.text[pos:pos + 1] != ']':
+            value, pos = self.value(pos)
+            arr.append(value)
+            pos = self.separator(pos, ']')
+        arr.end = pos + 1
+        return arr, arr.end
+        
+    def separator(self, pos: int, closing: str) -> int:
+        """Skip the ',' between entries; returns the offset of the next entry or of the closing bracket"""
+        pos = self.skip(pos)
+        char = self.text[pos:pos + 1]
+        if char == ',':
+            return self.skip(pos + 1)
+        if char != closing:
+            raise TsSyntaxError(f"Expected ',' or {closing!r}", self.text, pos)
+        return pos
+
+def parse_literal(text: str, pos: int = 0) -> Tuple[Any, int]:
+    """Parse one literal value at pos; returns the value and the offset after it"""
+    return _Parser(text).value(pos)
+
+def export_spans(text: str) -> Dict[str, Tuple[Any, int, int]]:
+    """Every `export const` whose value is a literal: name -> (value, start, end) of the literal text
+    
+    Declarations with other values (`shelters.length`, function calls) are skipped.
+    """
+    parser = _Parser(text)
+    exports: Dict[str, Tuple[Any, int, int]] = {}
+    pos = 0
+    while True:
+        match = EXPORT_CONST.search(text, pos)
+        if not match:
+            return exports
+        pos = match.end()
+        start = parser.skip(pos)
+        try:
+            value, end = parser.value(start)
+        except TsSyntaxError:
+            continue
+        # A literal followed by more expression (`* 2`, `.map(...)`) is not a plain literal
+        after = parser.skip(end)
+        if text[after:after + 1] in (';', '') or '\n' in text[end:after]:
+            exports[match.group(1)] = (value, start, end)
+            pos = end
+
+def parse_module(text: str) -> Dict[str, Any]:
+    """Every `export const` whose value is a literal, by name, in source order"""
+    return {name: value for name, (value, _, _) in export_spans(text).items()}
+
+def load_module(path: Path) -> Tuple[str, Dict[str, Any]]:
+    """Text and literal exports of one data file"""
+    text = Path(path).read_text(encoding='utf-8')
+    return text, parse_module(text)
+
+def iter_records(value: Any, key: str = 'id') -> List[TsObject]:
+    """Objects carrying `key`, outermost first and in source order (nested records of a record are not listed)"""
+    found: List[TsObject] = []
+    stack = [value]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict) and key in node:
+            found.append(node)
+        elif isinstance(node, dict):
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return found
+
+def load_records(path: Path, export: Optional[str] = None, key: str = 'id') -> List[TsObject]:
+    """Records of one data file: objects with `key` in the named export, or in every export"""
+    _, exports = load_module(path)
+    values = [exports[export]] if export else list(exports.values())
+    return [record for value in values for record in iter_records(value, key)]
+
+def format_string(value: str) -> str:
+    """Single-quoted string literal"""
+    escaped = value.replace('\\', '\\\\').replace("'", "\\'").replace('\n', '\\n').replace('\r', '\\r')
+    return f"'{escaped}'"
+
+def format_key(key: str) -> str:
+    """Bare key when it is an identifier, quoted otherwise"""
+    return key if IDENTIFIER.fullmatch(key) else format_string(key)
+
+def format_literal(value: Any, indent: str = '  ', inline_depth: Optional[int] = None, depth: int = 0) -> str:
+    """Literal text of a value; objects at inline_depth or deeper (and arrays of scalars) go on one line
+    
+    Multi-line objects and arrays get one entry per line with a trailing comma.
+    """
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, str):
+        return format_string(value)
+        
+    inline = (inline_depth is not None and depth >= inline_depth) or (
+        isinstance(value, list) and not any(isinstance(v, (dict, list)) for v in value))
+    if isinstance(value, dict):
+        entries = [f"{format_key(k)}: {format_literal(v, indent, inline_depth, depth + 1)}" for k, v in value.items()]
+        opening, closing = '{', '}'
+    else:
+        entries = [format_literal(v, indent, inline_depth, depth + 1) for v in value]
+        opening, closing = '[', ']'
+        
+    if not entries:
+        return opening + closing
+    if inline:
+        return f"{opening} {', '.join(entries)} {closing}" if opening == '{' else f"{opening}{', '.join(entries)}{closing}"
+    inner = indent * (depth + 1)
+    return opening + '\n' + ''.join(f"{inner}{entry},\n" for entry in entries) + indent * depth + closing
+
+def replace_exports(text: str, values: Dict[str, Any], indent: str = '  ', inline_depth: Optional[int] = None) -> str:
+    """Text with the literal of each named export replaced by the formatted new value
+    
+    Everything else (imports, comments between declarations, helper functions) is kept.
+    """
+    exports = export_spans(text)
+    spans = []
+    for name, value in values.items():
+        if name not in exports:
+            raise KeyError(f"No literal exported as {name}")
+        _, start, end = exports[name]
+        spans.append((start, end, format_literal(value, indent, inline_depth)))
+        
+    pieces = []
+    pos = 0
+    for start, end, literal in sorted(spans):
+        pieces.append(text[pos:start])
+        pieces.append(literal)
+        pos = end
+    pieces.append(text[pos:])
+    return ''.join(pieces)
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Offset-indexed patch engine for the web app data files
+Edits address records and fields through the source offsets ts_literal
+records while parsing (value spans, object and array bounds), so nothing is
+searched for with regexes; any number of edits are collected first and then
+spliced into the text in one linear pass, which also makes overlapping edits
+an error instead of silent corruption. update() turns a parsed literal into a
+new value with the fewest such edits, so unchanged records keep their exact
+text (number formatting, layout, comments)
+"""
+
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ts_literal import SKIP, TsArray, TsObject, format_key, format_literal, load_module
+
+LEADING_SPACE = re.compile(r'[ \t]*')
+
+# Keys that identify the elements of an array of records
+RECORD_KEYS = ('id', 'resupplyId')
+
+def same_value(a: Any, b: Any) -> bool:
+    """Equality that tells booleans from numbers (True == 1 in Python, not in the data)"""
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(same_value(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(same_value(x, y) for x, y in zip(a, b))
+    return a == b
+
+def _record_keys(values: List[Any]) -> Optional[List[Tuple[Any, int]]]:
+    """(id, occurrence) of every element when all are records sharing an id key, else None"""
+    for key in RECORD_KEYS:
+        if values and all(isinstance(v, dict) and key in v for v in values):
+            seen: Dict[Any, int] = {}
+            keys = []
+            for v in values:
+                seen[v[key]] = seen.get(v[key], -1) + 1
+                keys.append((v[key], seen[v[key]]))
+            return keys
+    return None
+
+class TsPatch:
+    """Batched text edits of one file, applied together by apply()"""
+    
+    def __init__(self, text: str, indent: str = '  ', inline_depth: Optional[int] = None):
+        self.text = text
+        self.indent = indent
+        self.inline_depth = inline_depth
+        # (start, end, replacement, sequence); sequence keeps insertions at one offset in call order
+        self.edits: List[Tuple[int, int, str, int]] = []
+        
+    @classmethod
+    def load(cls, path: Path, indent: str = '  ', inline_depth: Optional[int] = None) -> Tuple['TsPatch', dict]:
+        """Patch over a file's text, and the file's literal exports (whose offsets the edits use)"""
+        text, exports = load_module(path)
+        return cls(text, indent, inline_depth), exports
+        
+    def __len__(self) -> int:
+        return len(self.edits)
+        
+    # Offsets
+    
+    def _line_indent(self, pos: int) -> str:
+        """Whitespace at the start of the line holding pos"""
+        line_start = self.text.rfind('\n', 0, pos) + 1
+        return LEADING_SPACE.match(self.text, line_start).group(0)
+        
+    def _after_value(self, end: int) -> Tuple[int, bool]:
+        """Where to add an entry after a value, and whether the value has a trailing comma
+        
+        After the comma, or after a line comment that follows it on the same
+        line; right after the value when there is no comma.
+        """
+        pos = SKIP.match(self.text, end).end()
+        if self.text[pos:pos + 1] != ',':
+            return end, False
+        pos += 1
+        line_end = self.text.find('\n', pos)
+        line_end = len(self.text) if line_end < 0 else line_end
+        rest = self.text[pos:line_end].strip()
+        if rest.startswith('//'):
+            pos = line_end
+        return pos, True
+        
+    def _render(self, value: Any, line_indent: str) -> str:
+        """Literal text of value for a line indented by line_indent"""
+        depth = len(line_indent) // max(len(self.indent), 1)
+        return format_literal(value, self.indent, self.inline_depth, depth)
+        
+    # Edits
+    
+    def replace(self, start: int, end: int, new_text: str):
+        """Replace text[start:end]"""
+        self.edits.append((start, end, new_text, len(self.edits)))
+        
+    def insert(self, pos: int, new_text: str):
+        self.replace(pos, pos, new_text)
+        
+    def set_value(self, record: TsObject, key: str, value: Any):
+        """Set a field of a record: replace its value in place, or add it after the last field"""
+        if key in record.value_spans:
+            start, end = record.value_spans[key]
+            self.replace(start, end, self._render(value, self._line_indent(start)))
+            return
+            
+        if not record.entry_spans:
+            # Empty object: write it out whole
+            self.replace(record.start, record.end, self._render({key: value}, self._line_indent(record.start)))
+            return
+            
+        last_key = max(record.entry_spans, key=lambda k: record.entry_spans[k][1])
+        last_start, last_end = record.entry_spans[last_key]
+        pos, has_comma = self._after_value(last_end)
+        multiline = '\n' in self.text[record.start:last_start]
+        if multiline:
+            line_indent = self._line_indent(last_start)
+            entry = f"{line_indent}{format_key(key)}: {self._render(value, line_indent)}"
+            self.insert(pos, f"\n{entry}," if has_comma else f",\n{entry}")
+        else:
+            entry = f"{format_key(key)}: {self._render(value, '')}"
+            self.insert(pos, f" {entry}," if has_comma else f", {entry}")
+            
+    def append(self, array: TsArray, values: List[Any]):
+        """Add values at the end of an array, one per line, matching its trailing-comma style"""
+        if not values:
+            return
+        last = array[-1] if array else None
+        if last is not None and not isinstance(last, (TsObject, TsArray)):
+            raise ValueError("append needs an array of objects or arrays (scalar elements carry no offsets)")
+            
+        if last is None:
+            outer = self._line_indent(array.start)
+            line_indent = outer + self.indent
+            items = ''.join(f"\n{line_indent}{self._render(v, line_indent)}," for v in values)
+            self.insert(array.start + 1, items + '\n' + outer)
+            return
+            
+        line_indent = self._line_indent(last.start)
+        pos, has_comma = self._after_value(last.end)
+        rendered = [f"{line_indent}{self._render(v, line_indent)}" for v in values]
+        if has_comma:
+            self.insert(pos, ''.join(f"\n{item}," for item in rendered))
+        else:
+            self.insert(pos, ''.join(f",\n{item}" for item in rendered))
+            
+    def _remove_run(self, first_start: int, last_end: int, prev_end: Optional[int]):
+        """Remove consecutive entries spanning first_start..last_end with their separators
+        
+        With a comma after the last one, the entries go up to and including it
+        (whole lines when they stand alone on them); without one, the comma
+        before the first entry goes instead.
+        """
+        pos, has_comma = self._after_value(last_end)
+        if not has_comma:
+            self.replace(prev_end if prev_end is not None else first_start, last_end, '')
+            return
+        line_start = self.text.rfind('\n', 0, first_start) + 1
+        line_end = self.text.find('\n', pos)
+        line_end = len(self.text) if line_end < 0 else line_end
+        if not self.text[line_start:first_start].strip() and not self.text[pos:line_end].strip():
+            self.replace(line_start, min(line_end + 1, len(self.text)), '')
+        else:
+            self.replace(first_start, LEADING_SPACE.match(self.text, pos).end(), '')
+            
+    def update(self, old: Any, new: Any, span: Optional[Tuple[int, int]] = None):
+        """Edit the literal parsed as old so that it reads as new, touching only what differs
+        
+        Objects are updated field by field; arrays of records are matched by
+        id (or resupplyId), other arrays element by element when their length
+        is unchanged. Anything else that differs is rewritten whole. span is
+        the text of old when it is a scalar (objects and arrays know theirs).
+        """
+        if same_value(old, new):
+            return
+        if isinstance(old, TsObject) and isinstance(new, dict):
+            self._update_object(old, new)
+            return
+        if isinstance(old, TsArray) and isinstance(new, list) and self._update_array(old, new):
+            return
+        start, end = (old.start, old.end) if isinstance(old, (TsObject, TsArray)) else span
+        self.replace(start, end, self._render(new, self._line_indent(start)))
+        
+    def _update_object(self, old: TsObject, new: Dict):
+        entries = sorted(old.entry_spans.items(), key=lambda item: item[1][0])
+        if entries and entries[-1][0] not in new and any(key not in old for key in new):
+            # New fields go after the last one, which is being removed: rewrite the object
+            self.replace(old.start, old.end, self._render(new, self._line_indent(old.start)))
+            return
+            
+        for key, value in new.items():
+            if key in old:
+                self.update(old[key], value, old.value_spans[key])
+            else:
+                self.set_value(old, key, value)
+                
+        # Removed fields, in runs of neighbouring entries
+        run: List[int] = []
+        for i, (key, _) in enumerate(entries + [(None, None)]):
+            if key is not None and key not in new:
+                run.append(i)
+                continue
+            if run:
+                prev_end = entries[run[0] - 1][1][1] if run[0] > 0 else None
+                self._remove_run(entries[run[0]][1][0], entries[run[-1]][1][1], prev_end)
+                run = []
+                
+    def _update_array(self, old: TsArray, new: List) -> bool:
+        """Patch an array in place; False when it has to be rewritten whole"""
+        old_keys = _record_keys(old)
+        new_keys = _record_keys(new)
+        if old_keys is None or new_keys is None:
+            if len(old) != len(new):
+                return False
+            pairs = [(o, n) for o, n in zip(old, new) if not same_value(o, n)]
+            if any(not isinstance(o, (TsObject, TsArray)) for o, _ in pairs):
+                return False
+            for o, n in pairs:
+                self.update(o, n)
+            return True
+            
+        new_by_key = dict(zip(new_keys, new))
+        old_key_set = set(old_keys)
+        kept = [k for k in old_keys if k in new_by_key]
+        if not kept or kept != [k for k in new_keys if k in old_key_set]:
+            return False
+            
+        old_by_key = dict(zip(old_keys, old))
+        for k in kept:
+            self.update(old_by_key[k], new_by_key[k])
+            
+        # Removed records, in runs of neighbours
+        run: List[int] = []
+        for i, k in enumerate(old_keys + [None]):
+            if k is not None and k not in new_by_key:
+                run.append(i)
+                continue
+            if run:
+                prev_end = old[run[0] - 1].end if run[0] > 0 else None
+                self._remove_run(old[run[0]].start, old[run[-1]].end, prev_end)
+                run = []
+                
+        # Added records go after the kept record before them, or before the first kept one
+        previous = None
+        pending: List[Any] = []
+        for k, value in zip(new_keys, new):
+            if k in old_by_key:
+                if pending:
+                    self._insert_records(old_by_key[previous] if previous else None, old_by_key[k], pending)
+                    pending = []
+                previous = k
+            else:
+                pending.append(value)
+        if pending:
+            self._insert_records(old_by_key[previous], None, pending)
+        return True
+        
+    def _insert_records(self, after: Optional[TsObject], before: Optional[TsObject], values: List[Any]):
+        """Insert records after one element, or at the line start of the element they precede"""
+        if after is not None:
+            line_indent = self._line_indent(after.start)
+            pos, has_comma = self._after_value(after.end)
+            rendered = [f"{line_indent}{self._render(v, line_indent)}" for v in values]
+            if has_comma:
+                self.insert(pos, ''.join(f"\n{item}," for item in rendered))
+            else:
+                self.insert(pos, ''.join(f",\n{item}" for item in rendered))
+            return
+        line_start = self.text.rfind('\n', 0, before.start) + 1
+        if self.text[line_start:before.start].strip():
+            # Inline array: in front of the element on its line
+            self.insert(before.start, ''.join(f"{self._render(v, '')}, " for v in values))
+            return
+        line_indent = self._line_indent(before.start)
+        self.insert(line_start, ''.join(f"{line_indent}{self._render(v, line_indent)},\n" for v in values))
+        
+    # Output
+    
+    def apply(self) -> str:
+        """Text with every edit spliced in, in one pass over the original"""
+        edits = sorted(self.edits, key=lambda e: (e[0], e[1], e[3]))
+        pieces = []
+        pos = 0
+        for start, end, new_text, _ in edits:
+            if start < pos:
+                raise ValueError(f"Overlapping edits at offset {start}")
+            pieces.append(self.text[pos:start])
+            pieces.append(new_text)
+            pos = end
+        pieces.append(self.text[pos:])
+        return ''.join(pieces)
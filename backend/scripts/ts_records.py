@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+Load flat records from the web app TypeScript data files
+Each record is an object literal with an `id` key (the outermost one, so the
+businesses of contacts.ts are records but the objects nested in a record are
+not); its scalar fields (strings, numbers, booleans) are kept in source order
+"""
+
+from pathlib import Path
+from typing import Dict, List
+
+from ts_literal import load_records
+
+def load_ts_records(path: Path) -> List[Dict]:
+    """Records of one data file, in file order"""
+    return [record.scalars() for record in load_records(path)]
@@ -5,11 +5,15 @@ Cross-reference with GPX track to ensure accuracy
 """
 
 import json
-import re
+import sys
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import logging
 
+from data_validator import ColumnarDataset, DataValidator
+from name_index import TokenIndex
+from ts_literal import iter_records, parse_module
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -20,6 +24,8 @@ class MileMarkerValidator:
         self.extracted_dir = Path(extracted_dir)
         self.webapp_data_dir = Path(webapp_data_dir)
         self.known_waypoints = {}
+        self._known_list: List[Dict] = []
+        self._name_index: Optional[TokenIndex] = None
         
     def load_known_waypoints(self):
         """Load known waypoints from existing TypeScript files"""
@@ -43,43 +49,26 @@ class MileMarkerValidator:
             content = resupply_file.read_text()
             self._parse_typescript_waypoints(content, 'resupply')
         
+        self._name_index = None
         logger.info(f"Loaded {len(self.known_waypoints)} known waypoints")
     
     def _parse_typescript_waypoints(self, content: str, wp_type: str):
         """Parse waypoints from TypeScript file"""
-        # Extract objects from array
-        # Pattern: { ... }
-        objects = re.finditer(r'\{([^}]+)\}', content, re.DOTALL)
-        
-        for obj_match in objects:
-            obj_text = obj_match.group(1)
-            
-            # Extract name
-            name_match = re.search(r'name:\s*["\']([^"\']+)["\']', obj_text)
-            if not name_match:
+        for record in iter_records(parse_module(content)):
+            name = record.get('name')
+            mile = record.get('mile')
+            if not isinstance(name, str) or not isinstance(mile, (int, float)) or mile <= 0:
                 continue
-            
-            name = name_match.group(1)
-            
-            # Extract mile
-            mile_match = re.search(r'mile:\s*(\d+\.?\d*)', obj_text)
-            mile = float(mile_match.group(1)) if mile_match else None
-            
-            # Extract coordinates
-            lat_match = re.search(r'lat:\s*(-?\d+\.?\d*)', obj_text)
-            lng_match = re.search(r'lng:\s*(-?\d+\.?\d*)', obj_text)
-            
-            lat = float(lat_match.group(1)) if lat_match else None
-            lng = float(lng_match.group(1)) if lng_match else None
-            
-            if name and mile:
-                self.known_waypoints[name.lower()] = {
-                    'name': name,
-                    'mile': mile,
-                    'lat': lat,
-                    'lng': lng,
-                    'type': wp_type
-                }
+                
+            lat = record.get('lat')
+            lng = record.get('lng')
+            self.known_waypoints[name.lower()] = {
+                'name': name,
+                'mile': float(mile),
+                'lat': float(lat) if isinstance(lat, (int, float)) else None,
+                'lng': float(lng) if isinstance(lng, (int, float)) else None,
+                'type': wp_type
+            }
     
     def validate_extracted_waypoints(self) -> Dict:
         """Validate extracted waypoints against known data"""
@@ -146,26 +135,13 @@ class MileMarkerValidator:
         return validation_results
     
     def _find_fuzzy_match(self, name: str) -> Dict:
-        """Find fuzzy match in known waypoints"""
-        name_words = set(name.split())
-        
-        best_match = None
-        best_score = 0
-        
-        for known_name, data in self.known_waypoints.items():
-            known_words = set(known_name.split())
-            
-            # Jaccard similarity
-            intersection = len(name_words & known_words)
-            union = len(name_words | known_words)
-            
-            if union > 0:
-                score = intersection / union
-                if score > best_score and score > 0.5:
-                    best_score = score
-                    best_match = data
+        """Find fuzzy match in known waypoints (Jaccard similarity over name tokens)"""
+        if self._name_index is None:
+            self._known_list = list(self.known_waypoints.values())
+            self._name_index = TokenIndex(self.known_waypoints.keys())
         
-        return best_match
+        match = self._name_index.best_match(name, 0.5)
+        return self._known_list[match[0]] if match else None
     
     def generate_validation_report(self, results: Dict) -> str:
         """Generate validation report"""
@@ -219,6 +195,34 @@ class MileMarkerValidator:
         report.append("Small differences (<1 mile) are expected due to trail reroutes and GPS accuracy.")
         
         return "\n".join(report)
+    
+    def run_rules(self, results: Dict) -> Dict:
+        """Evaluate the columnar rule set over the extracted waypoints
+        
+        Known-mile differences over 1 mile from validate_extracted_waypoints()
+        are added as warnings next to the rule findings.
+        """
+        extracted_file = self.extracted_dir / "fixed_waypoints.json"
+        with open(extracted_file, 'r', encoding='utf-8') as f:
+            extracted = json.load(f)
+            
+        dataset = ColumnarDataset.from_sources({extracted_file.name: extracted})
+        findings = DataValidator(dataset).run()
+        
+        for diff in results.get('mile_differences', []):
+            if diff['difference'] > 1.0:
+                findings['findings'].append({
+                    'rule': 'known-mile',
+                    'severity': 'warning',
+                    'source': extracted_file.name,
+                    'id': None,
+                    'name': diff['name'],
+                    'message': f"extracted mile differs from known mile {diff['known_mile']}",
+                    'value': round(diff['difference'], 3),
+                })
+                findings['summary']['warnings'] += 1
+                
+        return findings
 
 def main():
     """Main execution"""
@@ -234,6 +238,8 @@ def main():
     
     # Validate extracted waypoints
     results = validator.validate_extracted_waypoints()
+    if not results:
+        sys.exit(1)
     
     # Generate report
     report = validator.generate_validation_report(results)
@@ -245,6 +251,16 @@ def main():
         f.write(report)
     
     logger.info(f"Validation report saved to {report_file}")
+    
+    # Rule findings as JSON; nonzero exit on any error
+    findings = validator.run_rules(results)
+    findings_file = extracted_dir / "validation_findings_extracted.json"
+    with open(findings_file, 'w', encoding='utf-8') as f:
+        json.dump(findings, f, indent=2)
+        
+    logger.info(f"Rule findings saved to {findings_file}: "
+                f"{findings['summary']['errors']} errors, {findings['summary']['warnings']} warnings")
+    sys.exit(1 if findings['summary']['errors'] else 0)
 
 if __name__ == "__main__":
     main()
@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 """Check missing shelters in tnlandforms and compare elevation data"""
 
+import sys
 import xml.etree.ElementTree as ET
-import re
-from difflib import SequenceMatcher
+
+from shelter_crosswalk import SOURCE_FILES, ShelterCrosswalk, file_signature, parse_our_shelters
+
+sys.path.insert(0, 'backend/scripts')
+from field_fusion import FieldFusion, FieldRule
 
 # Parse GPX file
 def parse_gpx(filename):
@@ -28,81 +32,27 @@ def parse_gpx(filename):
         }
     return shelters
 
-# Parse our shelters.ts
-def parse_our_shelters(filename):
-    with open(filename, 'r') as f:
-        content = f.read()
-    
-    pattern = r"\{ id: 'sh-\d+', name: '([^']+)', mile: ([\d.]+), soboMile: ([\d.]+), elevation: (\d+), lat: ([\d.-]+), lng: ([\d.-]+)"
-    
-    shelters = {}
-    for match in re.finditer(pattern, content):
-        name, mile, sobo_mile, elevation, lat, lng = match.groups()
-        shelters[name] = {
-            'mile': float(mile),
-            'elevation': int(elevation),
-            'lat': float(lat),
-            'lon': float(lng)
-        }
-    return shelters
-
-# Normalize names
-def normalize_name(name):
-    name = name.lower()
-    name = re.sub(r'\s+(shelter|lean-to|lean to|hut|campsite|camp|site|cabin)\s*$', '', name)
-    name_clean = re.sub(r'[^a-z]', '', name)
-    return name, name_clean
-
-# Find match
-def find_match(our_name, their_shelters, threshold=0.7):
-    our_norm, our_clean = normalize_name(our_name)
-    
-    best_match = None
-    best_score = 0
-    
-    for their_name, their_data in their_shelters.items():
-        their_norm, their_clean = normalize_name(their_name)
-        
-        if our_clean == their_clean:
-            return their_name, their_data, 1.0
-        
-        if our_clean in their_clean or their_clean in our_clean:
-            score = len(min(our_clean, their_clean)) / len(max(our_clean, their_clean))
-            if score > best_score:
-                best_score = score
-                best_match = (their_name, their_data)
-        
-        similarity = SequenceMatcher(None, our_clean, their_clean).ratio()
-        if similarity > best_score:
-            best_score = similarity
-            best_match = (their_name, their_data)
-    
-    if best_match and best_score >= threshold:
-        return best_match[0], best_match[1], best_score
-    
-    return None, None, 0
-
-# The 24 shelters that weren't matched with ATC
-missing_shelters = [
-    "Wayah Shelter", "Birch Spring Gap Shelter", "Jerry Cabin Shelter",
-    "Mountaineer Falls Shelter", "Johns Spring Shelter", "Raven Rock Shelter",
-    "Birch Run Shelter", "Toms Run Shelter", "Backpacker Site (Camp Rd)",
-    "Silver Hill Campsite", "Shaker Campsite", "Bromley Shelter",
-    "Griffith Lake Tenting Area", "Churchill Scott Shelter", "Firewarden Cabin",
-    "Liberty Springs Tentsite", "Guyot Shelter", "Ethan Pond Shelter",
-    "Nauman Tentsite", "Osgood Tentsite", "Imp Shelter", "Trident Col Tentsite",
-    "Gentian Pond Shelter", "Carlo Col Shelter"
-]
-
 def main():
     print("="*80)
     print("MISSING SHELTERS CHECK - tnlandforms.us")
     print("="*80)
     
     # Load data
-    tn_shelters = parse_gpx('backend/data/tnlandforms_shelters.gpx')
-    atc_shelters = parse_gpx('backend/data/guymott_shelters/AT Shelters - Long Comments - Consecutive Names.gpx')
-    our_shelters = parse_our_shelters('webapp/src/data/shelters.ts')
+    tn_shelters = parse_gpx(SOURCE_FILES['tnlandforms'])
+    atc_shelters = parse_gpx(SOURCE_FILES['atc'])
+    our_list = parse_our_shelters()
+    our_shelters = {s['name']: s for s in our_list}
+    
+    # Links from the shared crosswalk; only shelters not linked yet are matched
+    crosswalk = ShelterCrosswalk()
+    tn_links = crosswalk.resolve('tnlandforms', our_list, [dict(data, name=name) for name, data in tn_shelters.items()],
+                                 file_signature(SOURCE_FILES['tnlandforms']))
+    atc_links = crosswalk.resolve('atc', our_list, [dict(data, name=name) for name, data in atc_shelters.items()],
+                                  file_signature(SOURCE_FILES['atc']))
+    crosswalk.save()
+    
+    # Shelters the crosswalk could not link to ATC
+    missing_shelters = [s['name'] for s in our_list if not atc_links[s['id']]]
     
     print(f"\nChecking {len(missing_shelters)} shelters not found in ATC data...\n")
     
@@ -110,9 +60,10 @@ def main():
     not_found = []
     
     for shelter_name in missing_shelters:
-        tn_name, tn_data, tn_score = find_match(shelter_name, tn_shelters)
-        atc_name, atc_data, atc_score = find_match(shelter_name, atc_shelters)
-        our_data = our_shelters.get(shelter_name, {})
+        our_data = our_shelters[shelter_name]
+        tn_name = tn_links[our_data['id']]
+        tn_data = tn_shelters.get(tn_name) if tn_name else None
+        tn_score = crosswalk.score_for(our_data['id'], 'tnlandforms')
         
         if tn_data:
             found_in_tn.append({
@@ -147,32 +98,31 @@ def main():
     print("ELEVATION COMPARISON - All Sources")
     print(f"{'='*80}\n")
     
-    elevation_differences = []
+    # Weighted consensus per shelter; ours disagrees when it is more than 100ft from it
+    rows = []
+    for our_data in our_list:
+        tn_name = tn_links[our_data['id']]
+        atc_name = atc_links[our_data['id']]
+        rows.append({
+            'current': our_data,
+            'tnlandforms': tn_shelters.get(tn_name) if tn_name else None,
+            'atc': atc_shelters.get(atc_name) if atc_name else None,
+        })
+    fusion = FieldFusion(sources=('atc', 'tnlandforms', 'current'),
+                         rules={'elevation': FieldRule(tolerance=100.0)}).fuse(rows)
     
-    for our_name, our_data in our_shelters.items():
-        tn_name, tn_data, _ = find_match(our_name, tn_shelters)
-        atc_name, atc_data, _ = find_match(our_name, atc_shelters)
-        
-        sources = []
-        if tn_data and tn_data['elevation']:
-            sources.append(('tnlandforms', tn_data['elevation']))
-        if atc_data and atc_data['elevation']:
-            sources.append(('ATC', atc_data['elevation']))
-        
-        if sources:
-            # Calculate average from sources
-            avg_elevation = sum(e[1] for e in sources) / len(sources)
-            our_elevation = our_data['elevation']
-            
-            diff = abs(our_elevation - avg_elevation)
-            
-            if diff > 100:  # More than 100ft difference
-                elevation_differences.append({
-                    'name': our_name,
-                    'our_elev': our_elevation,
-                    'sources': sources,
-                    'diff': diff
-                })
+    elevation_differences = []
+    for i in fusion.disagreements('current', 'elevation'):
+        row = rows[i]
+        consensus = fusion.value(i, 'elevation')
+        elevation_differences.append({
+            'name': row['current']['name'],
+            'our_elev': row['current']['elevation'],
+            'sources': [(label, row[source]['elevation']) for source, label in (('tnlandforms', 'tnlandforms'), ('atc', 'ATC'))
+                        if row[source] and row[source]['elevation']],
+            'consensus': (consensus, fusion.provenance(i, 'elevation')['source']),
+            'diff': abs(row['current']['elevation'] - consensus)
+        })
     
     # Sort by difference
     elevation_differences.sort(key=lambda x: x['diff'], reverse=True)
@@ -184,6 +134,7 @@ def main():
         print(f"  Our elevation: {item['our_elev']}ft")
         for source_name, source_elev in item['sources']:
             print(f"  {source_name}: {source_elev:.0f}ft")
+        print(f"  Consensus: {item['consensus'][0]:.0f}ft (from {item['consensus'][1]})")
         print(f"  Difference: {item['diff']:.0f}ft")
         print()
 
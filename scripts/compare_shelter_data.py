@@ -2,7 +2,8 @@
 """Compare our shelter data with tnlandforms.us GPX data"""
 
 import xml.etree.ElementTree as ET
-import re
+
+from shelter_crosswalk import SOURCE_FILES, ShelterCrosswalk, file_signature, parse_our_shelters
 
 # Parse GPX file
 def parse_gpx(filename):
@@ -32,77 +33,24 @@ def parse_gpx(filename):
     
     return shelters
 
-# Parse our shelters.ts file to extract shelter data
-def parse_our_shelters(filename):
-    with open(filename, 'r') as f:
-        content = f.read()
-    
-    # Extract shelter objects using regex
-    pattern = r"\{ id: 'sh-\d+', name: '([^']+)', mile: ([\d.]+), soboMile: ([\d.]+), elevation: (\d+), lat: ([\d.-]+), lng: ([\d.-]+)"
-    
-    shelters = []
-    for match in re.finditer(pattern, content):
-        name, mile, sobo_mile, elevation, lat, lng = match.groups()
-        shelters.append({
-            'name': name,
-            'mile': float(mile),
-            'elevation': int(elevation),
-            'lat': float(lat),
-            'lon': float(lng)
-        })
-    
-    return shelters
-
-# Compare shelter names (fuzzy matching)
-def normalize_name(name):
-    """Normalize shelter name for comparison"""
-    name = name.lower()
-    # Remove common suffixes
-    name = re.sub(r'\s+(shelter|lean-to|lean to|hut|campsite|camp|site)$', '', name)
-    # Remove spaces and special chars
-    name = re.sub(r'[^a-z]', '', name)
-    return name
-
-def find_matches(our_shelters, their_shelters):
-    """Find matching shelters between datasets"""
+def find_matches(our_shelters, their_shelters, links):
+    """Find matching shelters between datasets through the crosswalk links (our id -> their name)"""
     matches = []
     unmatched_ours = []
-    unmatched_theirs = []
     
-    # Create normalized name lookup for their shelters
-    their_lookup = {}
-    for s in their_shelters:
-        norm = normalize_name(s['name'])
-        their_lookup[norm] = s
+    their_lookup = {s['name']: s for s in their_shelters}
+    matched_theirs = set()
     
-    # Match our shelters
     for our in our_shelters:
-        norm = normalize_name(our['name'])
-        
-        # Direct match
-        if norm in their_lookup:
-            matches.append((our, their_lookup[norm]))
+        their_name = links.get(our['id'])
+        if their_name in their_lookup:
+            matches.append((our, their_lookup[their_name]))
+            matched_theirs.add(their_name)
         else:
-            # Try fuzzy matching
-            matched = False
-            for their_norm, their in their_lookup.items():
-                # Check if names are similar
-                if norm in their_norm or their_norm in norm or \
-                   (len(norm) > 5 and len(their_norm) > 5 and 
-                    sum(c1 == c2 for c1, c2 in zip(norm, their_norm)) / max(len(norm), len(their_norm)) > 0.7):
-                    matches.append((our, their))
-                    matched = True
-                    break
-            
-            if not matched:
-                unmatched_ours.append(our)
+            unmatched_ours.append(our)
     
     # Find their shelters not in our list
-    our_norms = {normalize_name(s['name']) for s in our_shelters}
-    for their in their_shelters:
-        norm = normalize_name(their['name'])
-        if norm not in our_norms:
-            unmatched_theirs.append(their)
+    unmatched_theirs = [s for s in their_shelters if s['name'] not in matched_theirs]
     
     return matches, unmatched_ours, unmatched_theirs
 
@@ -114,15 +62,18 @@ def coord_diff(lat1, lon1, lat2, lon2):
 # Main comparison
 def main():
     print("Loading shelter data...")
-    their_shelters = parse_gpx('backend/data/tnlandforms_shelters.gpx')
-    our_shelters = parse_our_shelters('webapp/src/data/shelters.ts')
+    their_shelters = parse_gpx(SOURCE_FILES['tnlandforms'])
+    our_shelters = parse_our_shelters()
     
     print(f"\nDataset sizes:")
     print(f"  tnlandforms.us: {len(their_shelters)} shelters")
     print(f"  Our data: {len(our_shelters)} shelters")
     
     print("\nMatching shelters...")
-    matches, unmatched_ours, unmatched_theirs = find_matches(our_shelters, their_shelters)
+    crosswalk = ShelterCrosswalk()
+    links = crosswalk.resolve('tnlandforms', our_shelters, their_shelters, file_signature(SOURCE_FILES['tnlandforms']))
+    crosswalk.save()
+    matches, unmatched_ours, unmatched_theirs = find_matches(our_shelters, their_shelters, links)
     
     print(f"\nMatching results:")
     print(f"  Matched: {len(matches)}")
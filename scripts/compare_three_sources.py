@@ -1,10 +1,19 @@
 #!/usr/bin/env python3
 """Compare our shelter data with tnlandforms.us and ATC (guymott) data"""
 
+import json
+import sys
 import xml.etree.ElementTree as ET
-import re
 import zipfile
 
+from shelter_crosswalk import SOURCE_FILES, ShelterCrosswalk, assign_one_to_one, file_signature, parse_our_shelters
+
+sys.path.insert(0, 'backend/scripts')
+from atomic_write import write_if_changed
+from field_fusion import FIELD_RULES, FieldFusion
+
+CONSENSUS_FILE = 'backend/data/extracted/shelter_consensus.json'
+
 # Parse GPX file
 def parse_gpx(filename):
     tree = ET.parse(filename)
@@ -33,48 +42,23 @@ def parse_gpx(filename):
         })
     return shelters
 
-# Parse our shelters.ts
-def parse_our_shelters(filename):
-    with open(filename, 'r') as f:
-        content = f.read()
-    
-    pattern = r"\{ id: 'sh-\d+', name: '([^']+)', mile: ([\d.]+), soboMile: ([\d.]+), elevation: (\d+), lat: ([\d.-]+), lng: ([\d.-]+)"
-    
-    shelters = []
-    for match in re.finditer(pattern, content):
-        name, mile, sobo_mile, elevation, lat, lng = match.groups()
-        shelters.append({
-            'name': name,
-            'mile': float(mile),
-            'elevation': int(elevation),
-            'lat': float(lat),
-            'lon': float(lng)
-        })
-    return shelters
-
-# Normalize names for matching
-def normalize_name(name):
-    name = name.lower()
-    name = re.sub(r'\s+(shelter|lean-to|lean to|hut|campsite|camp|site|cabin|lean\s*to)\s*$', '', name)
-    name = re.sub(r'[^a-z]', '', name)
-    return name
-
-# Find matches between two datasets
-def find_matches(shelters_a, shelters_b, label_a="A", label_b="B"):
-    lookup_b = {normalize_name(s['name']): s for s in shelters_b}
+# Find matches between two datasets; link(s_a) gives the linked name in shelters_b, or None
+def find_matches(shelters_a, shelters_b, link):
+    lookup_b = {s['name']: s for s in shelters_b}
     
     matches = []
     unmatched_a = []
+    matched_b = set()
     
     for s_a in shelters_a:
-        norm_a = normalize_name(s_a['name'])
-        if norm_a in lookup_b:
-            matches.append((s_a, lookup_b[norm_a]))
+        name_b = link(s_a)
+        if name_b in lookup_b:
+            matches.append((s_a, lookup_b[name_b]))
+            matched_b.add(name_b)
         else:
             unmatched_a.append(s_a)
     
-    unmatched_b = [s for s in shelters_b if normalize_name(s['name']) not in 
-                   {normalize_name(s['name']) for s in shelters_a}]
+    unmatched_b = [s for s in shelters_b if s['name'] not in matched_b]
     
     return matches, unmatched_a, unmatched_b
 
@@ -93,30 +77,40 @@ def main():
     # Load all three datasets
     print("\nLoading datasets...")
     
-    our_shelters = parse_our_shelters('webapp/src/data/shelters.ts')
+    our_shelters = parse_our_shelters()
     print(f"  ✓ Our data: {len(our_shelters)} shelters")
     
-    tn_shelters = parse_gpx('backend/data/tnlandforms_shelters.gpx')
+    tn_shelters = parse_gpx(SOURCE_FILES['tnlandforms'])
     print(f"  ✓ tnlandforms.us: {len(tn_shelters)} shelters")
     
     # Use the consecutive names version with long comments
-    atc_shelters = parse_gpx('backend/data/guymott_shelters/AT Shelters - Long Comments - Consecutive Names.gpx')
+    atc_shelters = parse_gpx(SOURCE_FILES['atc'])
     print(f"  ✓ ATC (guymott): {len(atc_shelters)} shelters")
     
+    # Our shelters are linked through the shared crosswalk; only unlinked ones are matched
+    crosswalk = ShelterCrosswalk()
+    tn_links = crosswalk.resolve('tnlandforms', our_shelters, tn_shelters, file_signature(SOURCE_FILES['tnlandforms']))
+    atc_links = crosswalk.resolve('atc', our_shelters, atc_shelters, file_signature(SOURCE_FILES['atc']))
+    crosswalk.save()
+    
+    # tnlandforms and ATC are linked to each other directly, with the same one-to-one assignment
+    tn_atc = assign_one_to_one(tn_shelters, atc_shelters)
+    tn_to_atc = {tn_shelters[r]['name']: atc_shelters[c]['name'] for r, (c, _) in tn_atc.items()}
+    
     print("\n" + "="*80)
     print("CROSS-COMPARISON ANALYSIS")
     print("="*80)
     
     # Compare each pair
     comparisons = [
-        ("Our Data", our_shelters, "tnlandforms.us", tn_shelters),
-        ("Our Data", our_shelters, "ATC (guymott)", atc_shelters),
-        ("tnlandforms.us", tn_shelters, "ATC (guymott)", atc_shelters)
+        ("Our Data", our_shelters, "tnlandforms.us", tn_shelters, lambda s: tn_links[s['id']]),
+        ("Our Data", our_shelters, "ATC (guymott)", atc_shelters, lambda s: atc_links[s['id']]),
+        ("tnlandforms.us", tn_shelters, "ATC (guymott)", atc_shelters, lambda s: tn_to_atc.get(s['name']))
     ]
     
-    for name_a, data_a, name_b, data_b in comparisons:
+    for name_a, data_a, name_b, data_b, link in comparisons:
         print(f"\n{name_a} vs {name_b}:")
-        matches, unmatched_a, unmatched_b = find_matches(data_a, data_b, name_a, name_b)
+        matches, unmatched_a, unmatched_b = find_matches(data_a, data_b, link)
         
         # Calculate coordinate differences for matches
         excellent = 0  # <0.001°
@@ -145,45 +139,46 @@ def main():
     print("CONSENSUS ANALYSIS (All Three Sources)")
     print("="*80)
     
-    our_lookup = {normalize_name(s['name']): s for s in our_shelters}
-    tn_lookup = {normalize_name(s['name']): s for s in tn_shelters}
-    atc_lookup = {normalize_name(s['name']): s for s in atc_shelters}
+    our_lookup = {s['name']: s for s in our_shelters}
+    tn_lookup = {s['name']: s for s in tn_shelters}
+    atc_lookup = {s['name']: s for s in atc_shelters}
     
-    all_three = []
-    for name_norm in our_lookup:
-        if name_norm in tn_lookup and name_norm in atc_lookup:
-            all_three.append((
-                our_lookup[name_norm],
-                tn_lookup[name_norm],
-                atc_lookup[name_norm]
-            ))
+    # Aligned rows for the fusion engine; position and elevation consensus with provenance
+    rows = [{
+        'current': our,
+        'tnlandforms': tn_lookup.get(tn_links[our['id']]),
+        'atc': atc_lookup.get(atc_links[our['id']]),
+    } for our in our_shelters]
+    fusion = FieldFusion(sources=('atc', 'tnlandforms', 'current')).fuse(rows, fields=('position', 'elevation'))
     
-    print(f"\nShelters found in ALL THREE sources: {len(all_three)}")
+    present = fusion.columns['position']['present']
+    all_three = present.all(axis=1)
+    spread = fusion.columns['position']['spread']
     
-    # Check agreement level
-    full_agreement = 0  # All within 0.001°
-    partial_agreement = 0  # All within 0.01°
-    disagreement = 0  # Any pair >0.01°
+    print(f"\nShelters found in ALL THREE sources: {int(all_three.sum())}")
     
-    for our, tn, atc in all_three:
-        our_tn = max(coord_diff(our['lat'], our['lon'], tn['lat'], tn['lon']))
-        our_atc = max(coord_diff(our['lat'], our['lon'], atc['lat'], atc['lon']))
-        tn_atc = max(coord_diff(tn['lat'], tn['lon'], atc['lat'], atc['lon']))
-        
-        max_diff = max(our_tn, our_atc, tn_atc)
-        
-        if max_diff < 0.001:
-            full_agreement += 1
-        elif max_diff < 0.01:
-            partial_agreement += 1
-        else:
-            disagreement += 1
+    # Largest distance of any source from the consensus position (miles)
+    full_agreement = int((all_three & (spread < 0.062)).sum())  # <100m
+    partial_agreement = int((all_three & (spread >= 0.062) & (spread < 0.62)).sum())  # 100m-1km
+    disagreement = int((all_three & (spread >= 0.62)).sum())  # >1km
     
     print(f"\nAgreement levels:")
     print(f"  ✓ Full agreement (<100m): {full_agreement}")
     print(f"  ~ Partial agreement (100m-1km): {partial_agreement}")
     print(f"  ✗ Significant disagreement (>1km): {disagreement}")
     
+    winners = [fusion.provenance(i, 'position')['source'] for i in range(len(rows)) if present[i].any()]
+    print(f"\nConsensus position taken from: " +
+          ", ".join(f"{source} {winners.count(source)}" for source in fusion.sources))
+    our_outliers = fusion.disagreements('current', 'position')
+    print(f"Our position disagrees with the consensus (>{FIELD_RULES['position'].tolerance} mi): {len(our_outliers)}")
+    
+    consensus = []
+    for i, our in enumerate(our_shelters):
+        consensus.append(dict({'id': our['id'], 'name': our['name']}, **fusion.record(i)))
+    write_if_changed(CONSENSUS_FILE, json.dumps(consensus, indent=2))
+    print(f"Saved fused positions and elevations with provenance to {CONSENSUS_FILE}")
+    
     # Check specific problematic shelters
     print("\n" + "="*80)
     print("DETAILED COMPARISON: Sample Shelters")
@@ -199,24 +194,26 @@ def main():
     ]
     
     for test_name in test_shelters:
-        norm = normalize_name(test_name)
+        our = our_lookup.get(test_name)
+        tn_name = tn_links[our['id']] if our else None
+        atc_name = atc_links[our['id']] if our else None
         print(f"\n{test_name}:")
         
-        if norm in our_lookup:
-            s = our_lookup[norm]
+        if our:
+            s = our
             print(f"  Our data:      lat={s['lat']:.5f}, lon={s['lon']:.5f}, ele={s['elevation']}ft, mile={s['mile']}")
         else:
             print(f"  Our data:      NOT FOUND")
         
-        if norm in tn_lookup:
-            s = tn_lookup[norm]
+        if tn_name in tn_lookup:
+            s = tn_lookup[tn_name]
             ele = f", ele={s['elevation']:.0f}ft" if s['elevation'] else ""
             print(f"  tnlandforms:   lat={s['lat']:.5f}, lon={s['lon']:.5f}{ele}")
         else:
             print(f"  tnlandforms:   NOT FOUND")
         
-        if norm in atc_lookup:
-            s = atc_lookup[norm]
+        if atc_name in atc_lookup:
+            s = atc_lookup[atc_name]
             ele = f", ele={s['elevation']:.0f}ft" if s['elevation'] else ""
             print(f"  ATC (guymott): lat={s['lat']:.5f}, lon={s['lon']:.5f}{ele}")
         else:
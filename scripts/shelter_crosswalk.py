@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""Persistent crosswalk of shelter identities across data sources
+
+Links each of our shelters (by id) to its name in the ATC (guymott) GPX, the
+tnlandforms.us GPX and the PDF extraction, with the match score. Links are
+stored in backend/data/shelter_crosswalk.json and only shelters without a
+link for a source are matched, so re-running a comparison is O(new records).
+Manual corrections go in backend/data/shelter_crosswalk_overrides.json:
+
+    {"atc": {"sh-010": "Exact ATC Name", "sh-011": null}}
+
+(null records a confirmed "not in this source"). Overrides always win.
+
+Usage: python scripts/shelter_crosswalk.py   (refresh links for every source present)
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+from difflib import SequenceMatcher
+
+import numpy as np
+
+sys.path.insert(0, 'backend/scripts')
+from atomic_write import write_if_changed
+from ts_literal import load_module
+
+CROSSWALK_FILE = 'backend/data/shelter_crosswalk.json'
+OVERRIDES_FILE = 'backend/data/shelter_crosswalk_overrides.json'
+SHELTERS_TS = 'webapp/src/data/shelters.ts'
+
+SOURCE_FILES = {
+    'atc': 'backend/data/guymott_shelters/AT Shelters - Long Comments - Consecutive Names.gpx',
+    'tnlandforms': 'backend/data/tnlandforms_shelters.gpx',
+    'pdf': 'backend/data/extracted/extracted_waypoints.json',
+}
+
+# Names scoring below this are not linked
+MATCH_THRESHOLD = 0.7
+
+# Candidates per name scored with SequenceMatcher, by trigram overlap
+TOP_K = 8
+
+# Assignment: name score plus small GPS and mile bonuses decide between candidates
+GPS_WEIGHT = 0.1
+GPS_SCALE = 1.0
+MILE_WEIGHT = 0.05
+MILE_SCALE = 1.0
+
+# Cost of a pair that is not a candidate (never chosen over leaving a row unmatched)
+NOT_A_CANDIDATE = 1e6
+
+# Normalize shelter name for matching (the one normalization every script shares)
+def normalize_name(name):
+    """Lowercased name without the kind-of-place suffix, and the same with only letters kept"""
+    name = name.lower().strip()
+    name = re.sub(r'\s+(shelter|lean-to|lean\s*to|hut|campsite|camp|site|cabin)\s*$', '', name)
+    name_clean = re.sub(r'[^a-z]', '', name)
+    return name, name_clean
+
+# Character trigrams of a cleaned name (padded so short names still have some)
+def trigrams(name_clean):
+    padded = f"  {name_clean} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class NameMatcher:
+    """Fuzzy name matching against one source's names through a trigram index"""
+    
+    def __init__(self, names, top_k=TOP_K):
+        self.names = list(names)
+        self.cleans = [normalize_name(name)[1] for name in self.names]
+        self.top_k = top_k
+        
+        self.exact = {}
+        self.postings = {}
+        self.gram_counts = []
+        for i, clean in enumerate(self.cleans):
+            self.exact.setdefault(clean, i)
+            grams = trigrams(clean)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(i)
+                
+    def candidates(self, name_clean):
+        """Top-k names by trigram overlap (Dice coefficient), in source order"""
+        grams = trigrams(name_clean)
+        overlap = {}
+        for gram in grams:
+            for i in self.postings.get(gram, ()):
+                overlap[i] = overlap.get(i, 0) + 1
+                
+        dice = {i: 2 * shared / (len(grams) + self.gram_counts[i]) for i, shared in overlap.items()}
+        best = sorted(dice, key=lambda i: (-dice[i], i))[:self.top_k]
+        return sorted(best)
+        
+    def scored_candidates(self, our_name):
+        """(position, name score) of every candidate, in source order"""
+        our_norm, our_clean = normalize_name(our_name)
+        
+        results = []
+        for i in self.candidates(our_clean):
+            their_clean = self.cleans[i]
+            if their_clean == our_clean:
+                results.append((i, 1.0))
+                continue
+                
+            # Substring match
+            score = 0
+            if our_clean in their_clean or their_clean in our_clean:
+                score = len(min(our_clean, their_clean)) / len(max(our_clean, their_clean))
+                
+            # Fuzzy match using SequenceMatcher
+            score = max(score, SequenceMatcher(None, our_clean, their_clean).ratio())
+            results.append((i, score))
+        return results
+        
+    def match(self, our_name, threshold=MATCH_THRESHOLD):
+        """(source name, score) of the best match, or (None, 0)"""
+        our_norm, our_clean = normalize_name(our_name)
+        
+        # Exact normalized match
+        if our_clean in self.exact:
+            return self.names[self.exact[our_clean]], 1.0
+            
+        best_match = None
+        best_score = 0
+        for i, score in self.scored_candidates(our_name):
+            if score > best_score:
+                best_score = score
+                best_match = self.names[i]
+                
+        if best_match and best_score >= threshold:
+            return best_match, best_score
+        return None, 0
+
+# Minimum-cost perfect assignment of a square cost matrix (Hungarian method, shortest augmenting paths)
+def hungarian(cost):
+    """Column assigned to each row; O(n^3) with the inner scans vectorized"""
+    cost = np.asarray(cost, dtype=np.float64)
+    n = cost.shape[0]
+    u = np.zeros(n + 1)
+    v = np.zeros(n + 1)
+    p = np.zeros(n + 1, dtype=np.int64)    # p[j]: row (1-based) holding column j; column 0 is the virtual root
+    way = np.zeros(n + 1, dtype=np.int64)
+    
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(n + 1, np.inf)
+        used = np.zeros(n + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used
+            free[0] = False
+            reduced = np.full(n + 1, np.inf)
+            reduced[1:] = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < minv)
+            minv[better] = reduced[better]
+            way[better] = j0
+            
+            j1 = int(np.argmin(np.where(free, minv, np.inf)))
+            delta = minv[j1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+                
+        # Augment along the path back to the root
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+            
+    assignment = np.zeros(n, dtype=np.int64)
+    assignment[p[1:] - 1] = np.arange(n)
+    return assignment
+
+# Straight-line miles between two records carrying lat/lon
+def _distance_miles(a, b):
+    lat1, lon1, lat2, lon2 = map(math.radians, (a['lat'], a['lon'], b['lat'], b['lon']))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 3959 * math.asin(math.sqrt(min(h, 1.0)))
+
+# Bonus for agreeing coordinates and miles, when both records have them
+def proximity_bonus(a, b):
+    bonus = 0.0
+    if a.get('lat') is not None and b.get('lat') is not None:
+        bonus += GPS_WEIGHT * max(0.0, 1.0 - _distance_miles(a, b) / GPS_SCALE)
+    if a.get('mile') is not None and b.get('mile') is not None:
+        bonus += MILE_WEIGHT * max(0.0, 1.0 - abs(a['mile'] - b['mile']) / MILE_SCALE)
+    return bonus
+
+def assign_one_to_one(rows, cols, threshold=MATCH_THRESHOLD, taken=()):
+    """Globally optimal one-to-one links rows -> cols: {row index: (col index, name score)}
+    
+    Candidate pairs (trigram top-k with a name score at or above the
+    threshold; columns in taken are excluded) cost 1 - (name score + GPS and
+    mile bonuses); leaving a row unlinked costs 1 - threshold. The pairs
+    split into independent blocks (connected components of the candidate
+    graph, in practice a few neighbouring shelters with similar names) and
+    each block is solved exactly with the Hungarian method, so every column
+    is claimed by at most one row.
+    """
+    matcher = NameMatcher([c['name'] for c in cols])
+    taken = set(taken)
+    edges = {}
+    for r, row in enumerate(rows):
+        for c, name_score in matcher.scored_candidates(row['name']):
+            if c not in taken and name_score >= threshold:
+                edges[(r, c)] = (1.0 - name_score - proximity_bonus(row, cols[c]), name_score)
+                
+    # Connected components over rows and columns (union-find; columns offset by len(rows))
+    parent = list(range(len(rows) + len(cols)))
+    
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+        
+    for r, c in edges:
+        parent[find(r)] = find(len(rows) + c)
+        
+    blocks = {}
+    for r, c in edges:
+        block = blocks.setdefault(find(r), ({}, {}))
+        block[0].setdefault(r, len(block[0]))
+        block[1].setdefault(c, len(block[1]))
+        
+    links = {}
+    no_match = 1.0 - threshold
+    for block_rows, block_cols in blocks.values():
+        n_rows, n_cols = len(block_rows), len(block_cols)
+        size = n_rows + n_cols
+        
+        # Rows may take a dummy column (unlinked); columns may take a dummy row (unclaimed)
+        cost = np.full((size, size), NOT_A_CANDIDATE)
+        cost[n_rows:, n_cols:] = 0.0
+        cost[np.arange(n_rows), n_cols + np.arange(n_rows)] = no_match
+        cost[n_rows + np.arange(n_cols), np.arange(n_cols)] = 0.0
+        for r, i in block_rows.items():
+            for c, j in block_cols.items():
+                if (r, c) in edges:
+                    cost[i, j] = edges[(r, c)][0]
+                    
+        assignment = hungarian(cost)
+        row_ids = list(block_rows)
+        col_ids = list(block_cols)
+        for i in range(n_rows):
+            j = assignment[i]
+            if j < n_cols:
+                r, c = row_ids[i], col_ids[j]
+                links[r] = (c, edges[(r, c)][1])
+                
+    return links
+
+# Our shelters from shelters.ts, with ids
+def parse_our_shelters(filename=SHELTERS_TS):
+    _, exports = load_module(filename)
+    return [{
+        'id': record['id'],
+        'name': record['name'],
+        'mile': float(record['mile']),
+        'elevation': record['elevation'],
+        'lat': float(record['lat']),
+        'lon': float(record['lng'])
+    } for record in exports.get('shelters', [])]
+
+# Waypoints of a source file (GPX waypoints or an extracted JSON list) as name/lat/lon(/mile) records
+def parse_source_records(filename):
+    if filename.endswith('.json'):
+        with open(filename, 'r', encoding='utf-8') as f:
+            return [
+                {'name': item['name'], 'lat': item.get('lat'), 'lon': item.get('lng'), 'mile': item.get('mile')}
+                for item in json.load(f) if item.get('name')
+            ]
+            
+    root = ET.parse(filename).getroot()
+    ns = {'gpx': 'http://www.topografix.com/GPX/1/1'}
+    records = []
+    for wpt in root.findall('.//gpx:wpt', ns):
+        name_elem = wpt.find('gpx:name', ns)
+        records.append({
+            'name': name_elem.text.strip() if name_elem is not None else 'Unknown',
+            'lat': float(wpt.get('lat')),
+            'lon': float(wpt.get('lon'))
+        })
+    return records
+
+# Content hash of a source file; links are recomputed when it changes
+def file_signature(filename):
+    with open(filename, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+class ShelterCrosswalk:
+    """our id -> {source: {name, score}} with manual overrides"""
+    
+    def __init__(self, path=CROSSWALK_FILE, overrides_path=OVERRIDES_FILE):
+        self.path = path
+        self.overrides_path = overrides_path
+        self.signatures = {}
+        self.links = {}
+        self.overrides = {}
+        self.load()
+        
+    def load(self):
+        """Read the stored links and the overrides file, if present"""
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.signatures = data.get('signatures', {})
+            self.links = data.get('links', {})
+        if os.path.exists(self.overrides_path):
+            with open(self.overrides_path, 'r', encoding='utf-8') as f:
+                self.overrides = json.load(f)
+                
+    def save(self):
+        """Write the links (sorted, so the file diffs cleanly)"""
+        data = {'signatures': self.signatures, 'links': self.links}
+        write_if_changed(self.path, json.dumps(data, indent=2, sort_keys=True) + '\n')
+            
+    def resolve(self, source, our_shelters, their_records, signature=None):
+        """Link every shelter to the source, matching only shelters without a stored link
+        
+        their_records are names or name/lat/lon(/mile) dicts. New links are
+        assigned one-to-one (assign_one_to_one) among the source records no
+        stored link or override already claims. A changed signature (the
+        source file changed) drops the source's stored links first. Returns
+        {our id: source name or None}.
+        """
+        if signature is not None and self.signatures.get(source) != signature:
+            for entry in self.links.values():
+                entry.pop(source, None)
+            self.signatures[source] = signature
+            
+        records = [r if isinstance(r, dict) else {'name': r} for r in their_records]
+        source_overrides = self.overrides.get(source, {})
+        pending = []
+        for shelter in our_shelters:
+            entry = self.links.setdefault(shelter['id'], {})
+            entry['ourName'] = shelter['name']
+            if source not in entry and shelter['id'] not in source_overrides:
+                pending.append(shelter)
+                
+        if pending:
+            pending_ids = {shelter['id'] for shelter in pending}
+            claimed = {self.name_for(shelter['id'], source) for shelter in our_shelters if shelter['id'] not in pending_ids}
+            taken = [i for i, record in enumerate(records) if record['name'] in claimed]
+            
+            links = assign_one_to_one(pending, records, taken=taken)
+            for k, shelter in enumerate(pending):
+                col, score = links.get(k, (None, 0))
+                self.links[shelter['id']][source] = {
+                    'name': records[col]['name'] if col is not None else None,
+                    'score': round(score, 3)
+                }
+            print(f"  Crosswalk: matched {len(pending)} new shelters against {source}")
+            
+        return {shelter['id']: self.name_for(shelter['id'], source) for shelter in our_shelters}
+        
+    def name_for(self, our_id, source):
+        """Source name linked to one of our shelters (overrides first), or None"""
+        source_overrides = self.overrides.get(source, {})
+        if our_id in source_overrides:
+            return source_overrides[our_id]
+        link = self.links.get(our_id, {}).get(source)
+        return link['name'] if link else None
+        
+    def score_for(self, our_id, source):
+        """Match score of a link (1.0 for an override), or 0"""
+        if our_id in self.overrides.get(source, {}):
+            return 1.0 if self.overrides[source][our_id] else 0
+        link = self.links.get(our_id, {}).get(source)
+        return link['score'] if link and link['name'] else 0
+        
+    def resolve_file(self, source, our_shelters, filename=None):
+        """resolve() against a source file, signed by its content"""
+        filename = filename or SOURCE_FILES[source]
+        return self.resolve(source, our_shelters, parse_source_records(filename), file_signature(filename))
+
+def main():
+    our_shelters = parse_our_shelters()
+    print(f"Loaded {len(our_shelters)} of our shelters")
+    
+    crosswalk = ShelterCrosswalk()
+    for source, filename in SOURCE_FILES.items():
+        if not os.path.exists(filename):
+            print(f"  {source}: {filename} not found, skipped")
+            continue
+        links = crosswalk.resolve_file(source, our_shelters, filename)
+        linked = sum(1 for name in links.values() if name)
+        print(f"  {source}: {linked}/{len(links)} shelters linked")
+        
+    crosswalk.save()
+    print(f"Saved crosswalk to {crosswalk.path}")
+
+if __name__ == '__main__':
+    main()
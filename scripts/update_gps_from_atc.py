@@ -1,9 +1,15 @@
 #!/usr/bin/env python3
 """Update our shelter GPS coordinates from ATC (guymott) data"""
 
+import sys
 import xml.etree.ElementTree as ET
 import re
-from difflib import SequenceMatcher
+
+from shelter_crosswalk import NameMatcher, ShelterCrosswalk, file_signature, parse_our_shelters
+
+sys.path.insert(0, 'backend/scripts')
+from atomic_write import write_if_changed
+from ts_patch import TsPatch
 
 # Parse ATC GPX file
 def parse_atc_gpx(filename):
@@ -41,141 +47,62 @@ def parse_atc_gpx(filename):
         }
     return shelters
 
-# Normalize shelter name for matching
-def normalize_name(name):
-    """Create a normalized version of shelter name for matching"""
-    name = name.lower()
-    # Remove suffixes
-    name = re.sub(r'\s+(shelter|lean-to|lean to|hut|campsite|camp|site|cabin)\s*$', '', name)
-    # Remove spaces and special chars for fuzzy matching
-    name_clean = re.sub(r'[^a-z]', '', name)
-    return name, name_clean
-
 # Find best match in ATC data
-def find_atc_match(our_name, atc_shelters, threshold=0.7):
-    """Find best matching ATC shelter for our shelter name"""
-    our_norm, our_clean = normalize_name(our_name)
-    
-    best_match = None
-    best_score = 0
-    
-    for atc_name, atc_data in atc_shelters.items():
-        atc_norm, atc_clean = normalize_name(atc_name)
-        
-        # Check for exact normalized match
-        if our_clean == atc_clean:
-            return atc_name, atc_data, 1.0
-        
-        # Check for substring match
-        if our_clean in atc_clean or atc_clean in our_clean:
-            score = len(min(our_clean, atc_clean)) / len(max(our_clean, atc_clean))
-            if score > best_score:
-                best_score = score
-                best_match = (atc_name, atc_data)
-        
-        # Fuzzy match using SequenceMatcher
-        similarity = SequenceMatcher(None, our_clean, atc_clean).ratio()
-        if similarity > best_score:
-            best_score = similarity
-            best_match = (atc_name, atc_data)
-    
-    if best_match and best_score >= threshold:
-        return best_match[0], best_match[1], best_score
-    
+def find_atc_match(our_name, atc_shelters, threshold=0.7, matcher=None):
+    """Find best matching ATC shelter for our shelter name
+    
+    Pass a prebuilt NameMatcher to avoid re-indexing the ATC names on every call.
+    """
+    if matcher is None:
+        matcher = NameMatcher(atc_shelters.keys())
+    atc_name, score = matcher.match(our_name, threshold)
+    if atc_name:
+        return atc_name, atc_shelters[atc_name], score
     return None, None, 0
 
-# Read our shelters.ts
-def read_shelters_ts(filename):
-    with open(filename, 'r') as f:
-        content = f.read()
-    return content
-
-# Extract shelter entries from TypeScript
-def extract_shelters(content):
-    """Extract individual shelter objects from the TypeScript array"""
-    # Find the shelters array content
-    array_match = re.search(r'export const shelters: Shelter\[\] = \[(.*?)\];', content, re.DOTALL)
-    if not array_match:
-        return []
-    
-    array_content = array_match.group(1)
-    
-    # Split into individual shelter objects
-    shelter_pattern = r"\{ id: 'sh-\d+', name: '([^']+)', mile: ([\d.]+), soboMile: ([\d.]+), elevation: ([\d.]+), lat: ([\d.-]+), lng: ([\d.-]+), state: '([A-Z]{2})', county: '([^']+)', type: 'shelter'([^}]+)\}"
-    
-    shelters = []
-    for match in re.finditer(shelter_pattern, array_content):
-        name, mile, sobo_mile, elevation, lat, lon, state, county, rest = match.groups()
-        shelters.append({
-            'name': name,
-            'mile': float(mile),
-            'sobo_mile': float(sobo_mile),
-            'elevation': int(elevation),
-            'lat': float(lat),
-            'lon': float(lon),
-            'state': state,
-            'county': county,
-            'rest': rest
-        })
-    
-    return shelters
-
 # Main update function
 def main():
     print("Loading ATC shelter data...")
-    atc_shelters = parse_atc_gpx('backend/data/guymott_shelters/AT Shelters - Long Comments - Consecutive Names.gpx')
+    atc_filename = 'backend/data/guymott_shelters/AT Shelters - Long Comments - Consecutive Names.gpx'
+    atc_shelters = parse_atc_gpx(atc_filename)
     print(f"  Loaded {len(atc_shelters)} ATC shelters")
     
-    print("\nReading our shelter data...")
-    with open('webapp/src/data/shelters.ts', 'r') as f:
-        original_content = f.read()
+    # Links from the shared crosswalk; only shelters not linked yet are matched
+    crosswalk = ShelterCrosswalk()
+    atc_links = crosswalk.resolve('atc', parse_our_shelters(),
+                                  [dict(data, name=name) for name, data in atc_shelters.items()],
+                                  file_signature(atc_filename))
     
-    # Parse shelter entries
-    shelter_pattern = r"(\{ id: 'sh-\d+', name: ')([^']+)(', mile: )([\d.]+)(, soboMile: )([\d.]+)(, elevation: )([\d.]+)(, lat: )([\d.-]+)(, lng: )([\d.-]+)(, state: '[A-Z]{2}', county: '[^']+', type: 'shelter')"
+    print("\nReading our shelter data...")
+    patch, exports = TsPatch.load('webapp/src/data/shelters.ts', indent=' ', inline_depth=1)
+    our_shelters = exports.get('shelters', [])
     
-    updated_content = original_content
     matches_found = 0
     no_match = []
     
-    for match in re.finditer(shelter_pattern, original_content):
-        full_match = match.group(0)
-        prefix1 = match.group(1)  # { id: 'sh-XXX', name: '
-        name = match.group(2)      # shelter name
-        prefix2 = match.group(3)     # ', mile: 
-        mile = match.group(4)      # mile value
-        prefix3 = match.group(5)     # , soboMile: 
-        sobo_mile = match.group(6)   # sobo mile value
-        prefix4 = match.group(7)     # , elevation: 
-        elevation = match.group(8)   # elevation
-        prefix5 = match.group(9)     # , lat: 
-        old_lat = match.group(10)  # old lat
-        prefix6 = match.group(11)    # , lng: 
-        old_lon = match.group(12)    # old lon
-        suffix = match.group(13)     # rest
+    for shelter in our_shelters:
+        name = shelter['name']
         
         # Find matching ATC shelter
-        atc_name, atc_data, score = find_atc_match(name, atc_shelters)
+        atc_name = atc_links.get(shelter['id'])
+        atc_data = atc_shelters.get(atc_name) if atc_name else None
+        score = crosswalk.score_for(shelter['id'], 'atc')
         
         if atc_data:
             matches_found += 1
             new_lat = f"{atc_data['lat']:.5f}"
             new_lon = f"{atc_data['lon']:.5f}"
+            patch.replace(*shelter.value_spans['lat'], new_lat)
+            patch.replace(*shelter.value_spans['lng'], new_lon)
             
             # Use ATC elevation if available
-            if atc_data['elevation']:
-                new_elevation = f"{atc_data['elevation']:.0f}"
-            else:
-                new_elevation = elevation
-            
-            # Build replacement string
-            replacement = f"{prefix1}{name}{prefix2}{mile}{prefix3}{sobo_mile}{prefix4}{new_elevation}{prefix5}{new_lat}{prefix6}{new_lon}{suffix}"
-            
-            updated_content = updated_content.replace(full_match, replacement, 1)
+            if atc_data['elevation'] and 'elevation' in shelter.value_spans:
+                patch.replace(*shelter.value_spans['elevation'], f"{atc_data['elevation']:.0f}")
             
             # Show some examples
             if matches_found <= 5:
                 print(f"\n  Updated: {name}")
-                print(f"    Old: lat={old_lat}, lon={old_lon}")
+                print(f"    Old: lat={shelter['lat']}, lon={shelter['lng']}")
                 print(f"    New: lat={new_lat}, lon={new_lon} (matched: {atc_name}, score: {score:.2f})")
         else:
             no_match.append(name)
@@ -192,17 +119,18 @@ def main():
         if len(no_match) > 20:
             print(f"    ... and {len(no_match) - 20} more")
     
-    # Write updated file
-    print(f"\nWriting updated shelters.ts...")
-    with open('webapp/src/data/shelters.ts', 'w') as f:
-        f.write(updated_content)
+    crosswalk.save()
     
-    print(f"  Done!")
+    # Write updated file
+    if write_if_changed('webapp/src/data/shelters.ts', patch.apply()):
+        print(f"\nWrote updated shelters.ts")
+    else:
+        print(f"\nshelters.ts unchanged")
     
     # Show summary stats
     print(f"\n{'='*70}")
     print("Summary:")
-    print(f"  - Total shelters in our data: 252")
+    print(f"  - Total shelters in our data: {len(our_shelters)}")
     print(f"  - Successfully matched with ATC: {matches_found}")
     print(f"  - Unmatched (preserved original GPS): {len(no_match)}")
     print(f"  - All mile markers preserved ✓")
@@ -0,0 +1,87 @@
+/**
+ * Decoder for the compact binary elevation profile
+ *
+ * Written by backend/scripts/elevation_binary.py. Every column is quantized to
+ * integers (mile ×10, elevation in feet, lat/lng ×1e5) and stored as its first
+ * value followed by Int16 or Int32 deltas, little-endian:
+ *
+ *   header   'ATEL', version u16, column count u16, point count u32
+ *   columns  first value i32, scale u32, delta width u8 (2 or 4), 3 pad bytes
+ *   data     each column's deltas, padded to 4 bytes
+ *
+ * Decoding is one prefix sum per column straight off typed-array views.
+ *
+ * Imported only by the elevation.ts wrapper that elevation_binary.py writes;
+ * while elevation.ts holds the literal profile, nothing uses this module.
+ */
+
+import type { ElevationPoint } from '../data/elevation';
+
+const MAGIC = 'ATEL';
+const VERSION = 1;
+const HEADER_SIZE = 12;
+const COLUMN_SIZE = 12;
+
+export const ELEVATION_COLUMNS = ['mile', 'elevation', 'lat', 'lng'] as const;
+
+export type ElevationColumns = Record<(typeof ELEVATION_COLUMNS)[number], Float64Array>;
+
+export function base64ToArrayBuffer(base64: string): ArrayBuffer {
+  const binary = atob(base64);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  return bytes.buffer;
+}
+
+/**
+ * Decode the binary profile into one typed array per column
+ */
+export function decodeElevationColumns(buffer: ArrayBuffer): ElevationColumns {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  const version = view.getUint16(4, true);
+  if (magic !== MAGIC || version !== VERSION) {
+    throw new Error(`Unsupported elevation data (${magic} v${version})`);
+  }
+  const columnCount = view.getUint16(6, true);
+  const count = view.getUint32(8, true);
+
+  const columns = {} as ElevationColumns;
+  let offset = HEADER_SIZE + columnCount * COLUMN_SIZE;
+  for (let c = 0; c < columnCount; c++) {
+    const descriptor = HEADER_SIZE + c * COLUMN_SIZE;
+    const first = view.getInt32(descriptor, true);
+    const scale = view.getUint32(descriptor + 4, true);
+    const width = view.getUint8(descriptor + 8);
+
+    const length = Math.max(count - 1, 0);
+    const deltas = width === 2 ? new Int16Array(buffer, offset, length) : new Int32Array(buffer, offset, length);
+    offset += Math.ceil((length * width) / 4) * 4;
+
+    const values = new Float64Array(count);
+    let value = first;
+    if (count > 0) values[0] = value / scale;
+    for (let i = 0; i < length; i++) {
+      value += deltas[i];
+      values[i + 1] = value / scale;
+    }
+    if (c < ELEVATION_COLUMNS.length) {
+      columns[ELEVATION_COLUMNS[c]] = values;
+    }
+  }
+  return columns;
+}
+
+/**
+ * Decode a base64 profile into ElevationPoint objects
+ */
+export function decodeElevationProfile(base64: string): ElevationPoint[] {
+  const { mile, elevation, lat, lng } = decodeElevationColumns(base64ToArrayBuffer(base64));
+  const points: ElevationPoint[] = new Array(mile.length);
+  for (let i = 0; i < mile.length; i++) {
+    points[i] = { mile: mile[i], elevation: elevation[i], lat: lat[i], lng: lng[i] };
+  }
+  return points;
+}